@@ -0,0 +1,48 @@
+"""
+Run an example in its window and record the input events and the camera path (the local matrices
+of the movement rig and its look attachment) until the window is closed:
+
+    $ python benchmarks/record_example.py ex6_5_shadows walk.json
+    $ python benchmarks/replay_examples.py --example ex6_5_shadows --recording walk.json
+"""
+import argparse
+import importlib
+import os
+import sys
+
+import PyQt5.QtCore as qtc
+import PyQt5.QtWidgets as qtw
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, package_dir)
+
+from extras.input_recorder import InputRecorder
+
+
+def main(argument_list=None):
+    parser = argparse.ArgumentParser(description="Record the input and camera path of an example")
+    parser.add_argument("example", help="module name of the example, e.g. ex6_5_shadows")
+    parser.add_argument("output", help="JSON file of the recording")
+    parser.add_argument("--path", action="append",
+                        help="attribute path of a recorded object on the GL widget (may be repeated; "
+                             "default: rig and rig.look_attachment)")
+    arguments = parser.parse_args(argument_list)
+    output_path = os.path.abspath(arguments.output)
+    # The examples load their resources relative to the root of the package
+    os.chdir(package_dir)
+    qtw.QApplication.setAttribute(qtc.Qt.AA_EnableHighDpiScaling, True)
+    qtw.QApplication.setAttribute(qtc.Qt.AA_UseHighDpiPixmaps, True)
+    app = qtw.QApplication(sys.argv)
+    module = importlib.import_module(f"examples.{arguments.example}")
+    window = module.MainWindow()
+    recorder = InputRecorder(window, window.glWidget, arguments.path or ["rig", "rig.look_attachment"])
+    window.show()
+    exit_code = app.exec_()
+    recorder.stop()
+    recorder.save(output_path)
+    print(f"{len(recorder.event_list)} events and {len(recorder.sample_list)} frames recorded into {output_path}")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Replay the examples headlessly for a fixed number of frames and write their startup and frame times as JSON:
+
+    $ python benchmarks/replay_examples.py --frames 300 --output examples.json
+    $ python benchmarks/replay_examples.py --example ex6_5_shadows --input input_script.json
+    $ python benchmarks/replay_examples.py --example ex6_5_shadows --recording walk.json
+
+Each example runs in a process of its own, so that its startup time includes importing the framework.
+Its MainWindow is created on the Qt "offscreen" platform without being shown, the GLWidget methods
+(initializeGL, paintGL) are called directly with an offscreen OpenGL context current, and the renderers
+draw into the framebuffer object of that context (see Renderer.default_window_render_target).
+The clock of the example (its "time" module) advances by a fixed timestep per frame, and key presses
+are delivered to the MainWindow from an input script: a JSON list of [first frame, last frame, key],
+the key being pressed once in each frame of the range, like an auto-repeating key held down.
+Alternatively, a recording of benchmarks/record_example.py is replayed: its input events are delivered
+at the fixed timestep and the recorded camera path (e.g. of the movement rig) is applied in each frame.
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import subprocess
+import sys
+from time import perf_counter
+
+import numpy as np
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, package_dir)
+
+from benchmarks.run_benchmarks import get_memory, summarize
+
+# Move forwards, turn left, look up, move backwards, turn right, look down (keys of the MovementRig examples)
+DEFAULT_INPUT_SCRIPT = [
+    [10, 39, "w"],
+    [40, 69, "q"],
+    [70, 84, "t"],
+    [85, 114, "s"],
+    [115, 144, "e"],
+    [145, 159, "g"],
+]
+
+
+def parse_arguments(argument_list=None):
+    parser = argparse.ArgumentParser(description="Replay the examples headlessly and report their timings as JSON")
+    parser.add_argument("--frames", type=int,
+                        help="frames rendered per example (default: 300, or the length of the recording)")
+    parser.add_argument("--timestep", type=float, default=1 / 60, help="seconds the example clock advances per frame")
+    parser.add_argument("--size", default="800x600", help="resolution as WIDTHxHEIGHT")
+    parser.add_argument("--example", action="append",
+                        help="module name of an example to replay, e.g. ex6_5_shadows (may be repeated; default: all)")
+    parser.add_argument("--input", help="JSON input script (default: a walk with the movement keys)")
+    parser.add_argument("--recording", help="input and camera path recorded with benchmarks/record_example.py")
+    parser.add_argument("--gl-version", default="3.3", help="OpenGL version of the core context")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds after which an example is stopped")
+    parser.add_argument("--output", help="JSON file to write (default: standard output)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argument_list)
+
+
+def get_example_names():
+    """ Return the module names of the examples, in the order of the book """
+    return sorted(file_name[:-3] for file_name in os.listdir(os.path.join(package_dir, "examples"))
+                  if file_name.startswith("ex") and file_name.endswith(".py"))
+
+
+class FixedClock:
+    """ Stands in for the "time" module of an example: the time only changes when the replay advances it """
+    def __init__(self, start_time=0.0):
+        self._time = start_time
+
+    def advance(self, seconds):
+        self._time += seconds
+
+    def time(self):
+        return self._time
+
+    def perf_counter(self):
+        return self._time
+
+    def monotonic(self):
+        return self._time
+
+    def sleep(self, seconds):
+        self._time += seconds
+
+
+class ScriptedInput:
+    """ Input of an input script, with the interface of InputPlayer """
+    def __init__(self, input_script):
+        self._input_script = input_script
+        self._frame = -1
+
+    def step(self):
+        """ Advance one frame and return the key presses of the frame as recorded events """
+        import PyQt5.QtCore as qtc
+        self._frame += 1
+        event_list = []
+        for first_frame, last_frame, key in self._input_script:
+            if first_frame <= self._frame <= last_frame:
+                if len(key) == 1:
+                    key_code, text = ord(key.upper()), key
+                else:
+                    # Named keys, e.g. "space" or "up"
+                    key_code, text = int(getattr(qtc.Qt, "Key_" + key.capitalize())), ""
+                event_list.append({"type": "key_press", "key": key_code, "text": text})
+        return event_list
+
+    def apply(self, gl_widget):
+        pass
+
+
+def deliver_event(window, gl_widget, event_dict):
+    """ Call the handler of a recorded event: key events go to the window, mouse events to the GL widget """
+    from extras.input_recorder import create_qt_event
+    handler = {
+        "key_press": window.keyPressEvent,
+        "key_release": window.keyReleaseEvent,
+        "mouse_press": gl_widget.mousePressEvent,
+        "mouse_release": gl_widget.mouseReleaseEvent,
+        "mouse_move": gl_widget.mouseMoveEvent,
+    }[event_dict["type"]]
+    handler(create_qt_event(event_dict))
+
+
+def replay_example(name, frames, timestep, input_source, size, gl_version):
+    """
+    Replay one example in this process and return its measurements;
+    the input source is a ScriptedInput or an InputPlayer
+    """
+    start_time = perf_counter()
+    # Selects the headless OpenGL platform before the example imports OpenGL
+    from core_ext.offscreen_context import OffscreenContext
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import OpenGL.GL as GL
+    import PyQt5.QtWidgets as qtw
+    from core.render_stats import RenderStats
+    from core_ext.renderer import Renderer
+
+    # The examples load their resources relative to the root of the package
+    os.chdir(package_dir)
+    context = OffscreenContext(*size, gl_version=gl_version)
+    Renderer.default_window_render_target = context.render_target
+    framebuffer_ref = context.render_target.framebuffer_ref
+
+    def bind_window():
+        # Qt binds the framebuffer of the widget and sets its viewport before calling initializeGL and paintGL
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, framebuffer_ref)
+        GL.glViewport(0, 0, *size)
+
+    application = qtw.QApplication.instance() or qtw.QApplication([sys.argv[0]])
+    context_time = perf_counter()
+    module = importlib.import_module(f"examples.{name}")
+    import_time = perf_counter()
+    if not hasattr(module, "MainWindow"):
+        raise Exception(f"Example {name} has no MainWindow")
+    clock = FixedClock()
+    module.time = clock
+    window = module.MainWindow()
+    widget = window.glWidget
+    widget.resize(*size)
+    window_time = perf_counter()
+    bind_window()
+    widget.initializeGL()
+    context.finish()
+    initialize_time = perf_counter()
+    stats = RenderStats(history_size=frames)
+    RenderStats.current = stats
+    cpu_time_list = []
+    frame_time_list = []
+    draw_call_list = []
+    first_frame_time = None
+    for frame in range(frames):
+        frame_start_time = perf_counter()
+        clock.advance(timestep)
+        for event_dict in input_source.step():
+            deliver_event(window, widget, event_dict)
+        input_source.apply(widget)
+        bind_window()
+        widget.paintGL()
+        cpu_end_time = perf_counter()
+        context.finish()
+        frame_end_time = perf_counter()
+        stats.end_frame()
+        if frame == 0:
+            # Includes the uploads and shader compilations deferred to the first frame
+            first_frame_time = frame_end_time - frame_start_time
+        cpu_time_list.append((cpu_end_time - frame_start_time) * 1000)
+        frame_time_list.append((frame_end_time - frame_start_time) * 1000)
+        draw_call_list.append(stats.last_frame["draw_calls"])
+    RenderStats.current = None
+    memory, peak_memory = get_memory()
+    window.close()
+    application.processEvents()
+    context.destroy()
+    return {
+        "example": name,
+        "frames": frames,
+        "startup_ms": {
+            "context": (context_time - start_time) * 1000,
+            "import": (import_time - context_time) * 1000,
+            "window": (window_time - import_time) * 1000,
+            "initialize": (initialize_time - window_time) * 1000,
+            "first_frame": first_frame_time * 1000 if first_frame_time is not None else None,
+            # Until the first frame is finished
+            "total": (initialize_time - start_time + (first_frame_time or 0)) * 1000,
+        },
+        "cpu_ms": summarize(cpu_time_list[1:]),
+        "frame_ms": summarize(frame_time_list[1:]),
+        "frame_times_ms": frame_time_list,
+        "draw_calls": float(np.mean(draw_call_list)) if draw_call_list else None,
+        "memory_mb": {"resident": memory, "peak": peak_memory},
+    }
+
+
+def run_child(arguments):
+    """ Replay the single example given on the command line; the result is the last line of the standard output """
+    size = tuple(int(value) for value in arguments.size.lower().split("x"))
+    gl_version = tuple(int(value) for value in arguments.gl_version.split("."))
+    name = arguments.example[0]
+    try:
+        input_source, frames = get_input_source(arguments)
+        # The examples print to the standard output
+        with contextlib.redirect_stdout(sys.stderr):
+            result = replay_example(name, frames, arguments.timestep, input_source, size, gl_version)
+    except Exception as exception:
+        result = {"example": name, "error": f"{type(exception).__name__}: {exception}"}
+    print(json.dumps(result))
+
+
+def get_input_source(arguments):
+    """ Return the input source selected by the arguments and the number of frames to render """
+    if arguments.recording:
+        from extras.input_recorder import InputPlayer
+        player = InputPlayer.load(arguments.recording, arguments.timestep)
+        return player, arguments.frames or player.frame_count
+    input_script = DEFAULT_INPUT_SCRIPT
+    if arguments.input:
+        with open(arguments.input) as input_file:
+            input_script = json.load(input_file)
+    return ScriptedInput(input_script), arguments.frames or 300
+
+
+def main(argument_list=None):
+    arguments = parse_arguments(argument_list)
+    if arguments.child:
+        run_child(arguments)
+        return
+    name_list = arguments.example or get_example_names()
+    result_list = []
+    for name in name_list:
+        print(name, file=sys.stderr)
+        command = [sys.executable, os.path.abspath(__file__), "--child", "--example", name,
+                   "--timestep", str(arguments.timestep), "--size", arguments.size,
+                   "--gl-version", arguments.gl_version]
+        if arguments.frames:
+            command += ["--frames", str(arguments.frames)]
+        if arguments.input:
+            command += ["--input", os.path.abspath(arguments.input)]
+        if arguments.recording:
+            command += ["--recording", os.path.abspath(arguments.recording)]
+        try:
+            process = subprocess.run(command, stdout=subprocess.PIPE, timeout=arguments.timeout, text=True)
+            output_line_list = process.stdout.strip().splitlines()
+            if output_line_list:
+                result = json.loads(output_line_list[-1])
+            else:
+                result = {"example": name, "error": f"exited with code {process.returncode}"}
+        except subprocess.TimeoutExpired:
+            result = {"example": name, "error": f"timed out after {arguments.timeout} s"}
+        if "error" in result:
+            print(f"  {result['error']}", file=sys.stderr)
+        result_list.append(result)
+    report = {
+        "environment": {
+            "size": arguments.size,
+            "frames": arguments.frames,
+            "timestep": arguments.timestep,
+            "input": arguments.input,
+            "recording": arguments.recording,
+        },
+        "results": result_list,
+    }
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Run the synthetic scene workloads headlessly and write their timings as JSON:
+
+    $ python benchmarks/run_benchmarks.py --frames 300 --output results.json
+    $ python benchmarks/run_benchmarks.py --workload shadows --workload postprocessing
+    $ python benchmarks/run_benchmarks.py --mock
+
+Each workload is rendered into a framebuffer object of an offscreen context (EGL or OSMesa, see
+core_ext/offscreen_context.py); with --mock, the GL calls go to the recording mock backend
+instead, which measures the CPU cost of the framework alone.
+Each workload runs in a process of its own, so that its memory and timings do not depend on
+the resources left behind by the workloads before it.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+from time import perf_counter
+
+import numpy as np
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, package_dir)
+
+
+def parse_arguments(argument_list=None):
+    parser = argparse.ArgumentParser(description="Render synthetic scenes headlessly and report their cost as JSON")
+    parser.add_argument("--frames", type=int, default=300, help="measured frames per workload")
+    parser.add_argument("--warmup", type=int, default=30,
+                        help="frames rendered before measuring (shader compilation, first uploads)")
+    parser.add_argument("--size", default="800x600", help="resolution as WIDTHxHEIGHT")
+    parser.add_argument("--workload", action="append",
+                        help="run only the default workloads of this name (may be repeated)")
+    parser.add_argument("--output", help="JSON file to write (default: standard output)")
+    parser.add_argument("--mock", action="store_true", help="use the mock GL backend instead of an offscreen context")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds after which a workload is stopped")
+    # Index into the default suite of the workload run by a child process
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argument_list)
+
+
+def get_memory():
+    """ Return (resident, peak resident) memory of the process in megabytes """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    peak = peak / 1024 if sys.platform != "darwin" else peak / 1024 ** 2
+    try:
+        with open("/proc/self/statm") as statm_file:
+            resident = int(statm_file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except OSError:
+        resident = peak
+    return resident, peak
+
+
+def summarize(value_list):
+    """ Return mean, median, 95th percentile and maximum of a list of milliseconds """
+    if not value_list:
+        return None
+    return {
+        "mean": float(np.mean(value_list)),
+        "median": float(np.median(value_list)),
+        "p95": float(np.percentile(value_list, 95)),
+        "max": float(np.max(value_list)),
+    }
+
+
+def run_workload(name, parameter_dict, window_size, window_render_target, frames, warmup, finish):
+    """ Build a workload with a renderer of its own, render warmup + frames frames and return its measurements """
+    # Imported after the GL backend has been selected
+    from core_ext.renderer import Renderer
+    from benchmarks.workloads import WORKLOAD_DICT
+
+    memory_before, peak_before = get_memory()
+    start_time = perf_counter()
+    renderer = Renderer(window_size=window_size, window_render_target=window_render_target)
+    workload = WORKLOAD_DICT[name](renderer, **parameter_dict)
+    setup_time = (perf_counter() - start_time) * 1000
+    renderer.enable_stats(history_size=frames)
+    renderer.enable_gpu_timer(history_size=frames)
+    cpu_time_list = []
+    frame_time_list = []
+    counter_list = []
+    for frame in range(warmup + frames):
+        if frame == warmup:
+            # Measurements of the warmup frames are dropped
+            renderer.gpu_timer.collect()
+            renderer.gpu_timer.reset()
+        start_time = perf_counter()
+        workload.update(frame)
+        workload.render()
+        render_end_time = perf_counter()
+        # The frame is finished once the GPU has executed it
+        finish()
+        end_time = perf_counter()
+        renderer.stats.end_frame()
+        if frame >= warmup:
+            cpu_time_list.append((render_end_time - start_time) * 1000)
+            frame_time_list.append((end_time - start_time) * 1000)
+            counter_list.append(renderer.stats.last_frame)
+    finish()
+    renderer.gpu_timer.collect()
+    memory_after, peak_after = get_memory()
+    renderer.disable_stats()
+    return {
+        "workload": name,
+        "parameters": parameter_dict,
+        "setup_ms": setup_time,
+        "cpu_ms": summarize(cpu_time_list),
+        "frame_ms": summarize(frame_time_list),
+        "gpu_ms": get_gpu_time(renderer.gpu_timer),
+        "gpu_sections_ms": {path: average for path, (average, median, p95, maximum)
+                            in renderer.gpu_timer.get_summary().items()},
+        "cpu_phases_ms": {phase: float(np.mean([counters["phase_times"].get(phase, 0.0)
+                                                for counters in counter_list]))
+                          for phase in counter_list[-1]["phase_times"]},
+        "counters": {counter_name: float(np.mean([counters[counter_name] for counters in counter_list]))
+                     for counter_name in ("draw_calls", "triangles", "vertices", "program_switches",
+                                          "texture_binds", "uniform_uploads", "buffer_bytes", "drawn_meshes")},
+        "memory_mb": {"resident": memory_after, "resident_growth": memory_after - memory_before,
+                      "peak": peak_after, "peak_growth": peak_after - peak_before},
+    }
+
+
+def get_gpu_time(gpu_timer):
+    """ Return the average GPU milliseconds of a frame: the sum of the outermost sections """
+    summary = gpu_timer.get_summary()
+    top_level_list = [average for path, (average, median, p95, maximum) in summary.items() if "/" not in path]
+    if not top_level_list:
+        return None
+    return sum(top_level_list)
+
+
+def run_child(arguments):
+    """ Run the workload of the default suite given on the command line; the result is the last line of the standard output """
+    width, height = (int(value) for value in arguments.size.lower().split("x"))
+    if arguments.mock:
+        from core.mock_gl import MockGL
+        mock_gl = MockGL.install()
+        # The recorded commands are not needed
+        mock_gl.recording = False
+        from core_ext.render_target import RenderTarget
+        context = None
+        window_render_target = RenderTarget(resolution=(width, height))
+        finish = lambda: None
+        renderer_name = "mock"
+    else:
+        # Selects the headless OpenGL platform before the framework imports OpenGL
+        from core_ext.offscreen_context import OffscreenContext
+        import OpenGL.GL as GL
+        context = OffscreenContext(width, height)
+        window_render_target = context.render_target
+        finish = context.finish
+        renderer_name = GL.glGetString(GL.GL_RENDERER).decode()
+    from benchmarks.workloads import DEFAULT_SUITE
+
+    name, parameter_dict = DEFAULT_SUITE[arguments.child]
+    try:
+        # The framework prints to the standard output
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_workload(name, parameter_dict, (width, height), window_render_target,
+                                  arguments.frames, arguments.warmup, finish)
+        if arguments.mock:
+            # Timestamps of the mock backend are made up
+            result["gpu_ms"] = None
+            result["gpu_sections_ms"] = {}
+    except Exception as exception:
+        result = {"workload": name, "parameters": parameter_dict, "error": f"{type(exception).__name__}: {exception}"}
+    result["renderer"] = renderer_name
+    if context is not None:
+        context.destroy()
+    print(json.dumps(result))
+
+
+def main(argument_list=None):
+    arguments = parse_arguments(argument_list)
+    if arguments.child is not None:
+        run_child(arguments)
+        return
+    from benchmarks.workloads import DEFAULT_SUITE, WORKLOAD_DICT
+
+    for name in arguments.workload or []:
+        if name not in WORKLOAD_DICT:
+            raise Exception(f"Unknown workload: {name} (available: {', '.join(WORKLOAD_DICT)})")
+    result_list = []
+    renderer_name = None
+    for index, (name, parameter_dict) in enumerate(DEFAULT_SUITE):
+        if arguments.workload and name not in arguments.workload:
+            continue
+        print(f"{name} {parameter_dict}", file=sys.stderr)
+        command = [sys.executable, os.path.abspath(__file__), "--child", str(index),
+                   "--frames", str(arguments.frames), "--warmup", str(arguments.warmup), "--size", arguments.size]
+        if arguments.mock:
+            command.append("--mock")
+        try:
+            process = subprocess.run(command, stdout=subprocess.PIPE, timeout=arguments.timeout, text=True)
+            output_line_list = process.stdout.strip().splitlines()
+            if output_line_list:
+                result = json.loads(output_line_list[-1])
+            else:
+                result = {"workload": name, "parameters": parameter_dict,
+                          "error": f"exited with code {process.returncode}"}
+        except subprocess.TimeoutExpired:
+            result = {"workload": name, "parameters": parameter_dict,
+                      "error": f"timed out after {arguments.timeout} s"}
+        if "error" in result:
+            print(f"  {result['error']}", file=sys.stderr)
+        renderer_name = result.pop("renderer", renderer_name)
+        result_list.append(result)
+    width, height = (int(value) for value in arguments.size.lower().split("x"))
+    report = {
+        "environment": {
+            "renderer": renderer_name,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "size": [width, height],
+            "frames": arguments.frames,
+            "warmup": arguments.warmup,
+        },
+        "results": result_list,
+    }
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import math
+
+import numpy as np
+
+from core_ext.camera import Camera
+from core_ext.group import Group
+from core_ext.mesh import Mesh
+from core_ext.scene import Scene
+from effects.bright_filter import BrightFilterEffect
+from effects.color_reduce import ColorReduceEffect
+from effects.horizontal_blur import HorizontalBlurEffect
+from effects.invert import InvertEffect
+from effects.pixelate import PixelateEffect
+from effects.tint import TintEffect
+from effects.vertical_blur import VerticalBlurEffect
+from effects.vignette import VignetteEffect
+from extras.postprocessor import Postprocessor
+from geometry.box import BoxGeometry
+from geometry.rectangle import RectangleGeometry
+from geometry.sphere import SphereGeometry
+from light.ambient import AmbientLight
+from light.directional import DirectionalLight
+from light.point import PointLight
+from material.lambert import LambertMaterial
+from material.phong import PhongMaterial
+
+
+class Workload:
+    """
+    Procedurally built scene driven by the benchmark runner: update(frame) animates it deterministically,
+    render() draws one frame. The camera orbits the origin once every ORBIT_FRAMES frames.
+    """
+    ORBIT_FRAMES = 240
+
+    def __init__(self, renderer, scene, camera, orbit_radius, orbit_height, postprocessor=None):
+        self._renderer = renderer
+        self._scene = scene
+        self._camera = camera
+        self._orbit_radius = orbit_radius
+        self._orbit_height = orbit_height
+        self._postprocessor = postprocessor
+        # Functions called with the frame index before the camera is moved
+        self._animation_list = []
+
+    @property
+    def scene(self):
+        return self._scene
+
+    @property
+    def camera(self):
+        return self._camera
+
+    def add_animation(self, animation):
+        self._animation_list.append(animation)
+
+    def update(self, frame):
+        for animation in self._animation_list:
+            animation(frame)
+        angle = 2 * math.pi * frame / self.ORBIT_FRAMES
+        self._camera.set_position([self._orbit_radius * math.sin(angle), self._orbit_height,
+                                   self._orbit_radius * math.cos(angle)])
+        self._camera.look_at([0, 0, 0])
+
+    def render(self):
+        if self._postprocessor is None:
+            self._renderer.render(self._scene, self._camera)
+        else:
+            self._postprocessor.render()
+
+
+def _create_scene(renderer, extent):
+    """ Return a scene lit by an ambient and a directional light, and a camera orbiting a region of the given extent """
+    width, height = renderer.window_size
+    scene = Scene()
+    camera = Camera(aspect_ratio=width / height, far=extent * 10)
+    scene.add(AmbientLight(color=[0.2, 0.2, 0.2]))
+    directional_light = DirectionalLight(color=[0.8, 0.8, 0.8], direction=[-1, -1, -0.5])
+    scene.add(directional_light)
+    return scene, camera, directional_light
+
+
+def _create_geometry(geometry_name):
+    if geometry_name == "box":
+        return BoxGeometry()
+    if geometry_name == "sphere":
+        return SphereGeometry(radius=0.5)
+    raise Exception(f"Unknown benchmark geometry: {geometry_name}")
+
+
+def _get_grid_positions(count, spacing, rng):
+    """ Return count positions on a square grid in the plane y = 0, jittered by a seeded random generator """
+    side = math.ceil(math.sqrt(count))
+    position_list = []
+    for index in range(count):
+        x = (index % side - (side - 1) / 2) * spacing
+        z = (index // side - (side - 1) / 2) * spacing
+        jitter = rng.uniform(-0.25, 0.25, 2) * spacing
+        position_list.append([x + jitter[0], 0.5, z + jitter[1]])
+    return position_list
+
+
+def build_meshes(renderer, count=1000, geometry="box", material_count=4, seed=0):
+    """ count meshes sharing one geometry and material_count Lambert materials, spread on a grid """
+    rng = np.random.default_rng(seed)
+    extent = math.sqrt(count) * 2
+    scene, camera, directional_light = _create_scene(renderer, extent)
+    shared_geometry = _create_geometry(geometry)
+    material_list = [LambertMaterial(number_of_light_sources=2, property_dict={"baseColor": rng.uniform(0.3, 1, 3)})
+                     for n in range(material_count)]
+    for index, position in enumerate(_get_grid_positions(count, 2, rng)):
+        mesh = Mesh(shared_geometry, material_list[index % material_count])
+        mesh.set_position(position)
+        scene.add(mesh)
+    return Workload(renderer, scene, camera, orbit_radius=extent * 0.75, orbit_height=extent * 0.4)
+
+
+def build_hierarchy(renderer, depth=6, branching=3, geometry="box", seed=0):
+    """
+    Tree of Group nodes, depth levels deep with branching children per node and a mesh at every leaf;
+    the groups of every level rotate, so that the global matrices of all leaves change in each frame
+    """
+    rng = np.random.default_rng(seed)
+    extent = 3.0 * branching
+    scene, camera, directional_light = _create_scene(renderer, extent)
+    shared_geometry = _create_geometry(geometry)
+    material = LambertMaterial(number_of_light_sources=2, property_dict={"baseColor": [0.4, 0.7, 1.0]})
+    group_list = []
+    root = Group()
+    scene.add(root)
+    parent_list = [root]
+    for level in range(depth):
+        child_list = []
+        # Children of deeper levels are placed closer to their parent
+        offset = extent / 2 ** (level + 1)
+        for parent in parent_list:
+            for index in range(branching):
+                angle = 2 * math.pi * index / branching
+                child = Group()
+                child.set_position([offset * math.cos(angle), rng.uniform(-0.1, 0.1) * offset,
+                                    offset * math.sin(angle)])
+                parent.add(child)
+                child_list.append(child)
+        group_list.extend(child_list)
+        parent_list = child_list
+    leaf_scale = extent / 2 ** (depth + 1)
+    for leaf in parent_list:
+        mesh = Mesh(shared_geometry, material)
+        mesh.scale(leaf_scale)
+        leaf.add(mesh)
+    workload = Workload(renderer, scene, camera, orbit_radius=extent * 1.5, orbit_height=extent * 0.75)
+    workload.add_animation(lambda frame: [group.rotate_y(0.01) for group in group_list])
+    return workload
+
+
+def build_point_lights(renderer, light_count=64, mesh_count=400, clustered=False, seed=0):
+    """ light_count moving colored point lights above a floor covered by Phong spheres """
+    rng = np.random.default_rng(seed)
+    extent = math.sqrt(mesh_count) * 2
+    scene, camera, directional_light = _create_scene(renderer, extent)
+    if clustered:
+        renderer.enable_clustered_lighting()
+    material = PhongMaterial(number_of_light_sources=8, use_clustered_lighting=clustered)
+    floor = Mesh(RectangleGeometry(width=extent * 1.5, height=extent * 1.5), material)
+    floor.rotate_x(-math.pi / 2)
+    scene.add(floor)
+    shared_geometry = SphereGeometry(radius=0.5)
+    for position in _get_grid_positions(mesh_count, 2, rng):
+        mesh = Mesh(shared_geometry, material)
+        mesh.set_position(position)
+        scene.add(mesh)
+    light_list = []
+    for n in range(light_count):
+        color = rng.uniform(0.2, 1, 3)
+        position = [rng.uniform(-0.5, 0.5) * extent, rng.uniform(0.5, 2), rng.uniform(-0.5, 0.5) * extent]
+        light = PointLight(color=color, position=position, attenuation=(1, 0.5, 0.5))
+        scene.add(light)
+        light_list.append((light, position, rng.uniform(0, 2 * math.pi)))
+    workload = Workload(renderer, scene, camera, orbit_radius=extent * 0.75, orbit_height=extent * 0.4)
+
+    def move_lights(frame):
+        for light, position, phase in light_list:
+            light.set_position([position[0] + math.sin(frame * 0.05 + phase), position[1],
+                                position[2] + math.cos(frame * 0.05 + phase)])
+    workload.add_animation(move_lights)
+    return workload
+
+
+def build_shadows(renderer, mesh_count=200, shadow="directional", moving_light=True, seed=0):
+    """
+    Phong meshes on a floor with shadows of a directional light ("directional" or "cascaded")
+    or of a point light ("point"); the light moves in each frame unless moving_light is False
+    """
+    rng = np.random.default_rng(seed)
+    extent = math.sqrt(mesh_count) * 2
+    scene, camera, directional_light = _create_scene(renderer, extent)
+    if shadow == "directional":
+        directional_light.set_position([0, extent, 0])
+        renderer.enable_shadows(directional_light, resolution=(2048, 2048))
+        renderer.shadow_object.camera.set_orthographic(-extent, extent, -extent, extent, 0, extent * 3)
+        material = PhongMaterial(number_of_light_sources=2, use_shadow=True)
+        shadow_light = directional_light
+    elif shadow == "cascaded":
+        renderer.enable_cascaded_shadows(directional_light, max_distance=extent * 2)
+        material = PhongMaterial(number_of_light_sources=2, use_cascaded_shadow=True)
+        shadow_light = directional_light
+    elif shadow == "point":
+        shadow_light = PointLight(position=[0, 3, 0], attenuation=(1, 0, 0.02))
+        scene.add(shadow_light)
+        renderer.enable_point_shadows(shadow_light, far=extent * 2)
+        material = PhongMaterial(number_of_light_sources=3, use_point_shadow=True)
+    else:
+        raise Exception(f"Unknown benchmark shadow type: {shadow}")
+    floor = Mesh(RectangleGeometry(width=extent * 1.5, height=extent * 1.5), material)
+    floor.rotate_x(-math.pi / 2)
+    scene.add(floor)
+    geometry_list = [BoxGeometry(), SphereGeometry(radius=0.5)]
+    for index, position in enumerate(_get_grid_positions(mesh_count, 2, rng)):
+        mesh = Mesh(geometry_list[index % 2], material)
+        mesh.set_position(position)
+        scene.add(mesh)
+    workload = Workload(renderer, scene, camera, orbit_radius=extent * 0.75, orbit_height=extent * 0.4)
+    if moving_light:
+        # Changes of the light invalidate the cached shadow maps
+        workload.add_animation(lambda frame: shadow_light.rotate_y(0.01, False))
+    return workload
+
+
+# Effects of the postprocessing workload, created for a given resolution
+EFFECT_DICT = {
+    "tint": lambda size: TintEffect(tint_color=(1, 0.8, 0.6)),
+    "invert": lambda size: InvertEffect(),
+    "pixelate": lambda size: PixelateEffect(resolution=size),
+    "color_reduce": lambda size: ColorReduceEffect(),
+    "vignette": lambda size: VignetteEffect(),
+    "bright_filter": lambda size: BrightFilterEffect(),
+    "horizontal_blur": lambda size: HorizontalBlurEffect(texture_size=size),
+    "vertical_blur": lambda size: VerticalBlurEffect(texture_size=size),
+}
+
+
+def build_postprocessing(renderer, effect_list=("bright_filter", "horizontal_blur", "vertical_blur", "vignette"),
+                         mesh_count=100, seed=0):
+    """ A meshes scene rendered through a chain of effects from effects/ """
+    workload = build_meshes(renderer, count=mesh_count, seed=seed)
+    postprocessor = Postprocessor(renderer, workload.scene, workload.camera)
+    for effect_name in effect_list:
+        if effect_name not in EFFECT_DICT:
+            raise Exception(f"Unknown benchmark effect: {effect_name}")
+        postprocessor.add_effect(EFFECT_DICT[effect_name](renderer.window_size))
+    workload._postprocessor = postprocessor
+    return workload
+
+
+# Workload name -> function building it from a renderer and keyword parameters
+WORKLOAD_DICT = {
+    "meshes": build_meshes,
+    "hierarchy": build_hierarchy,
+    "point_lights": build_point_lights,
+    "shadows": build_shadows,
+    "postprocessing": build_postprocessing,
+}
+
+# (workload name, parameters) run by default
+DEFAULT_SUITE = [
+    ("meshes", {"count": 100, "geometry": "box"}),
+    ("meshes", {"count": 1000, "geometry": "box"}),
+    ("meshes", {"count": 1000, "geometry": "sphere"}),
+    ("hierarchy", {"depth": 6, "branching": 3}),
+    ("point_lights", {"light_count": 16, "clustered": False}),
+    ("point_lights", {"light_count": 256, "clustered": True}),
+    ("shadows", {"mesh_count": 200, "shadow": "directional"}),
+    ("shadows", {"mesh_count": 200, "shadow": "cascaded"}),
+    ("shadows", {"mesh_count": 200, "shadow": "point"}),
+    ("postprocessing", {}),
+]
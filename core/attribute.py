@@ -1,6 +1,9 @@
 import OpenGL.GL as GL
 import numpy as np
 
+from core.render_stats import RenderStats
+from core.tracer import Tracer
+
 
 class Attribute:
     def __init__(self, data_type, data):
@@ -17,12 +20,19 @@ class Attribute:
     def data(self):
         return self._data
 
+    @property
+    def data_type(self):
+        return self._data_type
+
     @data.setter
     def data(self, data):
         self._data = data
 
     def upload_data(self):
         """ Upload the data to a GPU buffer """
+        tracer = Tracer.current
+        if tracer is not None:
+            tracer.begin("Attribute.upload_data", "buffer")
         # Convert data to numpy array format; convert numbers to 32-bit floats
         data = np.array(self._data).astype(np.float32)
         # Select buffer used by the following functions
@@ -32,6 +42,10 @@ class Attribute:
         # print(size_in_bytes)
         # print(type(data.ravel()))
         GL.glBufferData(GL.GL_ARRAY_BUFFER, data.nbytes, data.ravel(), GL.GL_STATIC_DRAW)
+        if RenderStats.current is not None:
+            RenderStats.current.buffer_bytes += data.nbytes
+        if tracer is not None:
+            tracer.end("Attribute.upload_data", "buffer")
 
     def associate_variable(self, program_ref, variable_name):
         """ Associate variable in program with the buffer """
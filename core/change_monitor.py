@@ -0,0 +1,61 @@
+class ChangeMonitor:
+    """
+    Collects the reports of changes which need a redraw: transformations and hierarchy changes of scene objects
+    (including cameras and lights), uniform values and render settings of materials, and running animations.
+    The framework classes report to the current monitor (see activate); with no current monitor
+    the cost is a single attribute test. Values changed in place (e.g. uniform.data[0] = ...) are not
+    noticed; code doing so calls report_change(), and continuous animations are announced with start_animation.
+    The callback is called when the first change after clear() is reported, e.g. to schedule a frame
+    (see FrameScheduler).
+    """
+    # Monitor receiving the reports of the framework classes (None: nothing is reported)
+    current = None
+
+    def __init__(self, callback=None):
+        self._callback = callback
+        # The first frame is always drawn
+        self._changed = True
+        self._change_count = 0
+        # Keys of the running animations
+        self._animation_set = set()
+
+    @property
+    def changed(self):
+        """ True if a change was reported since the last clear() or an animation is running """
+        return self._changed or bool(self._animation_set)
+
+    @property
+    def animating(self):
+        return bool(self._animation_set)
+
+    @property
+    def change_count(self):
+        """ Number of changes reported so far """
+        return self._change_count
+
+    def activate(self):
+        """ Make this monitor receive the reports of the framework classes """
+        ChangeMonitor.current = self
+
+    def deactivate(self):
+        if ChangeMonitor.current is self:
+            ChangeMonitor.current = None
+
+    def report_change(self):
+        self._change_count += 1
+        if not self._changed:
+            self._changed = True
+            if self._callback is not None:
+                self._callback()
+
+    def start_animation(self, key):
+        """ Redraw continuously until stop_animation is called with the same key """
+        self._animation_set.add(key)
+        self.report_change()
+
+    def stop_animation(self, key):
+        self._animation_set.discard(key)
+
+    def clear(self):
+        """ Forget the reported changes, e.g. after a frame has been drawn """
+        self._changed = False
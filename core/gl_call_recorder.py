@@ -0,0 +1,189 @@
+import sys
+from collections import Counter
+from time import perf_counter
+
+import OpenGL.GL as GL
+import numpy as np
+
+
+class GLCallRecorder:
+    """
+    Counts and times the OpenGL calls of the framework and detects redundant state changes
+    (binding the bound program or texture, uploading the uniform value a program already has, ...).
+    While enabled, the GL module referenced by the framework modules is replaced by a recording proxy;
+    disabling restores the original module, so the recorder costs nothing when it is off.
+    Only modules imported before enable() are instrumented.
+    end_frame() must be called once per frame to finish the counters of a frame (see report).
+    """
+    # Functions setting state: name -> number of leading arguments identifying the state;
+    # the remaining arguments are the value, a call with the current value is redundant
+    STATE_FUNCTION_DICT = {
+        "glUseProgram": 0,
+        "glActiveTexture": 0,
+        "glBindVertexArray": 0,
+        "glBindBuffer": 1,
+        "glBindFramebuffer": 1,
+        "glViewport": 0,
+        "glScissor": 0,
+        "glPolygonMode": 1,
+        "glLineWidth": 0,
+        "glPointSize": 0,
+        "glBlendFunc": 0,
+        "glDepthMask": 0,
+        "glDepthFunc": 0,
+        "glColorMask": 0,
+        "glClearColor": 0,
+    }
+
+    def __init__(self, package_list=("core", "core_ext")):
+        # Modules of these packages get the recording proxy
+        self._package_list = tuple(package_list)
+        self._proxy = _GLProxy(self)
+        # module -> original GL module, while enabled
+        self._patched_module_dict = {}
+        # Counters of the current frame
+        self._call_counter = Counter()
+        self._redundant_counter = Counter()
+        # function name -> seconds
+        self._time_dict = {}
+        # Counters of the last finished frame
+        self._last_frame = (Counter(), Counter(), {})
+        # Tracked values of the state functions, of the texture bindings and of the uniforms
+        self._state_dict = {}
+        self._program_ref = None
+        self._active_texture = GL.GL_TEXTURE0
+        self._frame_count = 0
+
+    @property
+    def enabled(self):
+        return bool(self._patched_module_dict)
+
+    @property
+    def frame_count(self):
+        return self._frame_count
+
+    @property
+    def last_frame_calls(self):
+        """ {function name: number of calls} of the last finished frame """
+        return dict(self._last_frame[0])
+
+    @property
+    def last_frame_redundant_calls(self):
+        """ {function name: number of calls that did not change the state} of the last finished frame """
+        return dict(self._last_frame[1])
+
+    @property
+    def last_frame_times(self):
+        """ {function name: milliseconds spent in the calls} of the last finished frame """
+        return {name: seconds * 1000 for name, seconds in self._last_frame[2].items()}
+
+    def enable(self):
+        """ Start recording the GL calls of the framework modules imported so far """
+        if self.enabled:
+            return
+        for module_name, module in list(sys.modules.items()):
+            if module is None or module_name.split(".")[0] not in self._package_list:
+                continue
+            # The proxy itself calls the original module
+            if module_name == __name__:
+                continue
+            if getattr(module, "GL", None) is GL:
+                self._patched_module_dict[module] = GL
+                module.GL = self._proxy
+        # The state set before recording is unknown
+        self._state_dict = {}
+        self._program_ref = None
+
+    def disable(self):
+        """ Stop recording; the framework modules call the GL functions directly again """
+        for module, gl_module in self._patched_module_dict.items():
+            module.GL = gl_module
+        self._patched_module_dict = {}
+
+    def end_frame(self):
+        """ Keep the counters of the finished frame and reset them for the next one """
+        self._last_frame = (self._call_counter, self._redundant_counter, self._time_dict)
+        self._call_counter = Counter()
+        self._redundant_counter = Counter()
+        self._time_dict = {}
+        self._frame_count += 1
+
+    def report(self, top=10):
+        """ Return a description of the most frequent, redundant and expensive calls of the last finished frame """
+        call_counter, redundant_counter, time_dict = self._last_frame
+        line_list = [f"{sum(call_counter.values())} GL calls, {sum(redundant_counter.values())} redundant"]
+        line_list.append("most frequent:")
+        for name, count in call_counter.most_common(top):
+            line_list.append(f"  {name}: {count}")
+        if redundant_counter:
+            line_list.append("most redundant:")
+            for name, count in redundant_counter.most_common(top):
+                line_list.append(f"  {name}: {count} of {call_counter[name]}")
+        line_list.append("most expensive:")
+        for name, seconds in sorted(time_dict.items(), key=lambda x: -x[1])[:top]:
+            line_list.append(f"  {name}: {seconds * 1000:.3f} ms in {call_counter[name]} calls")
+        return "\n".join(line_list)
+
+    def record(self, name, function, args):
+        """ Call a GL function, counting and timing it; called by the proxy """
+        self._call_counter[name] += 1
+        if self._is_redundant(name, args):
+            self._redundant_counter[name] += 1
+        start_time = perf_counter()
+        result = function(*args)
+        self._time_dict[name] = self._time_dict.get(name, 0.0) + perf_counter() - start_time
+        return result
+
+    def _is_redundant(self, name, args):
+        """ Compare the state set by a call with the tracked state and update the tracked state """
+        if name in self.STATE_FUNCTION_DICT:
+            key_length = self.STATE_FUNCTION_DICT[name]
+            key = (name,) + tuple(args[:key_length])
+            value = _freeze(args[key_length:])
+            if name == "glUseProgram":
+                self._program_ref = args[0]
+            elif name == "glActiveTexture":
+                self._active_texture = args[0]
+        elif name in ("glEnable", "glDisable"):
+            key = ("capability", args[0])
+            value = name == "glEnable"
+        elif name == "glBindTexture":
+            key = ("texture", self._active_texture, args[0])
+            value = args[1]
+        elif name.startswith("glUniform"):
+            # Uniform values belong to the program in use
+            key = ("uniform", self._program_ref, args[0])
+            value = _freeze(args[1:])
+        else:
+            return False
+        redundant = key in self._state_dict and self._state_dict[key] == value
+        self._state_dict[key] = value
+        return redundant
+
+
+class _GLProxy:
+    """ Stands in for the OpenGL.GL module: gl functions are wrapped by the recorder, other names pass through """
+    def __init__(self, recorder):
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        attribute = getattr(GL, name)
+        if name.startswith("gl") and callable(attribute):
+            recorder = self._recorder
+            function = attribute
+
+            def recorded_function(*args):
+                return recorder.record(name, function, args)
+            attribute = recorded_function
+        # Later lookups of the name do not reach __getattr__
+        setattr(self, name, attribute)
+        return attribute
+
+
+def _freeze(value):
+    """ Return a comparable copy of GL call arguments (arrays and lists become bytes and tuples) """
+    if isinstance(value, np.ndarray):
+        return value.dtype.str, value.shape, value.tobytes()
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(element) for element in value)
+    return value
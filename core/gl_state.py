@@ -0,0 +1,211 @@
+import OpenGL.GL as GL
+import numpy as np
+
+from core.render_stats import RenderStats
+
+
+class GLState:
+    """
+    Shadow copy of the OpenGL render state changed by the framework.
+    Every setter issues a GL call only when the requested value differs from the tracked one.
+    Unknown values (None) are always set, so the first call after invalidate() reaches the driver.
+    Call invalidate() after code outside of the framework has changed the state,
+    and reset() when a new OpenGL context is made current (the Renderer and OffscreenContext do so).
+    Set GLState.debug to True to compare the tracked values with glGet queries on every call.
+    """
+    debug = False
+
+    # capability (GL_CULL_FACE, GL_BLEND, ...) -> bool
+    _capability_dict = {}
+    _polygon_mode = None
+    _line_width = None
+    _point_size = None
+    # (source factor, destination factor)
+    _blend_func = None
+    _depth_mask = None
+    _depth_func = None
+    _color_mask = None
+    _active_texture_unit = None
+    # (texture unit, target) -> texture reference
+    _texture_binding_dict = {}
+    _program_ref = None
+    # Functions called by reset() to forget the objects of the previous context cached elsewhere (e.g. programs)
+    _reset_callback_list = []
+
+    # glGet parameter names used by the debug mode for each texture target
+    _TEXTURE_BINDING_QUERY = {
+        GL.GL_TEXTURE_2D: GL.GL_TEXTURE_BINDING_2D,
+        GL.GL_TEXTURE_2D_ARRAY: GL.GL_TEXTURE_BINDING_2D_ARRAY,
+        GL.GL_TEXTURE_CUBE_MAP: GL.GL_TEXTURE_BINDING_CUBE_MAP,
+        GL.GL_TEXTURE_BUFFER: GL.GL_TEXTURE_BINDING_BUFFER,
+    }
+
+    @classmethod
+    def invalidate(cls):
+        """ Forget all tracked values; the next call of each setter reaches the driver """
+        cls._capability_dict = {}
+        cls._polygon_mode = None
+        cls._line_width = None
+        cls._point_size = None
+        cls._blend_func = None
+        cls._depth_mask = None
+        cls._depth_func = None
+        cls._color_mask = None
+        cls._active_texture_unit = None
+        cls._texture_binding_dict = {}
+        cls._program_ref = None
+
+    @classmethod
+    def add_reset_callback(cls, callback):
+        cls._reset_callback_list.append(callback)
+
+    @classmethod
+    def reset(cls):
+        """
+        Forget everything tied to the previous OpenGL context: the tracked state and, through the reset callbacks,
+        the shared programs and uniform locations, whose handles are invalid in a new context
+        """
+        cls.invalidate()
+        for callback in cls._reset_callback_list:
+            callback()
+
+    @classmethod
+    def set_capability(cls, capability, enabled):
+        """ Enable or disable a server-side capability such as GL_CULL_FACE or GL_BLEND """
+        enabled = bool(enabled)
+        tracked = cls._capability_dict.get(capability)
+        if cls.debug:
+            cls._validate(f"capability {capability}", tracked, bool(GL.glIsEnabled(capability)))
+        if tracked != enabled:
+            if enabled:
+                GL.glEnable(capability)
+            else:
+                GL.glDisable(capability)
+            cls._capability_dict[capability] = enabled
+
+    @classmethod
+    def enable(cls, capability):
+        cls.set_capability(capability, True)
+
+    @classmethod
+    def disable(cls, capability):
+        cls.set_capability(capability, False)
+
+    @classmethod
+    def polygon_mode(cls, mode):
+        """ Set the rasterization mode (GL_FILL | GL_LINE | GL_POINT) of both faces """
+        if cls.debug:
+            cls._validate("polygon mode", cls._polygon_mode, cls._get_integer(GL.GL_POLYGON_MODE))
+        if cls._polygon_mode != mode:
+            GL.glPolygonMode(GL.GL_FRONT_AND_BACK, mode)
+            cls._polygon_mode = mode
+
+    @classmethod
+    def line_width(cls, width):
+        if cls.debug:
+            cls._validate("line width", cls._line_width, cls._get_float(GL.GL_LINE_WIDTH))
+        if cls._line_width != width:
+            GL.glLineWidth(width)
+            cls._line_width = width
+
+    @classmethod
+    def point_size(cls, size):
+        if cls.debug:
+            cls._validate("point size", cls._point_size, cls._get_float(GL.GL_POINT_SIZE))
+        if cls._point_size != size:
+            GL.glPointSize(size)
+            cls._point_size = size
+
+    @classmethod
+    def blend_func(cls, source_factor, destination_factor):
+        blend_func = (source_factor, destination_factor)
+        if cls.debug:
+            actual = (cls._get_integer(GL.GL_BLEND_SRC_RGB), cls._get_integer(GL.GL_BLEND_DST_RGB))
+            cls._validate("blend function", cls._blend_func, actual)
+        if cls._blend_func != blend_func:
+            GL.glBlendFunc(source_factor, destination_factor)
+            cls._blend_func = blend_func
+
+    @classmethod
+    def depth_mask(cls, enabled):
+        """ Enable or disable writing into the depth buffer """
+        enabled = bool(enabled)
+        if cls.debug:
+            cls._validate("depth mask", cls._depth_mask, bool(cls._get_integer(GL.GL_DEPTH_WRITEMASK)))
+        if cls._depth_mask != enabled:
+            GL.glDepthMask(enabled)
+            cls._depth_mask = enabled
+
+    @classmethod
+    def depth_func(cls, func):
+        """ Set the comparison (GL_LESS, GL_LEQUAL, GL_ALWAYS, ...) of the depth test """
+        if cls.debug:
+            cls._validate("depth function", cls._depth_func, cls._get_integer(GL.GL_DEPTH_FUNC))
+        if cls._depth_func != func:
+            GL.glDepthFunc(func)
+            cls._depth_func = func
+
+    @classmethod
+    def color_mask(cls, enabled):
+        """ Enable or disable writing into all channels of the color buffers """
+        enabled = bool(enabled)
+        if cls.debug:
+            actual = bool(np.all(np.ravel(GL.glGetBooleanv(GL.GL_COLOR_WRITEMASK))))
+            cls._validate("color mask", cls._color_mask, actual)
+        if cls._color_mask != enabled:
+            GL.glColorMask(enabled, enabled, enabled, enabled)
+            cls._color_mask = enabled
+
+    @classmethod
+    def active_texture(cls, texture_unit):
+        """ Select the texture unit (0...15) affected by the following texture bindings """
+        if cls.debug:
+            actual = cls._get_integer(GL.GL_ACTIVE_TEXTURE) - GL.GL_TEXTURE0
+            cls._validate("active texture unit", cls._active_texture_unit, actual)
+        if cls._active_texture_unit != texture_unit:
+            GL.glActiveTexture(GL.GL_TEXTURE0 + texture_unit)
+            cls._active_texture_unit = texture_unit
+
+    @classmethod
+    def bind_texture(cls, target, texture_ref, texture_unit=None):
+        """
+        Associate a texture object with a texture unit.
+        If texture_unit is None, the currently active unit is used (unit 0 if it is not known yet).
+        """
+        if texture_unit is None:
+            texture_unit = cls._active_texture_unit if cls._active_texture_unit is not None else 0
+        cls.active_texture(texture_unit)
+        key = (texture_unit, target)
+        tracked = cls._texture_binding_dict.get(key)
+        if cls.debug and target in cls._TEXTURE_BINDING_QUERY:
+            actual = cls._get_integer(cls._TEXTURE_BINDING_QUERY[target])
+            cls._validate(f"texture binding of unit {texture_unit}", tracked, actual)
+        if tracked != texture_ref:
+            GL.glBindTexture(target, texture_ref)
+            cls._texture_binding_dict[key] = texture_ref
+            if RenderStats.current is not None:
+                RenderStats.current.texture_binds += 1
+
+    @classmethod
+    def use_program(cls, program_ref):
+        if cls.debug:
+            cls._validate("program", cls._program_ref, cls._get_integer(GL.GL_CURRENT_PROGRAM))
+        if cls._program_ref != program_ref:
+            GL.glUseProgram(program_ref)
+            cls._program_ref = program_ref
+            if RenderStats.current is not None:
+                RenderStats.current.program_switches += 1
+
+    @staticmethod
+    def _get_integer(parameter_name):
+        return int(np.ravel(GL.glGetIntegerv(parameter_name))[0])
+
+    @staticmethod
+    def _get_float(parameter_name):
+        return float(np.ravel(GL.glGetFloatv(parameter_name))[0])
+
+    @staticmethod
+    def _validate(name, tracked, actual):
+        """ Raise an exception if a known tracked value differs from the driver state """
+        if tracked is not None and tracked != actual:
+            raise Exception(f"GL state mismatch for {name}: tracked {tracked}, actual {actual}")
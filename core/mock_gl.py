@@ -0,0 +1,360 @@
+"""
+Recording stand-in for the OpenGL.GL module, for running the framework without a GPU or a GL context.
+
+    from core.mock_gl import MockGL
+    mock_gl = MockGL.install()
+    ... build a scene and call Renderer.render ...
+    mock_gl.save("commands.json")
+
+Every GL function returns a plausible value (new object handles, successful compile and link status,
+uniform and attribute locations found in the shader code) and is appended to the command stream,
+so that scene traversal, uniform dispatch and the render loop can be benchmarked and compared headlessly.
+Command streams of two versions are compared with
+
+    python -m core.mock_gl old_commands.json new_commands.json
+"""
+import difflib
+import hashlib
+import json
+import re
+import sys
+import types
+import zlib
+from collections import Counter
+
+
+class MockGL(types.ModuleType):
+    """
+    Module object replacing OpenGL.GL. Constants have the values of PyOpenGL if it is installed,
+    otherwise stable made-up values. Functions are created on first use; each call is recorded
+    as (function name, arguments) with arrays and byte strings replaced by a digest of their contents.
+    """
+    # Constants the framework relies on when PyOpenGL is not available
+    _KNOWN_CONSTANT_DICT = {"GL_FALSE": 0, "GL_TRUE": 1, "GL_NONE": 0, "GL_TEXTURE0": 0x84C0}
+
+    def __init__(self, package_list=("core", "core_ext", "material", "light", "geometry", "extras", "effects")):
+        super().__init__("OpenGL.GL")
+        # Modules of these packages are pointed at the mock by install()
+        self._package_list = tuple(package_list)
+        # Recorded calls: [function name, frozen arguments]; None entries mark frame boundaries
+        self.recording = True
+        self._command_list = []
+        self._call_counter = Counter()
+        self._next_handle = 1
+        # Shader -> source code, program -> attached shaders, program -> reflected declarations
+        self._shader_source_dict = {}
+        self._program_shader_dict = {}
+        self._program_interface_dict = {}
+        # (program, uniform or attribute name) -> location
+        self._location_dict = {}
+        self._timestamp = 0
+        # Replaced modules and attributes, restored by uninstall()
+        self._replaced_list = []
+        try:
+            import OpenGL.GL as gl_module
+            self._constant_module = gl_module
+        except ImportError:
+            self._constant_module = None
+
+    @classmethod
+    def install(cls, *args, **kwargs):
+        """
+        Create a mock, register it as OpenGL.GL for modules imported afterwards
+        and point the already imported framework modules at it; return the mock
+        """
+        mock_gl = cls(*args, **kwargs)
+        opengl_package = sys.modules.get("OpenGL")
+        if opengl_package is None:
+            opengl_package = types.ModuleType("OpenGL")
+            opengl_package.__path__ = []
+            mock_gl._replaced_list.append((sys.modules, "OpenGL", None))
+            sys.modules["OpenGL"] = opengl_package
+        mock_gl._replaced_list.append((sys.modules, "OpenGL.GL", sys.modules.get("OpenGL.GL")))
+        sys.modules["OpenGL.GL"] = mock_gl
+        mock_gl._replaced_list.append((opengl_package, "GL", getattr(opengl_package, "GL", None)))
+        opengl_package.GL = mock_gl
+        for module_name, module in list(sys.modules.items()):
+            if module is None or module_name.split(".")[0] not in mock_gl._package_list:
+                continue
+            gl_module = getattr(module, "GL", None)
+            if isinstance(gl_module, types.ModuleType) and gl_module.__name__ == "OpenGL.GL":
+                mock_gl._replaced_list.append((module, "GL", gl_module))
+                module.GL = mock_gl
+        return mock_gl
+
+    def uninstall(self):
+        """ Restore the modules replaced by install() """
+        for target, name, original in reversed(self._replaced_list):
+            if target is sys.modules:
+                if original is None:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = original
+            elif original is None:
+                delattr(target, name)
+            else:
+                setattr(target, name, original)
+        self._replaced_list = []
+
+    @property
+    def command_list(self):
+        return self._command_list
+
+    @property
+    def call_counter(self):
+        """ Number of calls of each function since the mock was created or cleared """
+        return self._call_counter
+
+    def mark_frame(self):
+        """ Record a frame boundary (kept as None in the command list) """
+        if self.recording:
+            self._command_list.append(None)
+
+    def clear(self):
+        self._command_list = []
+        self._call_counter = Counter()
+
+    def save(self, path):
+        """ Write the recorded command stream into a JSON file """
+        with open(path, "w") as command_file:
+            json.dump(self._command_list, command_file)
+
+    def __getattr__(self, name):
+        if name.startswith("GL_"):
+            value = self._get_constant(name)
+        elif name.startswith("gl"):
+            value = self._make_function(name)
+        else:
+            raise AttributeError(name)
+        # Later lookups of the name do not reach __getattr__
+        setattr(self, name, value)
+        return value
+
+    def _get_constant(self, name):
+        if self._constant_module is not None:
+            return int(getattr(self._constant_module, name))
+        if name in self._KNOWN_CONSTANT_DICT:
+            return self._KNOWN_CONSTANT_DICT[name]
+        return zlib.crc32(name.encode()) | 0x10000
+
+    def _make_function(self, name):
+        result_function = getattr(self, "_result_" + name, None)
+
+        def mock_function(*args):
+            self._call_counter[name] += 1
+            if self.recording:
+                self._command_list.append([name, [_freeze(arg) for arg in args]])
+            if result_function is not None:
+                return result_function(*args)
+            return None
+        return mock_function
+
+    def _new_handle(self):
+        handle = self._next_handle
+        self._next_handle += 1
+        return handle
+
+    def _new_handles(self, count):
+        if count == 1:
+            return self._new_handle()
+        return [self._new_handle() for n in range(count)]
+
+    # Results of the functions returning values
+
+    def _result_glGenBuffers(self, count):
+        return self._new_handles(count)
+
+    _result_glGenTextures = _result_glGenBuffers
+    _result_glGenVertexArrays = _result_glGenBuffers
+    _result_glGenFramebuffers = _result_glGenBuffers
+    _result_glGenRenderbuffers = _result_glGenBuffers
+    _result_glGenQueries = _result_glGenBuffers
+
+    def _result_glCreateShader(self, shader_type):
+        return self._new_handle()
+
+    def _result_glCreateProgram(self):
+        program_ref = self._new_handle()
+        self._program_shader_dict[program_ref] = []
+        return program_ref
+
+    def _result_glShaderSource(self, shader_ref, shader_code):
+        self._shader_source_dict[shader_ref] = shader_code
+
+    def _result_glAttachShader(self, program_ref, shader_ref):
+        self._program_shader_dict[program_ref].append(shader_ref)
+
+    def _result_glLinkProgram(self, program_ref):
+        source_list = [self._shader_source_dict.get(shader_ref, "")
+                       for shader_ref in self._program_shader_dict[program_ref]]
+        self._program_interface_dict[program_ref] = _ShaderInterface(source_list)
+
+    def _result_glGetShaderiv(self, shader_ref, parameter_name):
+        return 1
+
+    def _result_glGetProgramiv(self, program_ref, parameter_name):
+        return 1
+
+    def _result_glGetShaderInfoLog(self, shader_ref):
+        return b""
+
+    _result_glGetProgramInfoLog = _result_glGetShaderInfoLog
+
+    def _result_glGetUniformLocation(self, program_ref, variable_name):
+        interface = self._program_interface_dict.get(program_ref)
+        if interface is None or not interface.has_uniform(variable_name):
+            return -1
+        return self._get_location(program_ref, variable_name)
+
+    def _result_glGetAttribLocation(self, program_ref, variable_name):
+        interface = self._program_interface_dict.get(program_ref)
+        if interface is None or not interface.has_attribute(variable_name):
+            return -1
+        return self._get_location(program_ref, variable_name)
+
+    def _result_glCheckFramebufferStatus(self, target):
+        return self.GL_FRAMEBUFFER_COMPLETE
+
+    def _result_glGetString(self, name):
+        return b"MockGL"
+
+    def _result_glIsEnabled(self, capability):
+        return 0
+
+    def _result_glGetIntegerv(self, parameter_name):
+        return [0]
+
+    def _result_glGetFloatv(self, parameter_name):
+        return [0.0]
+
+    def _result_glGetBooleanv(self, parameter_name):
+        return [0, 0, 0, 0]
+
+    def _result_glGetQueryObjectiv(self, query_ref, parameter_name):
+        return 1
+
+    def _result_glGetQueryObjectui64v(self, query_ref, parameter_name, result=None):
+        # Timestamps one microsecond apart, returned or written into a ctypes.byref output argument
+        self._timestamp += 1000
+        if result is not None:
+            result._obj.value = self._timestamp
+        return self._timestamp
+
+    def _get_location(self, program_ref, variable_name):
+        key = (program_ref, variable_name)
+        if key not in self._location_dict:
+            self._location_dict[key] = len(self._location_dict)
+        return self._location_dict[key]
+
+
+class _ShaderInterface:
+    """ Uniforms, structs and vertex inputs declared in the source code of the shaders of a program """
+    _DEFINE_PATTERN = re.compile(r"#define\s+(\w+)\s+(\w+)")
+    _STRUCT_PATTERN = re.compile(r"struct\s+(\w+)\s*\{([^}]*)\}\s*;")
+    _MEMBER_PATTERN = re.compile(r"(\w+)\s+(\w+)\s*(?:\[\s*(\w+)\s*\])?\s*;")
+    _UNIFORM_PATTERN = re.compile(r"\buniform\s+(\w+)\s+(\w+)\s*(?:\[\s*(\w+)\s*\])?\s*;")
+    _INPUT_PATTERN = re.compile(r"(?:^|;|\n)\s*in\s+\w+\s+(\w+)\s*;")
+    _ACCESS_PATTERN = re.compile(r"(\w+)(?:\[(\d+)\])?$")
+
+    def __init__(self, source_list):
+        # name -> (type, array size or None)
+        self._uniform_dict = {}
+        # struct name -> {member name: (type, array size or None)}
+        self._struct_dict = {}
+        self._attribute_set = set()
+        for index, source in enumerate(source_list):
+            source = re.sub(r"//[^\n]*|/\*.*?\*/", "", source, flags=re.DOTALL)
+            define_dict = dict(self._DEFINE_PATTERN.findall(source))
+            for struct_name, body in self._STRUCT_PATTERN.findall(source):
+                self._struct_dict[struct_name] = {
+                    member_name: (member_type, self._get_size(size, define_dict))
+                    for member_type, member_name, size in self._MEMBER_PATTERN.findall(body)}
+            for uniform_type, uniform_name, size in self._UNIFORM_PATTERN.findall(source):
+                self._uniform_dict[uniform_name] = (uniform_type, self._get_size(size, define_dict))
+            # Vertex inputs are declared by the first (vertex) shader
+            if index == 0:
+                self._attribute_set.update(self._INPUT_PATTERN.findall(source))
+
+    def has_uniform(self, variable_name):
+        """ Check a uniform name such as "lights[2].color"; whole structs have no location """
+        declaration_dict = self._uniform_dict
+        declaration = None
+        for part in variable_name.split("."):
+            match = self._ACCESS_PATTERN.match(part)
+            if match is None or declaration_dict is None or match.group(1) not in declaration_dict:
+                return False
+            declaration = declaration_dict[match.group(1)]
+            variable_type, size = declaration
+            if match.group(2) is not None and (size is None or int(match.group(2)) >= size):
+                return False
+            declaration_dict = self._struct_dict.get(variable_type)
+        return declaration is not None and declaration[0] not in self._struct_dict
+
+    def has_attribute(self, variable_name):
+        return variable_name in self._attribute_set
+
+    @staticmethod
+    def _get_size(size, define_dict):
+        if not size:
+            return None
+        size = define_dict.get(size, size)
+        return int(size) if size.isdigit() else None
+
+
+def _freeze(value):
+    """ Return a JSON-compatible copy of a call argument; arrays and byte strings become digests """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_freeze(element) for element in value]
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "bytes:" + hashlib.md5(bytes(value)).hexdigest()[:12]
+    if hasattr(value, "_obj"):
+        # ctypes.byref output arguments
+        return "ref:" + type(value._obj).__name__
+    if hasattr(value, "tobytes"):
+        # numpy arrays and scalars
+        if getattr(value, "ndim", 1) == 0:
+            return value.item()
+        return "array:" + hashlib.md5(value.tobytes()).hexdigest()[:12]
+    return repr(value)
+
+
+def load_command_list(path):
+    with open(path) as command_file:
+        return json.load(command_file)
+
+
+def diff_command_lists(old_command_list, new_command_list, context=3, max_lines=200):
+    """
+    Compare two command streams; return a description of the calls added or removed per function
+    followed by a unified diff of the streams (at most max_lines lines)
+    """
+    def to_lines(command_list):
+        return ["-- frame --" if command is None else f"{command[0]}({json.dumps(command[1])[1:-1]})"
+                for command in command_list]
+
+    old_counter = Counter(command[0] for command in old_command_list if command is not None)
+    new_counter = Counter(command[0] for command in new_command_list if command is not None)
+    line_list = [f"{sum(old_counter.values())} -> {sum(new_counter.values())} GL calls"]
+    for name in sorted(set(old_counter) | set(new_counter)):
+        if old_counter[name] != new_counter[name]:
+            line_list.append(f"  {name}: {old_counter[name]} -> {new_counter[name]} "
+                             f"({new_counter[name] - old_counter[name]:+d})")
+    diff_line_list = list(difflib.unified_diff(to_lines(old_command_list), to_lines(new_command_list),
+                                               "old", "new", n=context, lineterm=""))
+    line_list.extend(diff_line_list[:max_lines])
+    if len(diff_line_list) > max_lines:
+        line_list.append(f"... {len(diff_line_list) - max_lines} more lines")
+    return "\n".join(line_list)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python -m core.mock_gl OLD_COMMANDS.json NEW_COMMANDS.json")
+        sys.exit(2)
+    old_list = load_command_list(sys.argv[1])
+    new_list = load_command_list(sys.argv[2])
+    print(diff_command_lists(old_list, new_list))
+    # Non-zero exit status if the streams differ, for use in regression checks
+    sys.exit(0 if old_list == new_list else 1)
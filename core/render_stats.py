@@ -0,0 +1,109 @@
+from collections import deque
+from time import perf_counter
+
+import OpenGL.GL as GL
+import numpy as np
+
+
+class RenderStats:
+    """
+    Counters of the work submitted to OpenGL during one frame: draw calls, vertices and triangles,
+    program switches, texture binds, uniform uploads, uploaded buffer bytes, drawn and culled meshes,
+    and the CPU time spent in the phases of the renderer (in milliseconds).
+    The counters are incremented by the framework classes while a RenderStats object is the current one
+    (see Renderer.enable_stats); with no current object they cost a single attribute test.
+    end_frame() must be called once per frame (e.g. at the end of paintGL):
+    it keeps the counters of the finished frame in last_frame and starts counting the next one.
+    """
+    # Object receiving the counts of the framework classes (None: nothing is counted)
+    current = None
+
+    # Counters reset at the beginning of each frame
+    COUNTER_NAMES = ("draw_calls", "vertices", "triangles", "program_switches", "texture_binds",
+                     "uniform_uploads", "buffer_bytes", "drawn_meshes", "culled_meshes", "culled_shadow_casters")
+
+    def __init__(self, history_size=120):
+        self._history_size = history_size
+        # Wall clock time between the ends of consecutive frames and CPU time spent in Renderer.render,
+        # in milliseconds, oldest first
+        self._frame_time_history = deque(maxlen=history_size)
+        self._render_time_history = deque(maxlen=history_size)
+        self._last_frame = {}
+        self._frame_end_time = None
+        self._frame_count = 0
+        self.reset_counters()
+
+    @property
+    def history_size(self):
+        return self._history_size
+
+    @property
+    def frame_count(self):
+        """ Number of finished frames """
+        return self._frame_count
+
+    @property
+    def last_frame(self):
+        """ Counters and phase times ({phase: milliseconds} under "phase_times") of the last finished frame """
+        return self._last_frame
+
+    @property
+    def phase_time_dict(self):
+        """ CPU time (milliseconds) of each phase of the current frame so far """
+        return self._phase_time_dict
+
+    @property
+    def frame_time_history(self):
+        return list(self._frame_time_history)
+
+    @property
+    def render_time_history(self):
+        return list(self._render_time_history)
+
+    def reset_counters(self):
+        for name in self.COUNTER_NAMES:
+            setattr(self, name, 0)
+        self._phase_time_dict = {}
+
+    def count_draw(self, draw_style, vertex_count, draw_calls=1):
+        """ Count draw calls submitting vertex_count vertices in total """
+        self.draw_calls += draw_calls
+        self.vertices += vertex_count
+        if draw_style == GL.GL_TRIANGLES:
+            self.triangles += vertex_count // 3
+        elif draw_style in (GL.GL_TRIANGLE_STRIP, GL.GL_TRIANGLE_FAN):
+            self.triangles += max(vertex_count - 2 * draw_calls, 0)
+
+    def add_time(self, phase, seconds):
+        """ Add CPU time measured with time.perf_counter() to a phase ("traversal", "uniforms", "draw", ...) """
+        self._phase_time_dict[phase] = self._phase_time_dict.get(phase, 0.0) + seconds * 1000
+
+    def end_frame(self):
+        """ Store the counters of the finished frame and reset them for the next one """
+        now = perf_counter()
+        if self._frame_end_time is not None:
+            self._frame_time_history.append((now - self._frame_end_time) * 1000)
+        self._frame_end_time = now
+        self._render_time_history.append(self._phase_time_dict.get("render", 0.0))
+        self._last_frame = {name: getattr(self, name) for name in self.COUNTER_NAMES}
+        self._last_frame["phase_times"] = dict(self._phase_time_dict)
+        self._frame_count += 1
+        self.reset_counters()
+
+    def get_average_frame_time(self):
+        """ Return the average time between frames in milliseconds (None before the second frame) """
+        if not self._frame_time_history:
+            return None
+        return float(np.mean(self._frame_time_history))
+
+    def get_summary(self):
+        """ Return a one-line description of the last finished frame """
+        frame = self._last_frame
+        if not frame:
+            return ""
+        average_frame_time = self.get_average_frame_time()
+        fps = 1000 / average_frame_time if average_frame_time else 0.0
+        return (f"{fps:.1f} fps, {frame['draw_calls']} draws, {frame['triangles']} tris, "
+                f"{frame['program_switches']} programs, {frame['texture_binds']} textures, "
+                f"{frame['uniform_uploads']} uniforms, {frame['buffer_bytes']} B uploaded, "
+                f"{frame['drawn_meshes']} drawn / {frame['culled_meshes']} culled meshes")
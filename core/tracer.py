@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+from time import perf_counter_ns
+
+
+class Tracer:
+    """
+    Records begin/end events of named sections (render passes, shader compiles, texture and buffer uploads)
+    into a preallocated ring buffer and writes them as Chrome trace JSON, which can be opened in
+    chrome://tracing or https://ui.perfetto.dev. Only the last capacity events are kept.
+    The framework classes record their sections while a Tracer is the current one (see activate);
+    with no current tracer the cost is a single attribute test.
+    end_frame() marks the frame boundaries (e.g. at the end of paintGL); if a frame takes longer than
+    frame_threshold milliseconds, the buffer is dumped into dump_dir, so that intermittent stutters can be
+    inspected together with the frames before them.
+    """
+    # Tracer receiving the events of the framework classes (None: nothing is recorded)
+    current = None
+
+    def __init__(self, capacity=65536, frame_threshold=None, dump_dir="."):
+        self._capacity = capacity
+        self._frame_threshold = frame_threshold
+        self._dump_dir = dump_dir
+        # Ring buffer: event n is stored at index n % capacity
+        self._name_list = [None] * capacity
+        self._category_list = [None] * capacity
+        # "B" (begin) | "E" (end) | "i" (instant)
+        self._phase_list = [None] * capacity
+        # nanoseconds of time.perf_counter_ns()
+        self._time_list = [0] * capacity
+        self._thread_list = [0] * capacity
+        self._event_count = 0
+        self._frame_index = 0
+        self._frame_start_time = perf_counter_ns()
+        # Files written by the automatic dumps of slow frames
+        self._dump_file_list = []
+        self.begin("frame", "frame")
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def event_count(self):
+        """ Number of events recorded so far, including the overwritten ones """
+        return self._event_count
+
+    @property
+    def frame_index(self):
+        return self._frame_index
+
+    @property
+    def dump_file_list(self):
+        return list(self._dump_file_list)
+
+    def activate(self):
+        """ Make this tracer receive the events of the framework classes """
+        Tracer.current = self
+
+    def deactivate(self):
+        if Tracer.current is self:
+            Tracer.current = None
+
+    def begin(self, name, category="render"):
+        self._record(name, category, "B")
+
+    def end(self, name, category="render"):
+        self._record(name, category, "E")
+
+    def instant(self, name, category="render"):
+        """ Record an event without duration, e.g. a cache miss """
+        self._record(name, category, "i")
+
+    def end_frame(self):
+        """
+        Finish the current frame and start the next one; return the path of the trace file
+        if the frame exceeded the threshold, otherwise None
+        """
+        self.end("frame", "frame")
+        now = perf_counter_ns()
+        duration = (now - self._frame_start_time) / 1e6
+        path = None
+        if self._frame_threshold is not None and duration > self._frame_threshold:
+            path = os.path.join(self._dump_dir, f"trace_frame{self._frame_index}.json")
+            self.dump(path)
+            self._dump_file_list.append(path)
+        self._frame_index += 1
+        self._frame_start_time = now
+        self.begin("frame", "frame")
+        return path
+
+    def get_events(self):
+        """
+        Return the stored events in Chrome trace format, oldest first.
+        End events whose begin event was overwritten are left out.
+        """
+        first = max(self._event_count - self._capacity, 0)
+        pid = os.getpid()
+        # Number of open sections of each thread
+        depth_dict = {}
+        event_list = []
+        for n in range(first, self._event_count):
+            index = n % self._capacity
+            phase = self._phase_list[index]
+            thread = self._thread_list[index]
+            if phase == "B":
+                depth_dict[thread] = depth_dict.get(thread, 0) + 1
+            elif phase == "E":
+                if not depth_dict.get(thread):
+                    continue
+                depth_dict[thread] -= 1
+            event = {
+                "name": self._name_list[index],
+                "cat": self._category_list[index],
+                "ph": phase,
+                # Microseconds
+                "ts": self._time_list[index] / 1000,
+                "pid": pid,
+                "tid": thread,
+            }
+            if phase == "i":
+                # Instant events are drawn on their thread only
+                event["s"] = "t"
+            event_list.append(event)
+        return event_list
+
+    def dump(self, path):
+        """ Write the stored events into a Chrome trace JSON file """
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents": self.get_events(), "displayTimeUnit": "ms"}, trace_file)
+
+    def clear(self):
+        """ Forget all events (the current frame is started again) """
+        self._event_count = 0
+        self._frame_start_time = perf_counter_ns()
+        self.begin("frame", "frame")
+
+    def _record(self, name, category, phase):
+        index = self._event_count % self._capacity
+        self._name_list[index] = name
+        self._category_list[index] = category
+        self._phase_list[index] = phase
+        self._time_list[index] = perf_counter_ns()
+        self._thread_list[index] = threading.get_ident()
+        self._event_count += 1
@@ -1,15 +1,27 @@
 import OpenGL.GL as GL
 
+from core.change_monitor import ChangeMonitor
+from core.gl_state import GLState
+from core.render_stats import RenderStats
+
 
 class Uniform:
+    # Element locations of light arrays, indexed by (program, variable name);
+    # materials of the same type share their program and look them up only once
+    _light_array_location_dict = {}
+    # Packed light last uploaded into each element of a light array, indexed by (program, location)
+    _uploaded_light_dict = {}
+
     def __init__(self, data_type, data):
         # type of data:
-        # int | bool | float | vec2 | vec3 | vec4
+        # int | bool | float | vec2 | vec3 | vec4 | mat4 | mat4Array | sampler2D | samplerBuffer
+        # | Light | LightArray | Shadow | CascadedShadow | PointShadow | ShadowAtlas | LightClusters
         self._data_type = data_type
         # data to be sent to uniform variable
         self._data = data
         # reference for variable location in program
         self._variable_ref = None
+        self._program_ref = None
 
     @property
     def data(self):
@@ -18,9 +30,18 @@ class Uniform:
     @data.setter
     def data(self, data):
         self._data = data
+        if ChangeMonitor.current is not None:
+            ChangeMonitor.current.report_change()
+
+    @staticmethod
+    def clear_caches():
+        """ Forget the light array locations and uploaded lights, which belong to the programs of a previous context """
+        Uniform._light_array_location_dict = {}
+        Uniform._uploaded_light_dict = {}
 
     def locate_variable(self, program_ref, variable_name):
         """ Get and store reference for program variable with given name """
+        self._program_ref = program_ref
         if self._data_type == 'Light':
             self._variable_ref = {
                 "lightType":    GL.glGetUniformLocation(program_ref, variable_name + ".lightType"),
@@ -29,6 +50,20 @@ class Uniform:
                 "position":     GL.glGetUniformLocation(program_ref, variable_name + ".position"),
                 "attenuation":  GL.glGetUniformLocation(program_ref, variable_name + ".attenuation"),
             }
+        elif self._data_type == "LightArray":
+            key = (program_ref, variable_name)
+            if key not in Uniform._light_array_location_dict:
+                # Member locations of each element, collected until the first element the program does not have
+                element_ref_list = []
+                while True:
+                    element_name = variable_name + f"[{len(element_ref_list)}]"
+                    element_ref = tuple(GL.glGetUniformLocation(program_ref, element_name + "." + member_name)
+                                        for member_name in ("lightType", "color", "direction", "position", "attenuation"))
+                    if element_ref[0] == -1:
+                        break
+                    element_ref_list.append(element_ref)
+                Uniform._light_array_location_dict[key] = element_ref_list
+            self._variable_ref = Uniform._light_array_location_dict[key]
         elif self._data_type == "Shadow":
             self._variable_ref = {
                 "lightDirection": GL.glGetUniformLocation(program_ref, variable_name + ".lightDirection"),
@@ -37,6 +72,58 @@ class Uniform:
                 "depthTextureSampler": GL.glGetUniformLocation(program_ref, variable_name + ".depthTextureSampler"),
                 "strength": GL.glGetUniformLocation(program_ref, variable_name + ".strength"),
                 "bias": GL.glGetUniformLocation(program_ref, variable_name + ".bias"),
+                "pcfRadius": GL.glGetUniformLocation(program_ref, variable_name + ".pcfRadius"),
+            }
+        elif self._data_type == "CascadedShadow":
+            self._variable_ref = {
+                "lightDirection": GL.glGetUniformLocation(program_ref, variable_name + ".lightDirection"),
+                # arrays are set starting with the location of their first element
+                "matrices": GL.glGetUniformLocation(program_ref, variable_name + ".matrices[0]"),
+                "splits": GL.glGetUniformLocation(program_ref, variable_name + ".splits[0]"),
+                "biases": GL.glGetUniformLocation(program_ref, variable_name + ".biases[0]"),
+                "cascadeCount": GL.glGetUniformLocation(program_ref, variable_name + ".cascadeCount"),
+                "depthTextureSampler": GL.glGetUniformLocation(program_ref, variable_name + ".depthTextureSampler"),
+                "strength": GL.glGetUniformLocation(program_ref, variable_name + ".strength"),
+                "pcfRadius": GL.glGetUniformLocation(program_ref, variable_name + ".pcfRadius"),
+            }
+        elif self._data_type == "PointShadow":
+            self._variable_ref = {
+                "lightPosition": GL.glGetUniformLocation(program_ref, variable_name + ".lightPosition"),
+                "farPlane": GL.glGetUniformLocation(program_ref, variable_name + ".farPlane"),
+                "depthTextureSampler": GL.glGetUniformLocation(program_ref, variable_name + ".depthTextureSampler"),
+                "strength": GL.glGetUniformLocation(program_ref, variable_name + ".strength"),
+                "bias": GL.glGetUniformLocation(program_ref, variable_name + ".bias"),
+            }
+        elif self._data_type == "ShadowAtlas":
+            self._variable_ref = {
+                "shadowCount": GL.glGetUniformLocation(program_ref, variable_name + ".shadowCount"),
+                "depthTextureSampler": GL.glGetUniformLocation(program_ref, variable_name + ".depthTextureSampler"),
+                "strength": GL.glGetUniformLocation(program_ref, variable_name + ".strength"),
+                "pcfRadius": GL.glGetUniformLocation(program_ref, variable_name + ".pcfRadius"),
+                "shadows": [],
+            }
+            # Each element of an array of structs has its own member locations;
+            # collect them until the first element the program does not have
+            while True:
+                element_name = variable_name + f".shadows[{len(self._variable_ref['shadows'])}]"
+                element_ref = {
+                    "lightDirection": GL.glGetUniformLocation(program_ref, element_name + ".lightDirection"),
+                    "matrix": GL.glGetUniformLocation(program_ref, element_name + ".matrix"),
+                    "rect": GL.glGetUniformLocation(program_ref, element_name + ".rect"),
+                    "bias": GL.glGetUniformLocation(program_ref, element_name + ".bias"),
+                }
+                if element_ref["matrix"] == -1:
+                    break
+                self._variable_ref["shadows"].append(element_ref)
+        elif self._data_type == "LightClusters":
+            self._variable_ref = {
+                "lightData": GL.glGetUniformLocation(program_ref, variable_name + ".lightData"),
+                "clusterTable": GL.glGetUniformLocation(program_ref, variable_name + ".clusterTable"),
+                "lightIndices": GL.glGetUniformLocation(program_ref, variable_name + ".lightIndices"),
+                "gridSize": GL.glGetUniformLocation(program_ref, variable_name + ".gridSize"),
+                "near": GL.glGetUniformLocation(program_ref, variable_name + ".near"),
+                "far": GL.glGetUniformLocation(program_ref, variable_name + ".far"),
+                "viewportSize": GL.glGetUniformLocation(program_ref, variable_name + ".viewportSize"),
             }
         else:
             self._variable_ref = GL.glGetUniformLocation(program_ref, variable_name)
@@ -45,6 +132,8 @@ class Uniform:
         """ Store data in uniform variable previously located """
         # If the program does not reference the variable, then exit
         if self._variable_ref != -1:
+            if RenderStats.current is not None:
+                RenderStats.current.uniform_uploads += 1
             if self._data_type == 'int':
                 GL.glUniform1i(self._variable_ref, self._data)
             elif self._data_type == 'bool':
@@ -61,20 +150,41 @@ class Uniform:
                 GL.glUniform4f(self._variable_ref, *self._data)
             elif self._data_type == 'mat4':
                 GL.glUniformMatrix4fv(self._variable_ref, 1, GL.GL_TRUE, self._data)
+            elif self._data_type == 'mat4Array':
+                GL.glUniformMatrix4fv(self._variable_ref, len(self._data), GL.GL_TRUE, self._data)
             elif self._data_type == "sampler2D":
                 texture_object_ref, texture_unit_ref = self._data
-                # Activate texture unit
-                GL.glActiveTexture(GL.GL_TEXTURE0 + texture_unit_ref)
-                # Associate texture object reference to currently active texture unit
-                GL.glBindTexture(GL.GL_TEXTURE_2D, texture_object_ref)
+                # Activate texture unit and associate texture object reference to it
+                GLState.bind_texture(GL.GL_TEXTURE_2D, texture_object_ref, texture_unit_ref)
                 # Upload texture unit number (0...15) to uniform variable in shader
                 GL.glUniform1i(self._variable_ref, texture_unit_ref)
+            elif self._data_type == "samplerBuffer":
+                texture_object_ref, texture_unit_ref = self._data
+                # Buffer textures are bound to their own target of the texture unit
+                GLState.bind_texture(GL.GL_TEXTURE_BUFFER, texture_object_ref, texture_unit_ref)
+                GL.glUniform1i(self._variable_ref, texture_unit_ref)
             elif self._data_type == "Light":
-                GL.glUniform1i(self._variable_ref["lightType"], self._data.light_type)
-                GL.glUniform3f(self._variable_ref["color"], *self._data.color)
-                GL.glUniform3f(self._variable_ref["direction"], *self._data.direction)
-                GL.glUniform3f(self._variable_ref["position"], *self._data.local_position)
-                GL.glUniform3f(self._variable_ref["attenuation"], *self._data.attenuation)
+                # The same members as the elements of a LightArray, e.g. the position in world coordinates
+                light_type, color, direction, position, attenuation = self._data.packed_data
+                GL.glUniform1i(self._variable_ref["lightType"], light_type)
+                GL.glUniform3f(self._variable_ref["color"], *color)
+                GL.glUniform3f(self._variable_ref["direction"], *direction)
+                GL.glUniform3f(self._variable_ref["position"], *position)
+                GL.glUniform3f(self._variable_ref["attenuation"], *attenuation)
+            elif self._data_type == "LightArray":
+                # Data is a list of packed lights (see Light.packed_data); only changed elements are uploaded
+                for element_ref, packed_light in zip(self._variable_ref, self._data):
+                    key = (self._program_ref, element_ref[0])
+                    if Uniform._uploaded_light_dict.get(key) == packed_light:
+                        continue
+                    light_type_ref, color_ref, direction_ref, position_ref, attenuation_ref = element_ref
+                    light_type, color, direction, position, attenuation = packed_light
+                    GL.glUniform1i(light_type_ref, light_type)
+                    GL.glUniform3f(color_ref, *color)
+                    GL.glUniform3f(direction_ref, *direction)
+                    GL.glUniform3f(position_ref, *position)
+                    GL.glUniform3f(attenuation_ref, *attenuation)
+                    Uniform._uploaded_light_dict[key] = packed_light
             elif self._data_type == "Shadow":
                 GL.glUniform3f(self._variable_ref["lightDirection"], *self._data.light_source.direction)
                 GL.glUniformMatrix4fv(self._variable_ref["projectionMatrix"], 1, GL.GL_TRUE, self._data.camera.projection_matrix)
@@ -82,8 +192,66 @@ class Uniform:
                 # Configure depth texture
                 texture_object_ref = self._data.render_target.texture.texture_ref
                 texture_unit_ref = 3
-                GL.glActiveTexture(GL.GL_TEXTURE0 + texture_unit_ref)
-                GL.glBindTexture(GL.GL_TEXTURE_2D, texture_object_ref)
+                GLState.bind_texture(GL.GL_TEXTURE_2D, texture_object_ref, texture_unit_ref)
                 GL.glUniform1i(self._variable_ref["depthTextureSampler"], texture_unit_ref)
                 GL.glUniform1f(self._variable_ref["strength"], self._data.strength)
                 GL.glUniform1f(self._variable_ref["bias"], self._data.bias)
+                GL.glUniform1i(self._variable_ref["pcfRadius"], self._data.pcf_radius)
+            elif self._data_type == "CascadedShadow":
+                cascade_count = self._data.cascade_count
+                GL.glUniform3f(self._variable_ref["lightDirection"], *self._data.light_source.direction)
+                GL.glUniformMatrix4fv(self._variable_ref["matrices"], cascade_count, GL.GL_TRUE, self._data.matrix_array)
+                GL.glUniform1fv(self._variable_ref["splits"], cascade_count, self._data.split_array)
+                GL.glUniform1fv(self._variable_ref["biases"], cascade_count, self._data.depth_bias_array)
+                GL.glUniform1i(self._variable_ref["cascadeCount"], cascade_count)
+                # Configure depth texture array
+                texture_object_ref = self._data.render_target.texture.texture_ref
+                texture_unit_ref = 5
+                GLState.bind_texture(GL.GL_TEXTURE_2D_ARRAY, texture_object_ref, texture_unit_ref)
+                GL.glUniform1i(self._variable_ref["depthTextureSampler"], texture_unit_ref)
+                GL.glUniform1f(self._variable_ref["strength"], self._data.strength)
+                GL.glUniform1i(self._variable_ref["pcfRadius"], self._data.pcf_radius)
+            elif self._data_type == "PointShadow":
+                GL.glUniform3f(self._variable_ref["lightPosition"], *self._data.light_source.global_position)
+                GL.glUniform1f(self._variable_ref["farPlane"], self._data.far)
+                # Configure depth cube map
+                texture_object_ref = self._data.render_target.texture.texture_ref
+                texture_unit_ref = 6
+                GLState.bind_texture(GL.GL_TEXTURE_CUBE_MAP, texture_object_ref, texture_unit_ref)
+                GL.glUniform1i(self._variable_ref["depthTextureSampler"], texture_unit_ref)
+                GL.glUniform1f(self._variable_ref["strength"], self._data.strength)
+                GL.glUniform1f(self._variable_ref["bias"], self._data.bias)
+            elif self._data_type == "ShadowAtlas":
+                shadow_list = self._data.allocated_shadow_list[0:len(self._variable_ref["shadows"])]
+                resolution = self._data.resolution
+                for element_ref, shadow in zip(self._variable_ref["shadows"], shadow_list):
+                    GL.glUniform3f(element_ref["lightDirection"], *shadow.light_source.direction)
+                    GL.glUniformMatrix4fv(element_ref["matrix"], 1, GL.GL_TRUE, shadow.matrix)
+                    # Tile position and size in texture coordinates
+                    x, y, size = shadow.rect
+                    GL.glUniform4f(element_ref["rect"], x / resolution, y / resolution,
+                                   size / resolution, size / resolution)
+                    GL.glUniform1f(element_ref["bias"], shadow.bias)
+                GL.glUniform1i(self._variable_ref["shadowCount"], len(shadow_list))
+                # Configure depth texture
+                texture_object_ref = self._data.render_target.texture.texture_ref
+                texture_unit_ref = 7
+                GLState.bind_texture(GL.GL_TEXTURE_2D, texture_object_ref, texture_unit_ref)
+                GL.glUniform1i(self._variable_ref["depthTextureSampler"], texture_unit_ref)
+                GL.glUniform1f(self._variable_ref["strength"], self._data.strength)
+                GL.glUniform1i(self._variable_ref["pcfRadius"], self._data.pcf_radius)
+            elif self._data_type == "LightClusters":
+                # Buffer textures with the light data, the cluster table and the light index lists
+                for name, buffer_texture, texture_unit_ref in (
+                        ("lightData", self._data.light_data_buffer, self._data.LIGHT_DATA_TEXTURE_UNIT),
+                        ("clusterTable", self._data.cluster_table_buffer, self._data.CLUSTER_TABLE_TEXTURE_UNIT),
+                        ("lightIndices", self._data.light_index_buffer, self._data.LIGHT_INDEX_TEXTURE_UNIT)):
+                    GLState.bind_texture(GL.GL_TEXTURE_BUFFER, buffer_texture.texture_ref, texture_unit_ref)
+                    GL.glUniform1i(self._variable_ref[name], texture_unit_ref)
+                GL.glUniform3i(self._variable_ref["gridSize"], *self._data.grid_size)
+                GL.glUniform1f(self._variable_ref["near"], self._data.near)
+                GL.glUniform1f(self._variable_ref["far"], self._data.far)
+                GL.glUniform2f(self._variable_ref["viewportSize"], *self._data.viewport_size)
+
+
+GLState.add_reset_callback(Uniform.clear_caches)
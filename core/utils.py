@@ -4,6 +4,8 @@ import PyQt5.QtOpenGL as qgl
 from collections import namedtuple
 from platform import system, machine
 
+from core.tracer import Tracer
+
 class Utils:
     """
     Static methods to load and compile OpenGL shaders and link to create programs
@@ -55,7 +57,11 @@ class Utils:
         return shader_ref
 
     @staticmethod
-    def initialize_program(vertex_shader_code, fragment_shader_code):
+    def initialize_program(vertex_shader_code, fragment_shader_code, geometry_shader_code=None):
+        # Compiling and linking may stall a frame; record it in the current trace
+        tracer = Tracer.current
+        if tracer is not None:
+            tracer.begin("initialize_program", "shader")
         vertex_shader_ref = Utils.initialize_shader(vertex_shader_code, GL.GL_VERTEX_SHADER)
         fragment_shader_ref = Utils.initialize_shader(fragment_shader_code, GL.GL_FRAGMENT_SHADER)
         # Create empty program object and store reference to it
@@ -63,6 +69,10 @@ class Utils:
         # Attach previously compiled shader programs
         GL.glAttachShader(program_ref, vertex_shader_ref)
         GL.glAttachShader(program_ref, fragment_shader_ref)
+        # Optional geometry shader, processing whole primitives between the vertex and fragment shader
+        if geometry_shader_code is not None:
+            geometry_shader_ref = Utils.initialize_shader(geometry_shader_code, GL.GL_GEOMETRY_SHADER)
+            GL.glAttachShader(program_ref, geometry_shader_ref)
         # Link vertex shader to fragment shader
         GL.glLinkProgram(program_ref)
         # queries whether program link was successful
@@ -76,6 +86,8 @@ class Utils:
             error_message = '\n' + error_message.decode('utf-8')
             # Raise exception: halt application and print error message
             raise Exception(error_message)
+        if tracer is not None:
+            tracer.end("initialize_program", "shader")
         # Linking was successful; return program reference value
         return program_ref
 
@@ -0,0 +1,41 @@
+import OpenGL.GL as GL
+import numpy as np
+
+from core.gl_state import GLState
+from core.render_stats import RenderStats
+
+
+class BufferTexture:
+    """
+    Buffer object exposed to shaders as a samplerBuffer (isamplerBuffer for integer formats);
+    used for large arrays of per-object or per-light data read with texelFetch
+    """
+    def __init__(self, internal_format=GL.GL_RGBA32F, data_type=np.float32):
+        # format of a texel: GL_RGBA32F | GL_R32I | ...
+        self._internal_format = internal_format
+        # numpy type of the uploaded elements, matching the internal format
+        self._data_type = data_type
+        self._buffer_ref = GL.glGenBuffers(1)
+        self._texture_ref = GL.glGenTextures(1)
+        # size of the buffer storage in bytes
+        self._capacity = 0
+        # Buffer textures must not be empty
+        self.upload_data(np.zeros(4, dtype=data_type))
+        GLState.bind_texture(GL.GL_TEXTURE_BUFFER, self._texture_ref)
+        GL.glTexBuffer(GL.GL_TEXTURE_BUFFER, self._internal_format, self._buffer_ref)
+
+    @property
+    def texture_ref(self):
+        return self._texture_ref
+
+    def upload_data(self, data):
+        """ Store data in the buffer; storage is only reallocated when it grows """
+        data = np.ascontiguousarray(data, dtype=self._data_type).ravel()
+        GL.glBindBuffer(GL.GL_TEXTURE_BUFFER, self._buffer_ref)
+        if data.nbytes > self._capacity:
+            GL.glBufferData(GL.GL_TEXTURE_BUFFER, data.nbytes, data, GL.GL_DYNAMIC_DRAW)
+            self._capacity = data.nbytes
+        elif data.nbytes > 0:
+            GL.glBufferSubData(GL.GL_TEXTURE_BUFFER, 0, data.nbytes, data)
+        if RenderStats.current is not None:
+            RenderStats.current.buffer_bytes += data.nbytes
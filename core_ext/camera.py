@@ -1,3 +1,4 @@
+import numpy as np
 from numpy.linalg import inv
 
 from core.matrix import Matrix
@@ -26,4 +27,16 @@ class Camera(Object3D):
         self._projection_matrix = Matrix.make_orthographic(left, right, bottom, top, near, far)
 
     def update_view_matrix(self):
-        self._view_matrix = inv(self.global_matrix)
\ No newline at end of file
+        self._view_matrix = inv(self.global_matrix)
+
+    def projected_size(self, center, radius):
+        """
+        Return the fraction of the viewport height covered by a sphere
+        with given world center and radius (1 means the full height).
+        Spheres centered at or behind the camera plane are reported as infinitely large.
+        """
+        clip_position = self._projection_matrix @ self._view_matrix @ np.append(center, 1)
+        w = clip_position[3]
+        if w <= 1e-6:
+            return float("inf")
+        return radius * self._projection_matrix[1][1] / w
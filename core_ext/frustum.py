@@ -0,0 +1,34 @@
+import numpy as np
+
+
+class Frustum:
+    """
+    Clipping volume of a projection matrix times view matrix (perspective or orthographic),
+    stored as six planes (a, b, c, d) with a * x + b * y + c * z + d >= 0 inside
+    """
+    LEFT, RIGHT, BOTTOM, TOP, NEAR, FAR = range(6)
+
+    def __init__(self, matrix):
+        # Each plane combines the fourth row of the matrix with one of the others (Gribb-Hartmann)
+        plane_list = []
+        for row in range(3):
+            plane_list.append(matrix[3] + matrix[row])
+            plane_list.append(matrix[3] - matrix[row])
+        planes = np.array(plane_list, dtype=float)
+        # Normalized planes give distances in world units
+        self._planes = planes / np.linalg.norm(planes[:, 0:3], axis=1)[:, None]
+
+    @property
+    def planes(self):
+        return self._planes
+
+    def intersects_sphere(self, center, radius, skip_near=False):
+        """
+        Return False if the sphere is completely outside of one of the planes.
+        With skip_near, the frustum extends infinitely beyond its near plane
+        (e.g. towards a light, whose shadow volume should include casters in front of it).
+        """
+        distances = self._planes[:, 0:3] @ center + self._planes[:, 3]
+        if skip_near:
+            distances[self.NEAR] = radius
+        return bool(np.all(distances >= -radius))
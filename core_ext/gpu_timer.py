@@ -0,0 +1,117 @@
+import ctypes
+from collections import deque
+
+import OpenGL.GL as GL
+import numpy as np
+
+
+class GPUTimer:
+    """
+    Measures the GPU time of named sections (render passes) with timestamp queries.
+    A timestamp is written into the command stream at the beginning and the end of each section;
+    the results are read a few frames later, once the GPU reports them available,
+    so that the CPU never waits for the GPU. Sections may be nested; a nested section is recorded
+    under the path of the open sections, e.g. "postprocessing/effect1/render".
+    The durations (in milliseconds) of the last history_size executions of each section are kept
+    for rolling averages and percentiles.
+    """
+    def __init__(self, history_size=120):
+        self._history_size = history_size
+        # Section path -> durations in milliseconds, oldest first
+        self._history_dict = {}
+        # Query objects which can be reused
+        self._free_query_list = []
+        # (path, begin query, end query) of finished sections waiting for their results, oldest first
+        self._pending_list = deque()
+        # (name, begin query) of the open sections, outermost first
+        self._open_list = []
+
+    @property
+    def history_size(self):
+        return self._history_size
+
+    @property
+    def names(self):
+        """ Paths of the sections with at least one measurement """
+        return list(self._history_dict.keys())
+
+    @property
+    def pending_count(self):
+        """ Number of measured sections whose results are not read yet """
+        return len(self._pending_list)
+
+    def begin(self, name):
+        """ Start a section inside the open ones; the sections finished in earlier frames are collected first """
+        self.collect()
+        query = self._get_query()
+        GL.glQueryCounter(query, GL.GL_TIMESTAMP)
+        self._open_list.append((name, query))
+
+    def end(self, name):
+        """ Finish the innermost open section, which must have the given name """
+        if not self._open_list or self._open_list[-1][0] != name:
+            raise Exception(f"GPU timer section is not the innermost open one: {name}")
+        path = "/".join(open_name for open_name, open_query in self._open_list)
+        begin_query = self._open_list.pop()[1]
+        query = self._get_query()
+        GL.glQueryCounter(query, GL.GL_TIMESTAMP)
+        self._pending_list.append((path, begin_query, query))
+
+    def collect(self):
+        """ Read the results of the finished sections the GPU has completed, without waiting for the others """
+        while self._pending_list:
+            path, begin_query, end_query = self._pending_list[0]
+            # Queries complete in submission order
+            if not GL.glGetQueryObjectiv(end_query, GL.GL_QUERY_RESULT_AVAILABLE):
+                break
+            self._pending_list.popleft()
+            begin_time = self._get_result(begin_query)
+            end_time = self._get_result(end_query)
+            if path not in self._history_dict:
+                self._history_dict[path] = deque(maxlen=self._history_size)
+            # Timestamps are given in nanoseconds
+            self._history_dict[path].append((end_time - begin_time) / 1e6)
+            self._free_query_list.extend([begin_query, end_query])
+
+    def get_history(self, path):
+        """ Return the stored durations of a section in milliseconds, oldest first """
+        return list(self._history_dict.get(path, []))
+
+    def get_average(self, path):
+        """ Return the average duration of a section in milliseconds (None without measurements) """
+        history = self._history_dict.get(path)
+        if not history:
+            return None
+        return float(np.mean(history))
+
+    def get_percentile(self, path, percentile):
+        """ Return a percentile (0...100) of the durations of a section in milliseconds (None without measurements) """
+        history = self._history_dict.get(path)
+        if not history:
+            return None
+        return float(np.percentile(history, percentile))
+
+    def get_summary(self):
+        """ Return {section path: (average, median, 95th percentile, maximum)} in milliseconds """
+        summary = {}
+        for path, history in self._history_dict.items():
+            summary[path] = (float(np.mean(history)), float(np.percentile(history, 50)),
+                             float(np.percentile(history, 95)), float(np.max(history)))
+        return summary
+
+    def reset(self):
+        """ Forget all measurements (results still pending are collected later) """
+        self._history_dict = {}
+
+    def _get_query(self):
+        if self._free_query_list:
+            return self._free_query_list.pop()
+        # A single name is returned as an array
+        return int(np.ravel(GL.glGenQueries(1))[0])
+
+    @staticmethod
+    def _get_result(query):
+        # PyOpenGL cannot allocate the 64-bit result itself, so it is written into a ctypes integer
+        result = ctypes.c_uint64()
+        GL.glGetQueryObjectui64v(query, GL.GL_QUERY_RESULT, ctypes.byref(result))
+        return result.value
@@ -0,0 +1,182 @@
+import OpenGL.GL as GL
+import numpy as np
+from numpy.linalg import inv
+
+from core_ext.buffer_texture import BufferTexture
+from light.light import Light
+
+
+class LightClusters:
+    """
+    Assigns point lights to the clusters of a grid dividing the view frustum
+    (screen tiles in x and y, exponentially growing depth slices in z),
+    so that a fragment only evaluates the lights whose influence sphere reaches its cluster.
+    The light data, the (offset, count) table of the clusters and the light index lists
+    are stored in buffer textures. The camera must use a perspective projection.
+    """
+    # Texture units of the buffer textures
+    LIGHT_DATA_TEXTURE_UNIT = 8
+    CLUSTER_TABLE_TEXTURE_UNIT = 9
+    LIGHT_INDEX_TEXTURE_UNIT = 10
+
+    def __init__(self, grid_size=(16, 9, 24)):
+        # Number of clusters along x, y (screen) and z (depth)
+        self._grid_size = grid_size
+        # Three RGBA texels per light: position and influence radius, color, attenuation
+        self._light_data_buffer = BufferTexture(GL.GL_RGBA32F, np.float32)
+        self._cluster_table_buffer = BufferTexture(GL.GL_RG32I, np.int32)
+        self._light_index_buffer = BufferTexture(GL.GL_R32I, np.int32)
+        self._viewport_size = (1, 1)
+        self._near = 0.1
+        self._far = 1000
+        # View space bounding boxes of the clusters, recalculated when the projection changes
+        self._projection_key = None
+        self._cluster_min = None
+        self._cluster_max = None
+        self._light_count = 0
+
+    @property
+    def cluster_table_buffer(self):
+        return self._cluster_table_buffer
+
+    @property
+    def far(self):
+        return self._far
+
+    @property
+    def grid_size(self):
+        return self._grid_size
+
+    @property
+    def light_count(self):
+        return self._light_count
+
+    @property
+    def light_data_buffer(self):
+        return self._light_data_buffer
+
+    @property
+    def light_index_buffer(self):
+        return self._light_index_buffer
+
+    @property
+    def near(self):
+        return self._near
+
+    @property
+    def viewport_size(self):
+        return self._viewport_size
+
+    def update(self, camera, light_list, viewport_size):
+        """ Assign the point lights in light_list to the clusters of the camera (its view matrix must be up to date) """
+        self._viewport_size = viewport_size
+        projection_key = camera.projection_matrix.tobytes()
+        if projection_key != self._projection_key:
+            self._update_cluster_bounds(camera.projection_matrix)
+            self._projection_key = projection_key
+        point_light_list = [light for light in light_list if light.light_type == Light.POINT]
+        self._light_count = len(point_light_list)
+        cluster_count = self._cluster_min.shape[0]
+        if not point_light_list:
+            self._cluster_table_buffer.upload_data(np.zeros((cluster_count, 2), dtype=np.int32))
+            return
+        position_array = np.array([light.global_position for light in point_light_list])
+        radius_array = np.array([light.influence_radius for light in point_light_list])
+        light_data = np.zeros((len(point_light_list), 3, 4), dtype=np.float32)
+        light_data[:, 0, 0:3] = position_array
+        light_data[:, 0, 3] = radius_array
+        light_data[:, 1, 0:3] = [light.color for light in point_light_list]
+        light_data[:, 2, 0:3] = [light.attenuation for light in point_light_list]
+        self._light_data_buffer.upload_data(light_data)
+        # Light centers in view coordinates
+        view_matrix = camera.view_matrix
+        center_array = position_array @ view_matrix[0:3, 0:3].T + view_matrix[0:3, 3]
+        depth_array = -center_array[:, 2]
+        # Range of clusters along each axis overlapped by the bounding box of each sphere
+        grid_x, grid_y, grid_z = self._grid_size
+        log_ratio = np.log(self._far / self._near)
+        near_depth = np.maximum(depth_array - radius_array, self._near)
+        far_depth = np.minimum(depth_array + radius_array, self._far)
+        # Lights completely in front of the near or behind the far plane
+        in_range = near_depth <= far_depth
+        far_depth = np.maximum(far_depth, near_depth)
+        z_range = (np.floor(np.log(near_depth / self._near) / log_ratio * grid_z),
+                   np.floor(np.log(far_depth / self._near) / log_ratio * grid_z))
+        # Normalized device coordinates are scale * coordinate / depth - shift;
+        # their extremes over the box lie at its corners
+        projection_matrix = camera.projection_matrix
+        xy_range_list = []
+        for axis, grid in ((0, grid_x), (1, grid_y)):
+            scale = projection_matrix[axis, axis]
+            shift = projection_matrix[axis, 2]
+            ndc_list = [scale * (center_array[:, axis] + side * radius_array) / depth - shift
+                        for side in (-1, 1) for depth in (near_depth, far_depth)]
+            xy_range_list.append((np.floor((np.min(ndc_list, axis=0) + 1) / 2 * grid),
+                                  np.floor((np.max(ndc_list, axis=0) + 1) / 2 * grid)))
+        first_array = []
+        size_array = []
+        for (first, last), grid in zip(xy_range_list + [z_range], self._grid_size):
+            in_range &= (last >= 0) & (first < grid)
+            first = np.clip(first, 0, grid - 1).astype(np.int64)
+            last = np.clip(last, 0, grid - 1).astype(np.int64)
+            first_array.append(first)
+            size_array.append(last - first + 1)
+        # Candidate (light, cluster) pairs: all clusters inside the box of each light
+        count_array = np.where(in_range, size_array[0] * size_array[1] * size_array[2], 0)
+        light_index_array = np.repeat(np.arange(len(point_light_list)), count_array)
+        local_index = np.arange(len(light_index_array)) - np.repeat(np.cumsum(count_array) - count_array, count_array)
+        size_x = size_array[0][light_index_array]
+        size_y = size_array[1][light_index_array]
+        cluster_x = first_array[0][light_index_array] + local_index % size_x
+        cluster_y = first_array[1][light_index_array] + (local_index // size_x) % size_y
+        cluster_z = first_array[2][light_index_array] + local_index // (size_x * size_y)
+        cluster_index_array = (cluster_z * grid_y + cluster_y) * grid_x + cluster_x
+        # Keep the pairs whose sphere intersects the bounding box of the cluster
+        centers = center_array[light_index_array]
+        closest = np.clip(centers, self._cluster_min[cluster_index_array], self._cluster_max[cluster_index_array])
+        distance_squared = np.sum((closest - centers) ** 2, axis=1)
+        intersecting = distance_squared <= radius_array[light_index_array] ** 2
+        light_index_array = light_index_array[intersecting]
+        cluster_index_array = cluster_index_array[intersecting]
+        # Index lists of all clusters, one after another
+        order = np.argsort(cluster_index_array, kind="stable")
+        light_index_array = light_index_array[order]
+        count_array = np.bincount(cluster_index_array, minlength=cluster_count)
+        offset_array = np.cumsum(count_array) - count_array
+        self._cluster_table_buffer.upload_data(np.stack([offset_array, count_array], axis=1))
+        # Buffer textures must not be empty
+        if len(light_index_array) == 0:
+            light_index_array = np.zeros(1)
+        self._light_index_buffer.upload_data(light_index_array)
+
+    def _update_cluster_bounds(self, projection_matrix):
+        """ Calculate the view space bounding box of every cluster """
+        grid_x, grid_y, grid_z = self._grid_size
+        inverse_matrix = inv(projection_matrix)
+        # View space points on the tile corner rays at the near and far plane
+        ndc_x, ndc_y = np.meshgrid(np.linspace(-1, 1, grid_x + 1), np.linspace(-1, 1, grid_y + 1))
+        corner_list = []
+        for ndc_z in (-1, 1):
+            points = np.stack([ndc_x, ndc_y, np.full_like(ndc_x, ndc_z), np.ones_like(ndc_x)], axis=-1)
+            points = points @ inverse_matrix.T
+            corner_list.append(points[..., 0:3] / points[..., 3:4])
+        near_corners, far_corners = corner_list
+        self._near = float(-near_corners[0, 0, 2])
+        self._far = float(-far_corners[0, 0, 2])
+        # Depth slices grow exponentially, so that clusters stay roughly cubic
+        slice_depths = self._near * (self._far / self._near) ** (np.arange(grid_z + 1) / grid_z)
+        fractions = ((slice_depths - self._near) / (self._far - self._near))[:, None, None, None]
+        # Shape (z, y, x, 3); the view depth changes linearly along each ray
+        points = near_corners[None] + (far_corners - near_corners)[None] * fractions
+        # Each cluster is bounded by the 8 surrounding points
+        cluster_min = points[:-1, :-1, :-1]
+        cluster_max = points[:-1, :-1, :-1]
+        for dz in (0, 1):
+            for dy in (0, 1):
+                for dx in (0, 1):
+                    neighbour = points[dz:dz + grid_z, dy:dy + grid_y, dx:dx + grid_x]
+                    cluster_min = np.minimum(cluster_min, neighbour)
+                    cluster_max = np.maximum(cluster_max, neighbour)
+        # Cluster index = (z * grid_y + y) * grid_x + x
+        self._cluster_min = cluster_min.reshape(-1, 3).astype(np.float32)
+        self._cluster_max = cluster_max.reshape(-1, 3).astype(np.float32)
@@ -0,0 +1,52 @@
+from core_ext.mesh import Mesh
+
+
+class LOD(Mesh):
+    """
+    Mesh that switches between several geometries (levels of detail)
+    depending on the projected size of its bounding sphere in the active camera
+    """
+    def __init__(self, geometry_list, material, screen_size_list=None, hysteresis=0.1):
+        # Geometries are ordered from the most detailed level to the least detailed one
+        super().__init__(geometry_list[0], material)
+        self._geometry_list = list(geometry_list)
+        self._vao_ref_list = [self._vao_ref] + [Mesh.create_vao(geometry, material)
+                                                for geometry in self._geometry_list[1:]]
+        # Level n is used while the bounding sphere covers at least
+        # screen_size_list[n] of the viewport height; the last level has no lower limit.
+        # By default, each level halves the threshold of the previous one.
+        if screen_size_list is None:
+            screen_size_list = [0.5 ** (n + 2) for n in range(len(self._geometry_list) - 1)]
+        if len(screen_size_list) == len(self._geometry_list):
+            screen_size_list = screen_size_list[:-1]
+        if len(screen_size_list) != len(self._geometry_list) - 1:
+            raise Exception("LOD needs one screen size threshold per level (except the last one)")
+        self._screen_size_list = list(screen_size_list) + [0]
+        # Relative margin around each threshold that prevents
+        # switching back and forth when the size is close to it
+        self._hysteresis = hysteresis
+        self._level = 0
+
+    @property
+    def level(self):
+        return self._level
+
+    @property
+    def geometry_list(self):
+        return self._geometry_list
+
+    def select_level(self, camera):
+        """ Choose the geometry matching the projected size in the camera (view matrix must be updated) """
+        size = camera.projected_size(*self.bounding_sphere)
+        for level, threshold in enumerate(self._screen_size_list):
+            # Moving to a more detailed level requires exceeding the threshold by the margin,
+            # staying on the current (or a less detailed) level allows falling below it by the margin
+            if level < self._level:
+                threshold *= 1 + self._hysteresis
+            else:
+                threshold *= 1 - self._hysteresis
+            if size >= threshold:
+                break
+        self._level = level
+        self._geometry = self._geometry_list[level]
+        self._vao_ref = self._vao_ref_list[level]
@@ -1,4 +1,7 @@
 import OpenGL.GL as GL
+import numpy as np
+
+from core.render_stats import RenderStats
 
 from core_ext.object3d import Object3D
 
@@ -14,14 +17,13 @@ class Mesh(Object3D):
         self._material = material
         # Should this object be rendered?
         self._visible = True
-        # Set up associations between attributes stored in geometry
-        # and shader program stored in material
-        self._vao_ref = GL.glGenVertexArrays(1)
-        GL.glBindVertexArray(self._vao_ref)
-        for variable_name, attribute_object in geometry.attribute_dict.items():
-            attribute_object.associate_variable(material.program_ref, variable_name)
-        # Unbind this vertex array object
-        GL.glBindVertexArray(0)
+        # Is the transform of this object expected to stay the same?
+        # Static meshes are cached in a separate shadow map.
+        self._static = False
+        # Does this object throw shadows / get darkened by shadows of other objects?
+        self._cast_shadow = True
+        self._receive_shadow = True
+        self._vao_ref = self.create_vao(geometry, material)
 
     @property
     def geometry(self):
@@ -35,6 +37,65 @@ class Mesh(Object3D):
     def vao_ref(self):
         return self._vao_ref
 
+    @property
+    def cast_shadow(self):
+        return self._cast_shadow
+
+    @cast_shadow.setter
+    def cast_shadow(self, cast_shadow):
+        self._cast_shadow = cast_shadow
+
+    @property
+    def receive_shadow(self):
+        return self._receive_shadow
+
+    @receive_shadow.setter
+    def receive_shadow(self, receive_shadow):
+        self._receive_shadow = receive_shadow
+
+    @property
+    def static(self):
+        return self._static
+
+    @static.setter
+    def static(self, static):
+        self._static = static
+
     @property
     def visible(self):
         return self._visible
+
+    @property
+    def bounding_sphere(self):
+        """ Return (center, radius) of a sphere enclosing the geometry in world coordinates """
+        center, radius = self._geometry.bounding_sphere
+        global_matrix = self.global_matrix
+        global_center = global_matrix[0:3, 0:3] @ center + global_matrix[0:3, 3]
+        # The largest scale factor along the local axes stretches the radius
+        scale = np.linalg.norm(global_matrix[0:3, 0:3], axis=0).max()
+        return global_center, radius * scale
+
+    @property
+    def draw_key(self):
+        """ Changes whenever the mesh would draw something else: its geometry (e.g. a level of detail) or its transform """
+        return id(self), id(self._geometry), self.global_matrix.tobytes()
+
+    def draw(self, draw_style):
+        """ Submit the vertices to the GPU; the vertex array object and the program must be bound """
+        GL.glDrawArrays(draw_style, 0, self._geometry.vertex_count)
+        if RenderStats.current is not None:
+            RenderStats.current.count_draw(draw_style, self._geometry.vertex_count)
+
+    @staticmethod
+    def create_vao(geometry, material):
+        """
+        Set up associations between attributes stored in geometry
+        and shader program stored in material; return the vertex array object
+        """
+        vao_ref = GL.glGenVertexArrays(1)
+        GL.glBindVertexArray(vao_ref)
+        for variable_name, attribute_object in geometry.attribute_dict.items():
+            attribute_object.associate_variable(material.program_ref, variable_name)
+        # Unbind this vertex array object
+        GL.glBindVertexArray(0)
+        return vao_ref
@@ -0,0 +1,184 @@
+import OpenGL.GL as GL
+import numpy as np
+
+from core.render_stats import RenderStats
+
+from core_ext.buffer_texture import BufferTexture
+from core_ext.mesh import Mesh
+from core_ext.object3d import Object3D
+from geometry.geometry import Geometry
+
+
+class BatchMember(Object3D):
+    """ Scene graph node whose transform places one geometry of a MeshBatch """
+    def __init__(self, first, count, bounding_sphere):
+        super().__init__()
+        # range of vertices in the shared buffers
+        self._first = first
+        self._count = count
+        # local (center, radius) of the member geometry
+        self._bounding_sphere = bounding_sphere
+        self._visible = True
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def first(self):
+        return self._first
+
+    @property
+    def local_bounding_sphere(self):
+        return self._bounding_sphere
+
+    @property
+    def visible(self):
+        return self._visible
+
+    @visible.setter
+    def visible(self, visible):
+        self._visible = visible
+
+
+class MeshBatch(Mesh):
+    """
+    Draws several geometries that share one material with a single glMultiDrawArrays call.
+    The geometries are merged into shared buffers; every geometry gets a BatchMember child node,
+    whose global matrix is fetched by the vertex shader from a buffer texture
+    indexed by the per-vertex attribute objectIndex.
+    """
+    # Texture unit of the model matrix buffer
+    MATRIX_TEXTURE_UNIT = 4
+
+    # Replaces the modelMatrix uniform declaration in the vertex shader code
+    MODEL_MATRIX_FETCH_CODE = """
+            uniform samplerBuffer modelMatrixBuffer;
+            in float objectIndex;
+            mat4 batchModelMatrix()
+            {
+                // each matrix is stored as four column texels
+                int offset = int(objectIndex) * 4;
+                return mat4(texelFetch(modelMatrixBuffer, offset),
+                            texelFetch(modelMatrixBuffer, offset + 1),
+                            texelFetch(modelMatrixBuffer, offset + 2),
+                            texelFetch(modelMatrixBuffer, offset + 3));
+            }
+            #define modelMatrix batchModelMatrix()
+    """
+
+    def __init__(self, geometry_list, material):
+        # Merge the attributes present in all geometries into one geometry
+        geometry = Geometry()
+        member_list = []
+        first = 0
+        for member_geometry in geometry_list:
+            count = member_geometry.vertex_count
+            member_list.append(BatchMember(first, count, member_geometry.bounding_sphere))
+            first += count
+        for variable_name, attribute_object in geometry_list[0].attribute_dict.items():
+            if all(variable_name in member_geometry.attribute_dict for member_geometry in geometry_list):
+                data = []
+                for member_geometry in geometry_list:
+                    data.extend(member_geometry.attribute_dict[variable_name].data)
+                geometry.add_attribute(attribute_object.data_type, variable_name, data)
+        object_index_data = []
+        for index, member in enumerate(member_list):
+            object_index_data.extend([index] * member.count)
+        geometry.add_attribute("float", "objectIndex", object_index_data)
+        # Matrices of the members, four RGBA texels each
+        self._matrix_buffer = BufferTexture(GL.GL_RGBA32F)
+        self._matrix_data = None
+        # Visibility of the members and the vertex ranges of the visible ones, as of the last update
+        self._visible_array = None
+        self._visible_first_array = None
+        self._visible_count_array = None
+        # Variants of other materials (e.g. the depth material of the shadow pass)
+        # and their vertex array objects, indexed by the original material
+        self._variant_dict = {}
+        super().__init__(geometry, self._make_batched_material(material))
+        self._member_list = member_list
+        for member in member_list:
+            self.add(member)
+        self._first_array = np.array([member.first for member in member_list], dtype=np.int32)
+        self._count_array = np.array([member.count for member in member_list], dtype=np.int32)
+
+    @property
+    def member_list(self):
+        return self._member_list
+
+    @property
+    def bounding_sphere(self):
+        """ Return (center, radius) of a sphere enclosing the bounding spheres of all members """
+        center_list = []
+        radius_list = []
+        for member in self._member_list:
+            center, radius = member.local_bounding_sphere
+            global_matrix = member.global_matrix
+            center_list.append(global_matrix[0:3, 0:3] @ center + global_matrix[0:3, 3])
+            radius_list.append(radius * np.linalg.norm(global_matrix[0:3, 0:3], axis=0).max())
+        center_array = np.array(center_list)
+        radius_array = np.array(radius_list)
+        center = (np.min(center_array - radius_array[:, None], axis=0)
+                  + np.max(center_array + radius_array[:, None], axis=0)) / 2
+        radius = float(np.max(np.linalg.norm(center_array - center, axis=1) + radius_array))
+        return center, radius
+
+    @property
+    def draw_key(self):
+        """ Includes the matrices and the visibility of the members, which do not change the matrix of the batch """
+        if self._matrix_data is None:
+            self.update_matrix_buffer()
+        return super().draw_key + (self._matrix_data.tobytes(), self._visible_array.tobytes())
+
+    def get_variant(self, material):
+        """
+        Return the batched variant of another material sharing this geometry,
+        together with the vertex array object associated with its program
+        """
+        if material not in self._variant_dict:
+            variant = self._make_batched_material(material)
+            self._variant_dict[material] = (variant, Mesh.create_vao(self._geometry, variant))
+        return self._variant_dict[material]
+
+    def draw(self, draw_style):
+        """
+        Submit the members visible at the last update_matrix_buffer call in one call;
+        the VAO and program must be bound
+        """
+        if self._matrix_data is None:
+            self.update_matrix_buffer()
+        first_array = self._visible_first_array
+        count_array = self._visible_count_array
+        if len(first_array) > 0:
+            GL.glMultiDrawArrays(draw_style, first_array, count_array, len(first_array))
+            if RenderStats.current is not None:
+                # Counted as one draw call, the way the driver receives it
+                RenderStats.current.count_draw(draw_style, int(count_array.sum()))
+
+    def update_matrix_buffer(self):
+        """
+        Collect the global matrices and the visibility of the members and upload the matrices if any has changed;
+        called by the renderer once per frame, before the passes drawing the batch
+        """
+        matrix_data = np.array([member.global_matrix.T for member in self._member_list], dtype=np.float32)
+        if self._matrix_data is None or not np.array_equal(matrix_data, self._matrix_data):
+            self._matrix_buffer.upload_data(matrix_data)
+            self._matrix_data = matrix_data
+        visible_array = np.array([member.visible for member in self._member_list], dtype=bool)
+        if self._visible_array is None or not np.array_equal(visible_array, self._visible_array):
+            self._visible_array = visible_array
+            self._visible_first_array = self._first_array[visible_array]
+            self._visible_count_array = self._count_array[visible_array]
+
+    def _make_batched_material(self, material):
+        def replace_model_matrix(vertex_shader_code):
+            if "uniform mat4 modelMatrix;" not in vertex_shader_code:
+                raise Exception("MeshBatch requires a vertex shader declaring 'uniform mat4 modelMatrix;'")
+            return vertex_shader_code.replace("uniform mat4 modelMatrix;", self.MODEL_MATRIX_FETCH_CODE)
+
+        variant = material.make_variant(vertex_shader_modifier=replace_model_matrix)
+        variant.add_uniform("samplerBuffer", "modelMatrixBuffer",
+                            [self._matrix_buffer.texture_ref, self.MATRIX_TEXTURE_UNIT])
+        variant.locate_uniforms()
+        return variant
@@ -1,4 +1,5 @@
 import numpy as np
+from core.change_monitor import ChangeMonitor
 from core.matrix import Matrix
 
 
@@ -61,6 +62,8 @@ class Object3D:
     @local_matrix.setter
     def local_matrix(self, matrix):
         self._matrix = matrix
+        if ChangeMonitor.current is not None:
+            ChangeMonitor.current.report_change()
 
     @property
     def local_position(self):
@@ -101,10 +104,14 @@ class Object3D:
     def add(self, child):
         self._children_list.append(child)
         child.parent = self
+        if ChangeMonitor.current is not None:
+            ChangeMonitor.current.report_change()
 
     def remove(self, child):
         self._children_list.remove(child)
         child.parent = None
+        if ChangeMonitor.current is not None:
+            ChangeMonitor.current.report_change()
 
     # apply geometric transformations
     def apply_matrix(self, matrix, local=True):
@@ -114,6 +121,8 @@ class Object3D:
         else:
             # global transform
             self._matrix = matrix @ self._matrix
+        if ChangeMonitor.current is not None:
+            ChangeMonitor.current.report_change()
 
     def translate(self, x, y, z, local=True):
         m = Matrix.make_translation(x, y, z)
@@ -140,9 +149,13 @@ class Object3D:
         self._matrix.itemset((0, 3), position[0])
         self._matrix.itemset((1, 3), position[1])
         self._matrix.itemset((2, 3), position[2])
+        if ChangeMonitor.current is not None:
+            ChangeMonitor.current.report_change()
 
     def look_at(self, target_position):
         self._matrix = Matrix.make_look_at(self.global_position, target_position)
+        if ChangeMonitor.current is not None:
+            ChangeMonitor.current.report_change()
 
     def set_direction(self, direction):
         position = self.local_position
@@ -152,5 +165,4 @@ class Object3D:
             position[1] + direction[1],
             position[2] + direction[2]
         ]
-        print("target:", target_position)
         self.look_at(target_position)
@@ -0,0 +1,156 @@
+import ctypes
+import os
+
+# PyOpenGL binds its functions to the platform named by PYOPENGL_PLATFORM when OpenGL is imported first,
+# so this module must be imported before any other module of the framework.
+# Mesa then runs without a display server (e.g. with the llvmpipe software rasterizer).
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+if os.environ["PYOPENGL_PLATFORM"] == "egl":
+    os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
+import OpenGL.GL as GL
+import numpy as np
+from OpenGL import platform
+from PIL import Image
+
+from core.gl_state import GLState
+from core_ext.render_target import RenderTarget
+
+
+class OffscreenContext:
+    """
+    OpenGL context without a window, created with EGL (pbuffer or surfaceless) or OSMesa,
+    as selected by PYOPENGL_PLATFORM ("egl" by default). The scene is rendered into a framebuffer object
+    of the given resolution, which is passed to the Renderer as its window:
+
+        context = OffscreenContext(800, 600)
+        renderer = Renderer(window_size=context.size, window_render_target=context.render_target)
+        renderer.render(scene, camera)
+        context.save_image("thumbnail.png")
+    """
+    def __init__(self, width, height, gl_version=(3, 3)):
+        self._width = width
+        self._height = height
+        self._platform_name = type(platform.PLATFORM).__name__
+        # Handles released by destroy()
+        self._egl_display = None
+        self._egl_surface = None
+        self._egl_context = None
+        self._osmesa_context = None
+        self._osmesa_buffer = None
+        if self._platform_name == "EGLPlatform":
+            self._create_egl_context(gl_version)
+        elif self._platform_name == "OSMesaPlatform":
+            self._create_osmesa_context(gl_version)
+        else:
+            raise Exception(f"Offscreen rendering needs PYOPENGL_PLATFORM=egl or osmesa, "
+                            f"but OpenGL was loaded for {self._platform_name}; "
+                            f"import core_ext.offscreen_context before the other modules")
+        # Programs and state cached for a previous context must not be used in this one
+        GLState.reset()
+        self._render_target = RenderTarget(resolution=(width, height))
+
+    @property
+    def size(self):
+        return self._width, self._height
+
+    @property
+    def render_target(self):
+        """ Framebuffer object standing in for the window """
+        return self._render_target
+
+    def read_pixels(self):
+        """ Return the rendered image as an array of shape (height, width, 4) of bytes, top row first """
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self._render_target.framebuffer_ref)
+        GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 1)
+        data = GL.glReadPixels(0, 0, self._width, self._height, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE)
+        pixel_array = np.frombuffer(data, dtype=np.uint8).reshape(self._height, self._width, 4)
+        # OpenGL rows start at the bottom
+        return pixel_array[::-1]
+
+    def save_image(self, file_name):
+        Image.fromarray(self.read_pixels(), "RGBA").save(file_name)
+
+    def finish(self):
+        """ Wait until the GPU has executed all commands, e.g. before measuring the time of a frame """
+        GL.glFinish()
+
+    def destroy(self):
+        if self._egl_context is not None:
+            from OpenGL import EGL
+            EGL.eglMakeCurrent(self._egl_display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+            if self._egl_surface != EGL.EGL_NO_SURFACE:
+                EGL.eglDestroySurface(self._egl_display, self._egl_surface)
+            EGL.eglDestroyContext(self._egl_display, self._egl_context)
+            EGL.eglTerminate(self._egl_display)
+            self._egl_context = None
+        if self._osmesa_context is not None:
+            from OpenGL import osmesa
+            osmesa.OSMesaDestroyContext(self._osmesa_context)
+            self._osmesa_context = None
+
+    def _create_egl_context(self, gl_version):
+        from OpenGL import EGL
+        display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+            raise Exception("Unable to initialize the EGL display")
+        config_attribute_list = [
+            EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+            EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+            EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8, EGL.EGL_ALPHA_SIZE, 8,
+            EGL.EGL_DEPTH_SIZE, 24,
+            EGL.EGL_NONE
+        ]
+        config = EGL.EGLConfig()
+        config_count = EGL.EGLint()
+        EGL.eglChooseConfig(display, (EGL.EGLint * len(config_attribute_list))(*config_attribute_list),
+                            ctypes.pointer(config), 1, ctypes.pointer(config_count))
+        if config_count.value == 0:
+            # Surfaceless displays may offer no pbuffer configurations
+            config_attribute_list[1] = 0
+            EGL.eglChooseConfig(display, (EGL.EGLint * len(config_attribute_list))(*config_attribute_list),
+                                ctypes.pointer(config), 1, ctypes.pointer(config_count))
+            if config_count.value == 0:
+                raise Exception("No EGL configuration supports OpenGL rendering")
+        surface_attribute_list = [EGL.EGL_WIDTH, self._width, EGL.EGL_HEIGHT, self._height, EGL.EGL_NONE]
+        surface = EGL.eglCreatePbufferSurface(display, config,
+                                              (EGL.EGLint * len(surface_attribute_list))(*surface_attribute_list))
+        if not surface:
+            # The framebuffer object is rendered into, so a context without a surface suffices
+            surface = EGL.EGL_NO_SURFACE
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        context_attribute_list = [
+            EGL.EGL_CONTEXT_MAJOR_VERSION, gl_version[0],
+            EGL.EGL_CONTEXT_MINOR_VERSION, gl_version[1],
+            EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+            EGL.EGL_NONE
+        ]
+        context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT,
+                                       (EGL.EGLint * len(context_attribute_list))(*context_attribute_list))
+        if not context:
+            raise Exception(f"Unable to create an OpenGL {gl_version[0]}.{gl_version[1]} core context with EGL")
+        if not EGL.eglMakeCurrent(display, surface, surface, context):
+            raise Exception("Unable to make the EGL context current")
+        self._egl_display = display
+        self._egl_surface = surface
+        self._egl_context = context
+
+    def _create_osmesa_context(self, gl_version):
+        from OpenGL import arrays, osmesa
+        attribute_list = [
+            osmesa.OSMESA_FORMAT, osmesa.OSMESA_RGBA,
+            osmesa.OSMESA_DEPTH_BITS, 24,
+            osmesa.OSMESA_PROFILE, osmesa.OSMESA_CORE_PROFILE,
+            osmesa.OSMESA_CONTEXT_MAJOR_VERSION, gl_version[0],
+            osmesa.OSMESA_CONTEXT_MINOR_VERSION, gl_version[1],
+            0
+        ]
+        context = osmesa.OSMesaCreateContextAttribs(attribute_list, None)
+        if not context:
+            raise Exception(f"Unable to create an OpenGL {gl_version[0]}.{gl_version[1]} core context with OSMesa")
+        # Buffer of the default framebuffer; the scene is rendered into the framebuffer object
+        self._osmesa_buffer = arrays.GLubyteArray.zeros((self._height, self._width, 4))
+        if not osmesa.OSMesaMakeCurrent(context, self._osmesa_buffer, GL.GL_UNSIGNED_BYTE, self._width, self._height):
+            raise Exception("Unable to make the OSMesa context current")
+        self._osmesa_context = context
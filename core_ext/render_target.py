@@ -10,11 +10,70 @@ class RenderTarget:
     """
     Create a framebuffer as the target when rendering
     """
-    def __init__(self, resolution=(512, 512), texture=None, property_dict=None):
+    def __init__(self, resolution=(512, 512), texture=None, property_dict=None,
+                 depth_only=False, depth_format=GL.GL_DEPTH_COMPONENT24, layer_count=None, cube_map=False,
+                 color_format_list=None):
         # Values should equal texture dimensions
         self._width, self._height = resolution
-        if texture is not None:
+        # Depth-only targets have no color attachment;
+        # their texture stores the depth (e.g. shadow maps)
+        self._depth_only = depth_only
+        # Depth-only targets may store a texture array;
+        # every layer is rendered through its own framebuffer
+        if layer_count is not None and not depth_only:
+            raise Exception("Only depth-only render targets support texture layers")
+        # Depth-only targets may store a cube map instead; all its faces are attached at once
+        # (a layered framebuffer), so a geometry shader chooses the face of each primitive
+        if cube_map and (not depth_only or layer_count is not None or self._width != self._height):
+            raise Exception("Cube map render targets must be depth-only, square and without texture layers")
+        # Targets with a list of color formats write into several color textures at once
+        # (multiple render targets, e.g. a G-buffer); fragment output i goes to texture i.
+        # Their depth is stored in a texture as well, so that later passes can read it.
+        if color_format_list is not None and (depth_only or texture is not None or layer_count is not None):
+            raise Exception("Multiple render targets must create their own color textures")
+        self._layer_count = layer_count
+        self._cube_map = cube_map
+        self._texture_list = []
+        self._depth_texture = None
+        if color_format_list is not None:
+            for color_format in color_format_list:
+                color_texture = Texture(
+                    file_name=None,
+                    property_dict={
+                        "magFilter": GL.GL_NEAREST,
+                        "minFilter": GL.GL_NEAREST,
+                        "wrap": GL.GL_CLAMP_TO_EDGE
+                    }
+                )
+                color_texture.set_properties(property_dict)
+                color_texture.upload_empty_data(self._width, self._height, color_format)
+                self._texture_list.append(color_texture)
+            self._texture = self._texture_list[0]
+            self._depth_texture = Texture(
+                file_name=None,
+                property_dict={
+                    "magFilter": GL.GL_NEAREST,
+                    "minFilter": GL.GL_NEAREST,
+                    "wrap": GL.GL_CLAMP_TO_EDGE
+                }
+            )
+            self._depth_texture.upload_depth_data(self._width, self._height, depth_format, compare=False)
+        elif texture is not None:
             self._texture = texture
+        elif depth_only:
+            self._texture = Texture(
+                file_name=None,
+                property_dict={
+                    "magFilter": GL.GL_LINEAR,
+                    "minFilter": GL.GL_LINEAR,
+                    "wrap": GL.GL_CLAMP_TO_BORDER
+                }
+            )
+            self._texture.set_properties(property_dict)
+            if cube_map:
+                self._texture.upload_depth_cube_data(self._width, depth_format)
+            else:
+                self._texture.upload_depth_data(self._width, self._height, depth_format, layer_count)
         else:
             self._texture = Texture(
                 file_name=None,
@@ -28,25 +87,74 @@ class RenderTarget:
             # self._texture.surface = pygame.Surface(resolution)
             self._texture.surface = Image.new('RGBA', resolution)
             self._texture.upload_data()
-        # Create a framebuffer
-        self._framebuffer_ref = GL.glGenFramebuffers(1)
-        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self._framebuffer_ref)
-        # Configure color buffer to use this texture
-        GL.glFramebufferTexture(GL.GL_FRAMEBUFFER, GL.GL_COLOR_ATTACHMENT0,
-                                self._texture.texture_ref, 0)
-        # Generate a buffer to store depth information
-        depth_buffer_ref = GL.glGenRenderbuffers(1)
-        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, depth_buffer_ref)
-        GL.glRenderbufferStorage(GL.GL_RENDERBUFFER, GL.GL_DEPTH_COMPONENT, self._width, self._height)
-        GL.glFramebufferRenderbuffer(GL.GL_FRAMEBUFFER, GL.GL_DEPTH_ATTACHMENT, GL.GL_RENDERBUFFER, depth_buffer_ref)
-        # Check framebuffer status
-        if GL.glCheckFramebufferStatus(GL.GL_FRAMEBUFFER) != GL.GL_FRAMEBUFFER_COMPLETE:
-            raise Exception("Framebuffer status error")
+        # Create a framebuffer (one for each texture layer)
+        self._framebuffer_ref_list = []
+        for layer in range(layer_count if layer_count is not None else 1):
+            framebuffer_ref = GL.glGenFramebuffers(1)
+            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, framebuffer_ref)
+            if layer_count is not None:
+                # Store depth in one layer of the texture array and disable color output
+                GL.glFramebufferTextureLayer(GL.GL_FRAMEBUFFER, GL.GL_DEPTH_ATTACHMENT,
+                                             self._texture.texture_ref, 0, layer)
+                GL.glDrawBuffer(GL.GL_NONE)
+                GL.glReadBuffer(GL.GL_NONE)
+            elif color_format_list is not None:
+                # Attach every color texture and enable output to all of them
+                attachment_list = []
+                for index, color_texture in enumerate(self._texture_list):
+                    GL.glFramebufferTexture(GL.GL_FRAMEBUFFER, GL.GL_COLOR_ATTACHMENT0 + index,
+                                            color_texture.texture_ref, 0)
+                    attachment_list.append(GL.GL_COLOR_ATTACHMENT0 + index)
+                GL.glDrawBuffers(len(attachment_list), attachment_list)
+                GL.glFramebufferTexture(GL.GL_FRAMEBUFFER, GL.GL_DEPTH_ATTACHMENT,
+                                        self._depth_texture.texture_ref, 0)
+            elif depth_only:
+                # Store depth in the texture and disable color output
+                GL.glFramebufferTexture(GL.GL_FRAMEBUFFER, GL.GL_DEPTH_ATTACHMENT,
+                                        self._texture.texture_ref, 0)
+                GL.glDrawBuffer(GL.GL_NONE)
+                GL.glReadBuffer(GL.GL_NONE)
+            else:
+                # Configure color buffer to use this texture
+                GL.glFramebufferTexture(GL.GL_FRAMEBUFFER, GL.GL_COLOR_ATTACHMENT0,
+                                        self._texture.texture_ref, 0)
+                # Generate a buffer to store depth information
+                depth_buffer_ref = GL.glGenRenderbuffers(1)
+                GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, depth_buffer_ref)
+                GL.glRenderbufferStorage(GL.GL_RENDERBUFFER, GL.GL_DEPTH_COMPONENT, self._width, self._height)
+                GL.glFramebufferRenderbuffer(GL.GL_FRAMEBUFFER, GL.GL_DEPTH_ATTACHMENT, GL.GL_RENDERBUFFER, depth_buffer_ref)
+            # Check framebuffer status
+            if GL.glCheckFramebufferStatus(GL.GL_FRAMEBUFFER) != GL.GL_FRAMEBUFFER_COMPLETE:
+                raise Exception("Framebuffer status error")
+            self._framebuffer_ref_list.append(framebuffer_ref)
+        self._framebuffer_ref = self._framebuffer_ref_list[0]
+
+    @property
+    def cube_map(self):
+        return self._cube_map
+
+    @property
+    def depth_texture(self):
+        """ Depth texture of a target with multiple color textures (None for other targets) """
+        return self._depth_texture
+
+    @property
+    def depth_only(self):
+        return self._depth_only
 
     @property
     def framebuffer_ref(self):
         return self._framebuffer_ref
 
+    @property
+    def framebuffer_ref_list(self):
+        """ Framebuffers rendering into each texture layer (a single one for targets without layers) """
+        return self._framebuffer_ref_list
+
+    @property
+    def layer_count(self):
+        return self._layer_count
+
     @property
     def height(self):
         return self._height
@@ -58,3 +166,8 @@ class RenderTarget:
     @property
     def texture(self):
         return self._texture
+
+    @property
+    def texture_list(self):
+        """ Color textures of a target with multiple color textures (empty for other targets) """
+        return self._texture_list
@@ -1,120 +1,749 @@
+import itertools
+import math
+from time import perf_counter
+
 import OpenGL.GL as GL
+import numpy as np
+from numpy.linalg import inv
 
+from core.gl_state import GLState
+from core.render_stats import RenderStats
+from core.tracer import Tracer
+from core_ext.frustum import Frustum
+from core_ext.gpu_timer import GPUTimer
+from core_ext.light_clusters import LightClusters
+from core_ext.lod import LOD
 from core_ext.mesh import Mesh
+from core_ext.mesh_batch import MeshBatch
+from core_ext.render_target import RenderTarget
+from geometry.screen_quad import ScreenQuadGeometry
+from light.cascaded_shadow import CascadedShadow
 from light.light import Light
+from light.point_shadow import PointShadow
+from light.shadow_atlas import ShadowAtlas
 from light.shadow import Shadow
+from material.deferred_lighting import DeferredLightingMaterial
+from material.depth import DepthMaterial
+from material.gbuffer import GBufferMaterial
+from material.lambert import LambertMaterial
+from material.phong import PhongMaterial
 
 
 class Renderer:
-    def __init__(self, glWidget, clear_color=(0, 0, 0)):
+    # Window render target of the renderers created without one; lets a harness render
+    # unmodified examples into an offscreen context (see benchmarks/replay_examples.py)
+    default_window_render_target = None
+
+    def __init__(self, glWidget=None, clear_color=(0, 0, 0), window_size=None, window_render_target=None):
+        """
+        Without a glWidget (e.g. with an OffscreenContext), the size of the window must be given explicitly;
+        a window render target replaces the default framebuffer of the window
+        """
+        if window_render_target is None:
+            window_render_target = Renderer.default_window_render_target
+        # The renderer may be created for a new context (e.g. of another window),
+        # in which the state and the programs of the previous one are unknown
+        GLState.reset()
         GL.glEnable(GL.GL_DEPTH_TEST)
         # required for antialiasing
         GL.glEnable(GL.GL_MULTISAMPLE)
         GL.glClearColor(*clear_color, 1)
-        width = glWidget.size().width()
-        height = glWidget.size().height()
+        if glWidget is not None:
+            width = glWidget.size().width()
+            height = glWidget.size().height()
+        elif window_size is not None:
+            width, height = window_size
+        elif window_render_target is not None:
+            width, height = window_render_target.width, window_render_target.height
+        else:
+            raise Exception("Renderer needs a glWidget, a window size or a window render target")
         self._window_size = (width, height)
+        self._window_render_target = window_render_target
         self._shadows_enabled = False
+        self._cascaded_shadows_enabled = False
+        self._point_shadows_enabled = False
+        # Shadows of several lights sharing one depth texture; created by add_shadow_light
+        self._shadow_atlas = None
+        # Assignment of point lights to view frustum clusters; created by enable_clustered_lighting
+        self._light_clusters = None
+        # Light type 0 is ignored by the shaders
+        self._no_light = Light()
+        # Light -> packed values of the Light struct (see Light.packed_data), updated every frame
+        self._packed_light_dict = {}
+        # Deferred shading (see enable_deferred_shading);
+        # the G-buffer is created for the size of the first viewport
+        self._deferred_shading_enabled = False
+        self._gbuffer = None
+        # Opaque meshes are drawn depth-only before shading (see enable_depth_prepass)
+        self._depth_prepass_enabled = False
+        # Measures the GPU time of the passes (see enable_gpu_timer)
+        self._gpu_timer = None
+        # Counts the GL work and CPU time of each frame (see enable_stats)
+        self._stats = None
 
     @property
     def window_size(self):
         return self._window_size
 
+    @property
+    def window_framebuffer_ref(self):
+        """ Framebuffer used when rendering to the window: 0 or the framebuffer of the window render target """
+        if self._window_render_target is None:
+            return 0
+        return self._window_render_target.framebuffer_ref
+
     @property
     def shadow_object(self):
         return self._shadow_object
 
+    @property
+    def cascaded_shadow_object(self):
+        return self._cascaded_shadow_object
+
+    @property
+    def point_shadow_object(self):
+        return self._point_shadow_object
+
+    @property
+    def gpu_timer(self):
+        return self._gpu_timer
+
+    @property
+    def stats(self):
+        return self._stats
+
+    @property
+    def gbuffer(self):
+        """ Render target storing the surfaces of the deferred meshes (None before the first deferred frame) """
+        return self._gbuffer
+
+    @property
+    def light_clusters(self):
+        return self._light_clusters
+
+    @property
+    def shadow_atlas(self):
+        return self._shadow_atlas
+
     def render(self, scene, camera, clear_color=True, clear_depth=True, render_target=None):
+        self._begin_timing("render")
+        stats = self._stats
+        if stats is not None:
+            render_start_time = perf_counter()
         # Filter descendents
         descendant_list = scene.descendant_list
         mesh_filter = lambda x: isinstance(x, Mesh)
         mesh_list = list(filter(mesh_filter, descendant_list))
+        # Update camera view (calculate inverse)
+        camera.update_view_matrix()
+        # Choose the geometry of each level-of-detail object and collect the member matrices of each batch
+        # before any pass draws them
+        for mesh in mesh_list:
+            if isinstance(mesh, LOD):
+                mesh.select_level(camera)
+            elif isinstance(mesh, MeshBatch):
+                mesh.update_matrix_buffer()
+        if stats is not None:
+            shadow_start_time = perf_counter()
+            stats.add_time("traversal", shadow_start_time - render_start_time)
 
         # shadow pass
+        self._begin_timing("shadows")
+        # Casters between a light and the near plane of its orthographic shadow camera are kept;
+        # depth clamping flattens them onto the near plane instead of clipping them
+        GLState.enable(GL.GL_DEPTH_CLAMP)
         if self._shadows_enabled:
-            # Set render target properties
-            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self._shadow_object.render_target.framebuffer_ref)
-            GL.glViewport(0, 0, self._shadow_object.render_target.width, self._shadow_object.render_target.height)
-            # Set default color to white, used when no objects present to cast shadows
-            GL.glClearColor(1, 1, 1, 1)
-            GL.glClear(GL.GL_COLOR_BUFFER_BIT)
-            GL.glClear(GL.GL_DEPTH_BUFFER_BIT)
-            # Everything in the scene gets rendered with depthMaterial so
-            # only need to call glUseProgram & set matrices once
-            GL.glUseProgram(self._shadow_object.material.program_ref)
-            self._shadow_object.update_internal()
-            for mesh in mesh_list:
-                # Skip invisible meshes
-                if not mesh.visible:
-                    continue
-                # Only triangle-based meshes cast shadows
-                if mesh.material.setting_dict["drawStyle"] != GL.GL_TRIANGLES:
-                    continue
-                # Bind VAO
-                GL.glBindVertexArray(mesh.vao_ref)
-                # Update transform data
-                self._shadow_object.material.uniform_dict["modelMatrix"].data = mesh.global_matrix
-                # Update uniforms (matrix data) stored in shadow material
-                for var_name, uniform_obj in self._shadow_object.material.uniform_dict.items():
-                    uniform_obj.upload_data()
-                GL.glDrawArrays(GL.GL_TRIANGLES, 0, mesh.geometry.vertex_count)
+            self._render_shadow_pass(mesh_list)
+        if self._cascaded_shadows_enabled:
+            self._render_cascaded_shadow_pass(camera, mesh_list)
+        if self._shadow_atlas is not None:
+            self._render_shadow_atlas_pass(camera, mesh_list)
+        GLState.disable(GL.GL_DEPTH_CLAMP)
+        if self._point_shadows_enabled:
+            self._render_point_shadow_pass(mesh_list)
+        self._end_timing("shadows")
+        if stats is not None:
+            traversal_start_time = perf_counter()
+            stats.add_time("shadows", traversal_start_time - shadow_start_time)
+
+        # Extract list of all Light instances in scene
+        light_list = list(filter(lambda x: isinstance(x, Light), descendant_list))
+        # Light struct values are packed once per frame and shared by all meshes
+        self._packed_light_dict = {light: light.packed_data for light in light_list}
+        if render_target is None:
+            viewport_size = self._window_size
+        else:
+            viewport_size = (render_target.width, render_target.height)
+        if self._light_clusters is not None:
+            self._light_clusters.update(camera, light_list, viewport_size)
+        # Sort visible meshes into render queues by the way their material treats alpha:
+        # "opaque" and "alphaTest" (fragments are kept or discarded) need no blending
+        opaque_list = []
+        transparent_list = []
+        for mesh in mesh_list:
+            # If this object is not visible, continue to next object in list
+            if not mesh.visible:
+                if stats is not None:
+                    stats.culled_meshes += 1
+                continue
+            if mesh.material.setting_dict["alphaMode"] == "transparent":
+                transparent_list.append(mesh)
+            else:
+                opaque_list.append(mesh)
+        # Sort keys are the camera-space depths of the bounding sphere centers
+        view_matrix = camera.view_matrix
+        depth_key = lambda x: -(view_matrix[2, 0:3] @ x.bounding_sphere[0] + view_matrix[2, 3])
+        # Opaque objects front to back, so that hidden fragments fail the depth test early
+        opaque_list.sort(key=depth_key)
+        if stats is not None:
+            stats.add_time("traversal", perf_counter() - traversal_start_time)
+        # Deferred meshes are drawn into the G-buffer before the render target is activated
+        deferred_list = []
+        if self._deferred_shading_enabled:
+            deferred_list = [mesh for mesh in opaque_list if self._is_deferred(mesh)]
+            opaque_list = [mesh for mesh in opaque_list if not self._is_deferred(mesh)]
+            if deferred_list:
+                self._begin_timing("gbuffer")
+                self._render_gbuffer_pass(deferred_list, camera, viewport_size)
+                self._end_timing("gbuffer")
 
         # Activate render target
         if render_target is None:
             # Set render target to window
             # (the value 0 is indicating the framebuffer attached to the window)
-            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
-            GL.glViewport(0, 0, *self._window_size)
+            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.window_framebuffer_ref)
         else:
             # Set render target properties
             GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, render_target.framebuffer_ref)
-            GL.glViewport(0, 0, render_target.width, render_target.height)
+        GL.glViewport(0, 0, *viewport_size)
         # Clear color and depth buffers
         # GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+        # (depth values are only cleared while depth writes are enabled)
+        GLState.depth_mask(True)
         if clear_color:
             GL.glClear(GL.GL_COLOR_BUFFER_BIT)
         if clear_depth:
             GL.glClear(GL.GL_DEPTH_BUFFER_BIT)
-        # blending
-        GL.glEnable(GL.GL_BLEND)
-        GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
-        # Update camera view (calculate inverse)
-        camera.update_view_matrix()
-        # Extract list of all Mesh instances in scene
-        descendant_list = scene.descendant_list
-        mesh_list = list(filter(lambda x: isinstance(x, Mesh), descendant_list))
-        # Extract list of all Light instances in scene
-        light_list = list(filter(lambda x: isinstance(x, Light), descendant_list))
+        if deferred_list:
+            self._begin_timing("lighting")
+            self._render_deferred_lighting_pass(camera, light_list, viewport_size)
+            self._end_timing("lighting")
+        GLState.disable(GL.GL_BLEND)
+        prepass_list = []
+        if self._depth_prepass_enabled:
+            prepass_list = [mesh for mesh in opaque_list if self._uses_depth_prepass(mesh)]
+            opaque_list = [mesh for mesh in opaque_list if not self._uses_depth_prepass(mesh)]
+            if prepass_list:
+                self._begin_timing("depthPrepass")
+                self._render_depth_prepass(prepass_list, camera)
+                self._end_timing("depthPrepass")
+        self._begin_timing("opaque")
+        if prepass_list:
+            # Each pixel is shaded once, by the fragment that left its depth in the prepass
+            GLState.depth_func(GL.GL_EQUAL)
+            GLState.depth_mask(False)
+            for mesh in prepass_list:
+                self._draw_mesh(mesh, camera, light_list)
+            GLState.depth_func(GL.GL_LESS)
+            GLState.depth_mask(True)
+        for mesh in opaque_list:
+            self._draw_mesh(mesh, camera, light_list)
+        self._end_timing("opaque")
+        # Transparent objects back to front, blended over everything drawn before them;
+        # they are tested against the depth buffer but do not write to it
+        if transparent_list:
+            self._begin_timing("transparent")
+            transparent_list.sort(key=depth_key, reverse=True)
+            GLState.enable(GL.GL_BLEND)
+            GLState.blend_func(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
+            GLState.depth_mask(False)
+            for mesh in transparent_list:
+                self._draw_mesh(mesh, camera, light_list)
+            GLState.depth_mask(True)
+            self._end_timing("transparent")
+        self._end_timing("render")
+        if stats is not None:
+            stats.add_time("render", perf_counter() - render_start_time)
+
+    def _begin_timing(self, name):
+        """ Start a section of the GPU timer and of the current tracer, if enabled """
+        if self._gpu_timer is not None:
+            self._gpu_timer.begin(name)
+        if Tracer.current is not None:
+            Tracer.current.begin(name)
+
+    def _end_timing(self, name):
+        if self._gpu_timer is not None:
+            self._gpu_timer.end(name)
+        if Tracer.current is not None:
+            Tracer.current.end(name)
+
+    def _render_shadow_pass(self, mesh_list):
+        """
+        Render the depth texture of the shadow object. The pass is skipped if the light, the shadow camera
+        and all casters are unchanged; static casters are cached in a separate depth map,
+        so that moving (dynamic) casters only need to be drawn over a copy of it.
+        """
+        shadow = self._shadow_object
+        shadow.update_internal()
+        caster_list = self._cull_shadow_casters(self._get_shadow_casters(mesh_list), shadow.camera)
+        static_list = [mesh for mesh in caster_list if mesh.static]
+        dynamic_list = [mesh for mesh in caster_list if not mesh.static]
+        static_changed, dynamic_changed = shadow.update_cache(static_list, dynamic_list)
+        if not static_changed and not dynamic_changed:
+            # The depth texture of the previous pass is still valid
+            return
+        # Everything in the scene gets rendered with depthMaterial so
+        # only need to call glUseProgram & set matrices once
+        GLState.use_program(shadow.material.program_ref)
+        shadow.material.uniform_dict["viewMatrix"].upload_data()
+        shadow.material.uniform_dict["projectionMatrix"].upload_data()
+        if not dynamic_list or not static_list:
+            self._draw_shadow_casters(shadow.material, shadow.render_target, caster_list)
+        else:
+            if static_changed or not shadow.static_map_valid:
+                self._draw_shadow_casters(shadow.material, shadow.static_render_target, static_list)
+                shadow.static_map_valid = True
+            # Start from a copy of the static depth map
+            width, height = shadow.render_target.width, shadow.render_target.height
+            GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, shadow.static_render_target.framebuffer_ref)
+            GL.glBindFramebuffer(GL.GL_DRAW_FRAMEBUFFER, shadow.render_target.framebuffer_ref)
+            GL.glBlitFramebuffer(0, 0, width, height, 0, 0, width, height,
+                                 GL.GL_DEPTH_BUFFER_BIT, GL.GL_NEAREST)
+            self._draw_shadow_casters(shadow.material, shadow.render_target, dynamic_list, clear=False)
+
+    def _render_cascaded_shadow_pass(self, camera, mesh_list):
+        """ Fit the shadow cascades to the camera and render the casters of each cascade into its layer """
+        cascaded_shadow = self._cascaded_shadow_object
+        caster_list_per_cascade = cascaded_shadow.update(camera, self._get_shadow_casters(mesh_list))
+        depth_material = cascaded_shadow.material
+        GLState.use_program(depth_material.program_ref)
+        # All cascades share the view matrix of the light
+        depth_material.uniform_dict["viewMatrix"].data = cascaded_shadow.view_matrix
+        depth_material.uniform_dict["viewMatrix"].upload_data()
+        projection_matrix_uniform = depth_material.uniform_dict["projectionMatrix"]
+        for layer, caster_list in enumerate(caster_list_per_cascade):
+            projection_matrix_uniform.data = cascaded_shadow.projection_matrix_list[layer]
+            projection_matrix_uniform.upload_data()
+            self._draw_shadow_casters(depth_material, cascaded_shadow.render_target, caster_list, layer=layer)
+
+    def _render_point_shadow_pass(self, mesh_list):
+        """
+        Render the light distance of the casters into the depth cube map of the point shadow;
+        the geometry shader draws each caster into the cube faces it may be visible from
+        """
+        point_shadow = self._point_shadow_object
+        caster_list = point_shadow.update(self._get_shadow_casters(mesh_list))
+        depth_material = point_shadow.material
+        render_target = point_shadow.render_target
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, render_target.framebuffer_ref)
+        GL.glViewport(0, 0, render_target.width, render_target.height)
+        GLState.depth_mask(True)
+        # Clears all six faces of the layered framebuffer
+        GL.glClear(GL.GL_DEPTH_BUFFER_BIT)
+        GLState.use_program(depth_material.program_ref)
+        for uniform_name in ("faceMatrices", "lightPosition", "farPlane"):
+            depth_material.uniform_dict[uniform_name].upload_data()
+        model_matrix_uniform = depth_material.uniform_dict["modelMatrix"]
+        face_mask_uniform = depth_material.uniform_dict["faceMask"]
+        for mesh, face_mask in caster_list:
+            face_mask_uniform.data = face_mask
+            if isinstance(mesh, MeshBatch):
+                self._draw_batch_depth(mesh, depth_material)
+                continue
+            GL.glBindVertexArray(mesh.vao_ref)
+            model_matrix_uniform.data = mesh.global_matrix
+            model_matrix_uniform.upload_data()
+            face_mask_uniform.upload_data()
+            mesh.draw(GL.GL_TRIANGLES)
+
+    def _render_shadow_atlas_pass(self, camera, mesh_list):
+        """ Assign the atlas tiles and render the casters of every shadow into its tile, binding one framebuffer """
+        shadow_atlas = self._shadow_atlas
+        shadow_atlas.update(camera)
+        caster_list = self._get_shadow_casters(mesh_list)
+        depth_material = shadow_atlas.material
+        GLState.use_program(depth_material.program_ref)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, shadow_atlas.render_target.framebuffer_ref)
+        GLState.depth_mask(True)
+        GL.glClear(GL.GL_DEPTH_BUFFER_BIT)
+        model_matrix_uniform = depth_material.uniform_dict["modelMatrix"]
+        for shadow in shadow_atlas.allocated_shadow_list:
+            shadow_caster_list = self._cull_shadow_casters(caster_list, shadow.camera)
+            if not shadow_caster_list:
+                continue
+            x, y, size = shadow.rect
+            GL.glViewport(x, y, size, size)
+            depth_material.uniform_dict["viewMatrix"].data = shadow.camera.view_matrix
+            depth_material.uniform_dict["projectionMatrix"].data = shadow.camera.projection_matrix
+            depth_material.uniform_dict["viewMatrix"].upload_data()
+            depth_material.uniform_dict["projectionMatrix"].upload_data()
+            for mesh in shadow_caster_list:
+                if isinstance(mesh, MeshBatch):
+                    self._draw_batch_depth(mesh, depth_material)
+                    continue
+                GL.glBindVertexArray(mesh.vao_ref)
+                model_matrix_uniform.data = mesh.global_matrix
+                model_matrix_uniform.upload_data()
+                mesh.draw(GL.GL_TRIANGLES)
+
+    @staticmethod
+    def _uses_depth_prepass(mesh):
+        """ Alpha-tested meshes discard fragments, which the depth material would not do """
+        setting_dict = mesh.material.setting_dict
+        return setting_dict["alphaMode"] == "opaque" and setting_dict["depthPrepass"]
+
+    def _render_depth_prepass(self, mesh_list, camera):
+        """ Draw the depth of opaque meshes into the active render target without writing colors """
+        depth_material = self._prepass_material
+        GLState.use_program(depth_material.program_ref)
+        depth_material.uniform_dict["viewMatrix"].data = camera.view_matrix
+        depth_material.uniform_dict["projectionMatrix"].data = camera.projection_matrix
+        depth_material.uniform_dict["viewMatrix"].upload_data()
+        depth_material.uniform_dict["projectionMatrix"].upload_data()
+        model_matrix_uniform = depth_material.uniform_dict["modelMatrix"]
+        GLState.color_mask(False)
         for mesh in mesh_list:
-            # If this object is not visible, continue to next object in list
-            if not mesh.visible:
+            # Face culling, wireframe mode and line width of the shading material
+            mesh.material.update_render_settings()
+            if isinstance(mesh, MeshBatch):
+                self._draw_batch_depth(mesh, depth_material)
                 continue
-            GL.glUseProgram(mesh.material.program_ref)
-            # Bind VAO
             GL.glBindVertexArray(mesh.vao_ref)
-            # Update uniform values stored outside of material
-            mesh.material.uniform_dict["modelMatrix"].data = mesh.global_matrix
-            mesh.material.uniform_dict["viewMatrix"].data = camera.view_matrix
-            mesh.material.uniform_dict["projectionMatrix"].data = camera.projection_matrix
-            # If material uses light data, add lights from list
-            if "light0" in mesh.material.uniform_dict.keys():
-                for light_number in range(len(light_list)):
-                    light_name = "light" + str(light_number)
-                    light_instance = light_list[light_number]
-                    mesh.material.uniform_dict[light_name].data = light_instance
-            # Add camera position if needed (specular lighting)
-            if "viewPosition" in mesh.material.uniform_dict.keys():
-                mesh.material.uniform_dict["viewPosition"].data = camera.global_position
-            # Add shadow data if enabled and used by shader
-            if self._shadows_enabled and "shadow0" in mesh.material.uniform_dict.keys():
-                mesh.material.uniform_dict["shadow0"].data = self._shadow_object
-            # Update uniforms stored in material
-            for uniform_object in mesh.material.uniform_dict.values():
+            model_matrix_uniform.data = mesh.global_matrix
+            model_matrix_uniform.upload_data()
+            mesh.draw(mesh.material.setting_dict["drawStyle"])
+        GLState.color_mask(True)
+
+    @staticmethod
+    def _is_deferred(mesh):
+        """ Return True for meshes lit by the deferred passes: opaque triangles with a Lambert or Phong material """
+        material = mesh.material
+        if isinstance(mesh, MeshBatch) or not isinstance(material, (LambertMaterial, PhongMaterial)):
+            return False
+        if material.setting_dict["alphaMode"] != "opaque" or material.setting_dict["drawStyle"] != GL.GL_TRIANGLES:
+            return False
+        # Shadows are only calculated by the forward shaders
+        return not any(material.uniform_dict[name].data
+                       for name in ("useShadow", "useCascadedShadow", "usePointShadow", "useShadowAtlas"))
+
+    def _get_gbuffer_variant(self, mesh):
+        """ Return the G-buffer material of the material of a mesh and the vertex array object of its geometry """
+        material = mesh.material
+        if material not in self._gbuffer_material_dict:
+            self._gbuffer_material_dict[material] = GBufferMaterial(
+                use_texture="textureSampler" in material.uniform_dict,
+                use_bump_texture="bumpTextureSampler" in material.uniform_dict)
+        gbuffer_material = self._gbuffer_material_dict[material]
+        # Level-of-detail meshes change their geometry
+        key = (mesh.geometry, gbuffer_material)
+        if key not in self._gbuffer_vao_dict:
+            self._gbuffer_vao_dict[key] = Mesh.create_vao(mesh.geometry, gbuffer_material)
+        return gbuffer_material, self._gbuffer_vao_dict[key]
+
+    def _render_gbuffer_pass(self, mesh_list, camera, viewport_size):
+        """ Draw the surface attributes of the deferred meshes into the G-buffer (recreated if the viewport size changes) """
+        if self._gbuffer is None or (self._gbuffer.width, self._gbuffer.height) != tuple(viewport_size):
+            # Albedo and specular strength; normal and shininess
+            self._gbuffer = RenderTarget(viewport_size, color_format_list=[GL.GL_RGBA16F, GL.GL_RGBA16F])
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self._gbuffer.framebuffer_ref)
+        GL.glViewport(0, 0, *viewport_size)
+        GLState.depth_mask(True)
+        GLState.disable(GL.GL_BLEND)
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+        for mesh in mesh_list:
+            gbuffer_material, vao_ref = self._get_gbuffer_variant(mesh)
+            GLState.use_program(gbuffer_material.program_ref)
+            GL.glBindVertexArray(vao_ref)
+            # The G-buffer material gets the current values of the uniforms of the forward material
+            for variable_name, uniform_object in gbuffer_material.uniform_dict.items():
+                if variable_name in mesh.material.uniform_dict.keys():
+                    uniform_object.data = mesh.material.uniform_dict[variable_name].data
+            gbuffer_material.uniform_dict["modelMatrix"].data = mesh.global_matrix
+            gbuffer_material.uniform_dict["viewMatrix"].data = camera.view_matrix
+            gbuffer_material.uniform_dict["projectionMatrix"].data = camera.projection_matrix
+            for uniform_object in gbuffer_material.uniform_dict.values():
                 uniform_object.upload_data()
-            # Update render settings
+            # Face culling and wireframe mode of the forward material
             mesh.material.update_render_settings()
-            GL.glDrawArrays(mesh.material.setting_dict["drawStyle"], 0, mesh.geometry.vertex_count)
+            mesh.draw(GL.GL_TRIANGLES)
+        if self._stats is not None:
+            self._stats.drawn_meshes += len(mesh_list)
+
+    def _render_deferred_lighting_pass(self, camera, light_list, viewport_size):
+        """
+        Light the G-buffer into the active render target with one full-screen pass per light.
+        The first pass also writes the depth of the G-buffer, so that forward meshes are depth tested against it;
+        the following passes add their light where the depth is equal, restricted by the scissor rectangle
+        enclosing the influence sphere of point lights.
+        """
+        lighting_material = self._deferred_lighting_mesh.material
+        uniform_dict = lighting_material.uniform_dict
+        GLState.use_program(lighting_material.program_ref)
+        GL.glBindVertexArray(self._deferred_lighting_mesh.vao_ref)
+        uniform_dict["viewPosition"].data = camera.global_position
+        uniform_dict["inverseViewProjectionMatrix"].data = inv(camera.projection_matrix @ camera.view_matrix)
+        uniform_dict["albedoSampler"].data[0] = self._gbuffer.texture_list[0].texture_ref
+        uniform_dict["normalSampler"].data[0] = self._gbuffer.texture_list[1].texture_ref
+        uniform_dict["depthSampler"].data[0] = self._gbuffer.depth_texture.texture_ref
+        GLState.disable(GL.GL_CULL_FACE)
+        GLState.polygon_mode(GL.GL_FILL)
+        light_uniform = uniform_dict["light0"]
+        # Without lights the surfaces stay black, but still get their depth
+        light_list = light_list if light_list else [self._no_light]
+        light_uniform.data = light_list[0]
+        for uniform_object in uniform_dict.values():
+            uniform_object.upload_data()
+        GLState.disable(GL.GL_BLEND)
+        GLState.depth_func(GL.GL_LEQUAL)
+        self._deferred_lighting_mesh.draw(GL.GL_TRIANGLES)
+        if len(light_list) > 1:
+            GLState.enable(GL.GL_BLEND)
+            GLState.blend_func(GL.GL_ONE, GL.GL_ONE)
+            GLState.depth_mask(False)
+            GLState.depth_func(GL.GL_EQUAL)
+            GLState.enable(GL.GL_SCISSOR_TEST)
+            for light in light_list[1:]:
+                rect = self._get_light_rect(light, camera, viewport_size)
+                if rect is None:
+                    continue
+                GL.glScissor(*rect)
+                light_uniform.data = light
+                light_uniform.upload_data()
+                self._deferred_lighting_mesh.draw(GL.GL_TRIANGLES)
+            GLState.disable(GL.GL_SCISSOR_TEST)
+            GLState.disable(GL.GL_BLEND)
+            GLState.depth_mask(True)
+        GLState.depth_func(GL.GL_LESS)
 
-    def enable_shadows(self, shadow_light, strength=0.5, resolution=(512, 512)):
+    @staticmethod
+    def _get_light_rect(light, camera, viewport_size):
+        """
+        Return the pixel rectangle (x, y, width, height) enclosing the influence sphere of a point light
+        (the whole viewport for other lights), or None if the sphere is outside of the view
+        """
+        width, height = viewport_size
+        if light.light_type != Light.POINT or math.isinf(light.influence_radius):
+            return 0, 0, width, height
+        view_matrix = camera.view_matrix
+        center = view_matrix[0:3, 0:3] @ light.global_position + view_matrix[0:3, 3]
+        # The projected corners of the bounding box enclose the projected sphere,
+        # unless the box reaches behind the camera
+        corner_array = center + light.influence_radius * np.array(list(itertools.product((-1, 1), repeat=3)))
+        clip_array = np.c_[corner_array, np.ones(8)] @ camera.projection_matrix.T
+        if np.all(clip_array[:, 3] <= 0):
+            return None
+        if np.any(clip_array[:, 3] <= 0):
+            return 0, 0, width, height
+        ndc_array = clip_array[:, 0:2] / clip_array[:, 3:4]
+        ndc_min = ndc_array.min(axis=0)
+        ndc_max = ndc_array.max(axis=0)
+        if np.any(ndc_max < -1) or np.any(ndc_min > 1):
+            return None
+        x_min, y_min = np.floor((np.clip(ndc_min, -1, 1) + 1) / 2 * (width, height)).astype(int)
+        x_max, y_max = np.ceil((np.clip(ndc_max, -1, 1) + 1) / 2 * (width, height)).astype(int)
+        return int(x_min), int(y_min), int(x_max - x_min), int(y_max - y_min)
+
+    @staticmethod
+    def _get_shadow_casters(mesh_list):
+        # Only visible triangle-based meshes cast shadows, unless they opt out
+        return [mesh for mesh in mesh_list
+                if mesh.visible and mesh.cast_shadow and mesh.material.setting_dict["drawStyle"] == GL.GL_TRIANGLES]
+
+    @staticmethod
+    def _cull_shadow_casters(caster_list, shadow_camera):
+        """
+        Return the casters whose bounding spheres intersect the volume of a shadow camera
+        (its view matrix must be up to date), extended towards the light
+        """
+        frustum = Frustum(shadow_camera.projection_matrix @ shadow_camera.view_matrix)
+        inside_list = [mesh for mesh in caster_list if frustum.intersects_sphere(*mesh.bounding_sphere, skip_near=True)]
+        if RenderStats.current is not None:
+            RenderStats.current.culled_shadow_casters += len(caster_list) - len(inside_list)
+        return inside_list
+
+    def _draw_shadow_casters(self, depth_material, render_target, caster_list, clear=True, layer=0):
+        """ Draw casters into (a layer of) a depth-only render target; the depth program must be in use """
+        # Set render target properties
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, render_target.framebuffer_ref_list[layer])
+        GL.glViewport(0, 0, render_target.width, render_target.height)
+        if clear:
+            # Shadow maps only store depth
+            GLState.depth_mask(True)
+            GL.glClear(GL.GL_DEPTH_BUFFER_BIT)
+        model_matrix_uniform = depth_material.uniform_dict["modelMatrix"]
+        for mesh in caster_list:
+            if isinstance(mesh, MeshBatch):
+                self._draw_batch_depth(mesh, depth_material)
+                continue
+            # Bind VAO
+            GL.glBindVertexArray(mesh.vao_ref)
+            # Only the transform data changes between casters
+            model_matrix_uniform.data = mesh.global_matrix
+            model_matrix_uniform.upload_data()
+            mesh.draw(GL.GL_TRIANGLES)
+
+    def _draw_mesh(self, mesh, camera, light_list):
+        stats = self._stats
+        if stats is not None:
+            uniform_start_time = perf_counter()
+            stats.drawn_meshes += 1
+        GLState.use_program(mesh.material.program_ref)
+        # Bind VAO
+        GL.glBindVertexArray(mesh.vao_ref)
+        # Update uniform values stored outside of material
+        mesh.material.uniform_dict["modelMatrix"].data = mesh.global_matrix
+        mesh.material.uniform_dict["viewMatrix"].data = camera.view_matrix
+        mesh.material.uniform_dict["projectionMatrix"].data = camera.projection_matrix
+        # If material uses light data, add the most influential lights from list
+        if "lights" in mesh.material.uniform_dict.keys():
+            if "lightClusters" in mesh.material.uniform_dict.keys():
+                # Point lights are evaluated through the light clusters
+                mesh.material.uniform_dict["lightClusters"].data = self._light_clusters
+                candidate_list = [light for light in light_list if light.light_type != Light.POINT]
+            else:
+                candidate_list = light_list
+            selected_list = self._select_lights(mesh, candidate_list, mesh.material.number_of_light_sources)
+            mesh.material.uniform_dict["lights"].data = [self._packed_light_dict[light] for light in selected_list]
+            mesh.material.uniform_dict["lightCount"].data = len(selected_list)
+        # Add camera position if needed (specular lighting)
+        if "viewPosition" in mesh.material.uniform_dict.keys():
+            mesh.material.uniform_dict["viewPosition"].data = camera.global_position
+        if "receiveShadow" in mesh.material.uniform_dict.keys():
+            mesh.material.uniform_dict["receiveShadow"].data = mesh.receive_shadow
+        # Add shadow data if enabled and used by shader
+        if self._shadows_enabled and "shadow0" in mesh.material.uniform_dict.keys():
+            mesh.material.uniform_dict["shadow0"].data = self._shadow_object
+        if self._cascaded_shadows_enabled and "cascadedShadow" in mesh.material.uniform_dict.keys():
+            mesh.material.uniform_dict["cascadedShadow"].data = self._cascaded_shadow_object
+        if self._point_shadows_enabled and "pointShadow" in mesh.material.uniform_dict.keys():
+            mesh.material.uniform_dict["pointShadow"].data = self._point_shadow_object
+        if self._shadow_atlas is not None and "shadowAtlas" in mesh.material.uniform_dict.keys():
+            mesh.material.uniform_dict["shadowAtlas"].data = self._shadow_atlas
+        # Update uniforms stored in material
+        for uniform_object in mesh.material.uniform_dict.values():
+            uniform_object.upload_data()
+        # Update render settings
+        mesh.material.update_render_settings()
+        if stats is None:
+            mesh.draw(mesh.material.setting_dict["drawStyle"])
+        else:
+            draw_start_time = perf_counter()
+            stats.add_time("uniforms", draw_start_time - uniform_start_time)
+            mesh.draw(mesh.material.setting_dict["drawStyle"])
+            stats.add_time("draw", perf_counter() - draw_start_time)
+
+    @staticmethod
+    def _select_lights(mesh, light_list, slot_count):
+        """
+        Return at most slot_count lights for a mesh: the lights with the highest influence on its bounding sphere,
+        ignoring point lights whose influence sphere does not reach it
+        """
+        center, radius = mesh.bounding_sphere
+        influence_list = []
+        for light in light_list:
+            influence = light.get_influence(center, radius)
+            if influence > 0:
+                influence_list.append((influence, light))
+        if len(influence_list) > slot_count:
+            # Stable sort: equally influential lights keep the order of the scene
+            influence_list.sort(key=lambda x: -x[0])
+        return [light for influence, light in influence_list[:slot_count]]
+
+    @staticmethod
+    def _draw_batch_depth(mesh_batch, depth_material):
+        """ Draw a mesh batch with the batched variant of a depth material, then restore its program """
+        variant, vao_ref = mesh_batch.get_variant(depth_material)
+        # The variant gets the current values of all uniforms
+        # (its model matrices are fetched from the matrix buffer instead)
+        for variable_name, uniform_object in depth_material.uniform_dict.items():
+            variant.uniform_dict[variable_name].data = uniform_object.data
+        GLState.use_program(variant.program_ref)
+        GL.glBindVertexArray(vao_ref)
+        for uniform_object in variant.uniform_dict.values():
+            uniform_object.upload_data()
+        mesh_batch.draw(GL.GL_TRIANGLES)
+        GLState.use_program(depth_material.program_ref)
+
+    def enable_shadows(self, shadow_light, strength=0.5, resolution=(512, 512), pcf_kernel_size=3):
         self._shadows_enabled = True
-        self._shadow_object = Shadow(shadow_light, strength=strength, resolution=resolution)
+        self._shadow_object = Shadow(shadow_light, strength=strength, resolution=resolution,
+                                     pcf_kernel_size=pcf_kernel_size)
+
+    def enable_cascaded_shadows(self, shadow_light, cascade_count=4, resolution=(1024, 1024),
+                                max_distance=500, strength=0.5, pcf_kernel_size=3):
+        """
+        Cast shadows of a directional light on receivers up to max_distance from the camera;
+        materials need use_cascaded_shadow=True
+        """
+        self._cascaded_shadows_enabled = True
+        self._cascaded_shadow_object = CascadedShadow(shadow_light, cascade_count=cascade_count,
+                                                      resolution=resolution, max_distance=max_distance,
+                                                      strength=strength, pcf_kernel_size=pcf_kernel_size)
+
+    def enable_point_shadows(self, shadow_light, strength=0.5, resolution=512, far=25):
+        """ Cast shadows of a point light in all directions; materials need use_point_shadow=True """
+        self._point_shadows_enabled = True
+        self._point_shadow_object = PointShadow(shadow_light, strength=strength, resolution=resolution, far=far)
+
+    def enable_shadow_atlas(self, resolution=2048, min_tile_size=128, strength=0.5, pcf_kernel_size=3):
+        """ Create the atlas shared by the shadows of the lights added with add_shadow_light """
+        self._shadow_atlas = ShadowAtlas(resolution=resolution, min_tile_size=min_tile_size,
+                                         strength=strength, pcf_kernel_size=pcf_kernel_size)
+
+    def add_shadow_light(self, shadow_light, camera_bounds=(-5, 5, -5, 5, 0, 20), bias=0.01):
+        """
+        Add a directional light casting shadows through the shadow atlas (created with default settings if needed);
+        materials need use_shadow_atlas=True
+        """
+        if self._shadow_atlas is None:
+            self.enable_shadow_atlas()
+        return self._shadow_atlas.add_shadow(shadow_light, camera_bounds, bias)
+
+    def enable_gpu_timer(self, history_size=120):
+        """
+        Measure the GPU time of the render passes ("render/shadows", "render/opaque", ...) with timestamp queries;
+        the results of the last history_size frames are available through gpu_timer a few frames later
+        """
+        self._gpu_timer = GPUTimer(history_size)
+
+    def enable_stats(self, history_size=120):
+        """
+        Count draw calls, triangles, state changes, uploads and drawn meshes, and measure the CPU time
+        of the render phases ("traversal", "shadows", "uniforms", "draw", "render") in milliseconds;
+        call stats.end_frame() once per frame to finish the counters of a frame
+        """
+        self._stats = RenderStats(history_size)
+        RenderStats.current = self._stats
+
+    def disable_stats(self):
+        if RenderStats.current is self._stats:
+            RenderStats.current = None
+        self._stats = None
+
+    def enable_depth_prepass(self):
+        """
+        Draw opaque meshes depth-only before shading them with an equal depth test and without depth writes,
+        so that expensive fragment shaders run at most once per pixel; materials opt out with "depthPrepass"
+        """
+        self._depth_prepass_enabled = True
+        self._prepass_material = DepthMaterial()
+
+    def enable_deferred_shading(self):
+        """
+        Draw opaque Lambert and Phong meshes without shadows into a G-buffer (multiple render targets)
+        and light them with full-screen passes, so that the lighting cost does not depend on the geometry;
+        all other meshes are drawn forward afterwards, depth tested against the deferred ones
+        """
+        self._deferred_shading_enabled = True
+        self._deferred_lighting_mesh = Mesh(ScreenQuadGeometry(), DeferredLightingMaterial())
+        # Forward material -> G-buffer material; (geometry, G-buffer material) -> vertex array object
+        self._gbuffer_material_dict = {}
+        self._gbuffer_vao_dict = {}
+
+    def enable_clustered_lighting(self, grid_size=(16, 9, 24)):
+        """
+        Assign point lights to clusters of the view frustum every frame;
+        materials with use_clustered_lighting=True only evaluate the point lights of a fragment's cluster
+        """
+        self._light_clusters = LightClusters(grid_size)
@@ -1,6 +1,9 @@
 import OpenGL.GL as GL
 from PIL import Image
 
+from core.gl_state import GLState
+from core.tracer import Tracer
+
 class Texture:
     def __init__(self, file_name=None, property_dict={}):
         # Pygame object for storing pixel data;
@@ -8,6 +11,8 @@ class Texture:
         self._surface = None
         # reference of available texture from GPU
         self._texture_ref = GL.glGenTextures(1)
+        # Does the uploaded image have texels which are neither opaque nor fully transparent?
+        self._partial_alpha = False
         # default property values
         self._property_dict = {
             "magFilter": GL.GL_LINEAR,
@@ -32,6 +37,11 @@ class Texture:
     def texture_ref(self):
         return self._texture_ref
 
+    @property
+    def partial_alpha(self):
+        """ True if the uploaded image has texels to be blended (e.g. antialiased edges), not only kept or discarded """
+        return self._partial_alpha
+
     def load_image(self, file_name):
         """ Load image from file """
         # self._surface = pygame.image.load(file_name)
@@ -49,6 +59,9 @@ class Texture:
 
     def upload_data(self):
         """ Upload pixel data to GPU """
+        tracer = Tracer.current
+        if tracer is not None:
+            tracer.begin("Texture.upload_data", "texture")
         # Store image dimensions
         width = self._surface.width
         height = self._surface.height
@@ -56,10 +69,13 @@ class Texture:
         # WHAT is the equivalent of this
         # pixel_data = pygame.image.tostring(self._surface, "RGBA", True)
         pixel_data = self._surface.tobytes()
+        # Numbers of texels with each alpha value; the first and the last are fully transparent and opaque
+        alpha_histogram = self._surface.getchannel("A").histogram()
+        self._partial_alpha = any(alpha_histogram[1:255])
         # print("pixel data: ", pixel_data[1:10])
         
         # Specify texture used by the following functions
-        GL.glBindTexture(GL.GL_TEXTURE_2D, self._texture_ref)
+        GLState.bind_texture(GL.GL_TEXTURE_2D, self._texture_ref)
         # Send pixel data to texture buffer
         GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA, width, height, 0, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, pixel_data)
         # Generate mipmap image from uploaded pixel data
@@ -71,4 +87,67 @@ class Texture:
         GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, self._property_dict["wrap"])
         GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, self._property_dict["wrap"])
         # Set default border color to white; important for rendering shadows
-        GL.glTexParameterfv(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_BORDER_COLOR, [1, 1, 1, 1])
\ No newline at end of file
+        GL.glTexParameterfv(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_BORDER_COLOR, [1, 1, 1, 1])
+        if tracer is not None:
+            tracer.end("Texture.upload_data", "texture")
+
+    def upload_empty_data(self, width, height, internal_format=GL.GL_RGBA8):
+        """
+        Allocate color storage (no pixel data and no mipmaps) for use as a framebuffer color attachment;
+        floating point formats such as GL_RGBA16F keep values outside of the range [0, 1]
+        """
+        GLState.bind_texture(GL.GL_TEXTURE_2D, self._texture_ref)
+        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, internal_format, width, height, 0, GL.GL_RGBA, GL.GL_FLOAT, None)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, self._property_dict["magFilter"])
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, self._property_dict["minFilter"])
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, self._property_dict["wrap"])
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, self._property_dict["wrap"])
+
+    def upload_depth_data(self, width, height, internal_format=GL.GL_DEPTH_COMPONENT24, layer_count=None,
+                          compare=True):
+        """
+        Allocate depth storage (no pixel data) for use as a framebuffer depth attachment.
+        Depth comparison is enabled, so shaders sample the texture with a sampler2DShadow;
+        with linear filtering the hardware blends four comparisons (2x2 percentage-closer filtering).
+        If layer_count is given, a texture array is allocated (sampled with a sampler2DArrayShadow).
+        Without compare, shaders read the stored depth values with a sampler2D.
+        """
+        if layer_count is None:
+            target = GL.GL_TEXTURE_2D
+            GLState.bind_texture(target, self._texture_ref)
+            GL.glTexImage2D(target, 0, internal_format, width, height, 0,
+                            GL.GL_DEPTH_COMPONENT, GL.GL_FLOAT, None)
+        else:
+            target = GL.GL_TEXTURE_2D_ARRAY
+            GLState.bind_texture(target, self._texture_ref)
+            GL.glTexImage3D(target, 0, internal_format, width, height, layer_count, 0,
+                            GL.GL_DEPTH_COMPONENT, GL.GL_FLOAT, None)
+        GL.glTexParameteri(target, GL.GL_TEXTURE_MAG_FILTER, self._property_dict["magFilter"])
+        GL.glTexParameteri(target, GL.GL_TEXTURE_MIN_FILTER, self._property_dict["minFilter"])
+        GL.glTexParameteri(target, GL.GL_TEXTURE_WRAP_S, self._property_dict["wrap"])
+        GL.glTexParameteri(target, GL.GL_TEXTURE_WRAP_T, self._property_dict["wrap"])
+        # Depth outside of the texture is the farthest one, so that nothing is shadowed there
+        GL.glTexParameterfv(target, GL.GL_TEXTURE_BORDER_COLOR, [1, 1, 1, 1])
+        if compare:
+            GL.glTexParameteri(target, GL.GL_TEXTURE_COMPARE_MODE, GL.GL_COMPARE_REF_TO_TEXTURE)
+            GL.glTexParameteri(target, GL.GL_TEXTURE_COMPARE_FUNC, GL.GL_LEQUAL)
+
+    def upload_depth_cube_data(self, size, internal_format=GL.GL_DEPTH_COMPONENT24):
+        """
+        Allocate the six square faces of a depth cube map, e.g. for omnidirectional shadows.
+        Attached as a whole, all faces are framebuffer layers (0...5 = +X, -X, +Y, -Y, +Z, -Z);
+        shaders sample it with a samplerCubeShadow.
+        """
+        target = GL.GL_TEXTURE_CUBE_MAP
+        GLState.bind_texture(target, self._texture_ref)
+        for face in range(6):
+            GL.glTexImage2D(GL.GL_TEXTURE_CUBE_MAP_POSITIVE_X + face, 0, internal_format, size, size, 0,
+                            GL.GL_DEPTH_COMPONENT, GL.GL_FLOAT, None)
+        GL.glTexParameteri(target, GL.GL_TEXTURE_MAG_FILTER, self._property_dict["magFilter"])
+        GL.glTexParameteri(target, GL.GL_TEXTURE_MIN_FILTER, self._property_dict["minFilter"])
+        # Lookups near the edges of a face continue on the neighbouring face
+        GL.glTexParameteri(target, GL.GL_TEXTURE_WRAP_S, GL.GL_CLAMP_TO_EDGE)
+        GL.glTexParameteri(target, GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP_TO_EDGE)
+        GL.glTexParameteri(target, GL.GL_TEXTURE_WRAP_R, GL.GL_CLAMP_TO_EDGE)
+        GL.glTexParameteri(target, GL.GL_TEXTURE_COMPARE_MODE, GL.GL_COMPARE_REF_TO_TEXTURE)
+        GL.glTexParameteri(target, GL.GL_TEXTURE_COMPARE_FUNC, GL.GL_LEQUAL)
@@ -145,12 +145,13 @@ class MainWindow(qtw.QMainWindow):
         # if e.key() == qtc.Qt.Key_Shift:
         #     self.glWidget.joint_type.mesh.select.shift = True
     
-# deal with dpi
-qtw.QApplication.setAttribute(qtc.Qt.AA_EnableHighDpiScaling, True)     # enable high dpi scaling
-qtw.QApplication.setAttribute(qtc.Qt.AA_UseHighDpiPixmaps, True)        # use high dpi icons
+if __name__ == "__main__":
+    # deal with dpi
+    qtw.QApplication.setAttribute(qtc.Qt.AA_EnableHighDpiScaling, True)     # enable high dpi scaling
+    qtw.QApplication.setAttribute(qtc.Qt.AA_UseHighDpiPixmaps, True)        # use high dpi icons
 
-app = qtw.QApplication(sys.argv)
+    app = qtw.QApplication(sys.argv)
 
-window = MainWindow()
-window.show()
-sys.exit(app.exec_())
+    window = MainWindow()
+    window.show()
+    sys.exit(app.exec_())
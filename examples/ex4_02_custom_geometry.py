@@ -121,15 +121,16 @@ class MainWindow(qtw.QMainWindow):
     def keyPressEvent(self, e):
         pass
     
-# deal with dpi
-qtw.QApplication.setAttribute(qtc.Qt.AA_EnableHighDpiScaling, True)     # enable high dpi scaling
-qtw.QApplication.setAttribute(qtc.Qt.AA_UseHighDpiPixmaps, True)        # use high dpi icons
+if __name__ == "__main__":
+    # deal with dpi
+    qtw.QApplication.setAttribute(qtc.Qt.AA_EnableHighDpiScaling, True)     # enable high dpi scaling
+    qtw.QApplication.setAttribute(qtc.Qt.AA_UseHighDpiPixmaps, True)        # use high dpi icons
 
-app = qtw.QApplication(sys.argv)
+    app = qtw.QApplication(sys.argv)
 
-# basically
-window = MainWindow()
-window.show()
+    # basically
+    window = MainWindow()
+    window.show()
 
-# this starts the loop
-sys.exit(app.exec_())
+    # this starts the loop
+    sys.exit(app.exec_())
@@ -30,6 +30,7 @@ from extras.axes import AxesHelper
 from extras.grid import GridHelper
 from material.surface import SurfaceMaterial
 from extras.movement_rig import MovementRig
+from extras.frame_scheduler import FrameScheduler
 
 
 class GLWidget(qgl.QGLWidget):
@@ -116,6 +117,10 @@ class MainWindow(qtw.QMainWindow):
 
         self.units_per_second = 1
         self.degrees_per_second = 60
+
+        # the scene is static: glWidget is only painted when the rig moves or the window is exposed
+        self.frame_scheduler = FrameScheduler(self.glWidget, on_demand=True)
+        self.frame_scheduler.start()
         
     def setupUi(self):
         pass
@@ -153,15 +158,16 @@ class MainWindow(qtw.QMainWindow):
 
         self.glWidget.update()
     
-# deal with dpi
-qtw.QApplication.setAttribute(qtc.Qt.AA_EnableHighDpiScaling, True)     # enable high dpi scaling
-qtw.QApplication.setAttribute(qtc.Qt.AA_UseHighDpiPixmaps, True)        # use high dpi icons
+if __name__ == "__main__":
+    # deal with dpi
+    qtw.QApplication.setAttribute(qtc.Qt.AA_EnableHighDpiScaling, True)     # enable high dpi scaling
+    qtw.QApplication.setAttribute(qtc.Qt.AA_UseHighDpiPixmaps, True)        # use high dpi icons
 
-app = qtw.QApplication(sys.argv)
+    app = qtw.QApplication(sys.argv)
 
-# basically
-window = MainWindow()
-window.show()
+    # basically
+    window = MainWindow()
+    window.show()
 
-# this starts the loop
-sys.exit(app.exec_())
+    # this starts the loop
+    sys.exit(app.exec_())
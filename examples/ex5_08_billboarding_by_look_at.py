@@ -67,6 +67,8 @@ class GLWidget(qgl.QGLWidget):
                                     system_font_name="Arial Bold",
                                     font_size=40,
                                     font_color=[0, 0, 200],
+                                    # Antialiased text on a transparent background is blended over the scene
+                                    transparent=True,
                                     image_width=256,
                                     image_height=128,
                                     align_horizontal=0.5,
@@ -180,15 +182,16 @@ class MainWindow(qtw.QMainWindow):
 
         self.glWidget.update()
     
-# deal with dpi
-qtw.QApplication.setAttribute(qtc.Qt.AA_EnableHighDpiScaling, True)     # enable high dpi scaling
-qtw.QApplication.setAttribute(qtc.Qt.AA_UseHighDpiPixmaps, True)        # use high dpi icons
+if __name__ == "__main__":
+    # deal with dpi
+    qtw.QApplication.setAttribute(qtc.Qt.AA_EnableHighDpiScaling, True)     # enable high dpi scaling
+    qtw.QApplication.setAttribute(qtc.Qt.AA_UseHighDpiPixmaps, True)        # use high dpi icons
 
-app = qtw.QApplication(sys.argv)
+    app = qtw.QApplication(sys.argv)
 
-# basically
-window = MainWindow()
-window.show()
+    # basically
+    window = MainWindow()
+    window.show()
 
-# this starts the loop
-sys.exit(app.exec_())
+    # this starts the loop
+    sys.exit(app.exec_())
@@ -34,6 +34,7 @@ from geometry.rectangle import RectangleGeometry
 from geometry.sphere import SphereGeometry
 from extras.movement_rig import MovementRig
 from extras.directional_light import DirectionalLightHelper
+from extras.frame_scheduler import FrameScheduler
 
 
 class GLWidget(qgl.QGLWidget):
@@ -165,12 +166,9 @@ class MainWindow(qtw.QMainWindow):
         self.units_per_second = 1
         self.degrees_per_second = 60
 
-        # in this example, glWidget is updated by timer as well as the keyboard
-        timer = qtc.QTimer(self)
-        # timer.setInterval(1000/60)  # period, in milliseconds
-        timer.setInterval(17)  # on Mac, it accepts only int
-        timer.timeout.connect(self.glWidget.update)
-        timer.start()
+        # in this example, glWidget is painted continuously, at the pace of the display refresh
+        self.frame_scheduler = FrameScheduler(self.glWidget)
+        self.frame_scheduler.start()
 
     def setupUi(self):
         pass
@@ -207,15 +205,16 @@ class MainWindow(qtw.QMainWindow):
 
         self.glWidget.update()
     
-# deal with dpi
-qtw.QApplication.setAttribute(qtc.Qt.AA_EnableHighDpiScaling, True)     # enable high dpi scaling
-qtw.QApplication.setAttribute(qtc.Qt.AA_UseHighDpiPixmaps, True)        # use high dpi icons
+if __name__ == "__main__":
+    # deal with dpi
+    qtw.QApplication.setAttribute(qtc.Qt.AA_EnableHighDpiScaling, True)     # enable high dpi scaling
+    qtw.QApplication.setAttribute(qtc.Qt.AA_UseHighDpiPixmaps, True)        # use high dpi icons
 
-app = qtw.QApplication(sys.argv)
+    app = qtw.QApplication(sys.argv)
 
-# basically
-window = MainWindow()
-window.show()
+    # basically
+    window = MainWindow()
+    window.show()
 
-# this starts the loop
-sys.exit(app.exec_())
+    # this starts the loop
+    sys.exit(app.exec_())
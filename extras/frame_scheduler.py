@@ -0,0 +1,194 @@
+import math
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+import PyQt5.QtCore as qtc
+import PyQt5.QtGui as qtg
+
+from core.change_monitor import ChangeMonitor
+
+
+class FrameScheduler(qtc.QObject):
+    """
+    Paints a GL widget at a steady pace aligned to the display refresh, replacing a QTimer with a fixed interval:
+
+        self.frame_scheduler = FrameScheduler(self.glWidget)
+        self.frame_scheduler.start()
+
+    The buffers are swapped by the scheduler: with a swap interval (vsync), the swap returns at a refresh,
+    and the next frame is started so that its swap lands a whole number of refresh intervals later.
+    That number adapts to the recent paint times (90th percentile), so that a scene which does not fit
+    into one interval runs evenly at half (a third, ...) of the refresh rate instead of alternating between them.
+    Without vsync, the frames are started on a grid of the same interval measured with perf_counter.
+    With on_demand=True, a frame is only painted when the scene graph, the camera, a material or an animation
+    reports a change (see ChangeMonitor) or when the widget is exposed; otherwise the scheduler stays idle.
+    Paint requests of the widget (update(), exposure) are turned into scheduled frames.
+    """
+    def __init__(self, gl_widget, on_demand=False, max_fps=None, refresh_rate=None, history_size=120):
+        super().__init__(gl_widget)
+        self._gl_widget = gl_widget
+        self._on_demand = on_demand
+        self._max_fps = max_fps
+        self._refresh_rate = refresh_rate
+        # Set by start(): seconds between two refreshes, times the swap interval
+        self._refresh_interval = None
+        self._vsync = True
+        # Frames are presented every interval_multiple refresh intervals
+        self._interval_multiple = 1
+        self._min_interval_multiple = 1
+        self._frames_since_multiple_change = 0
+        self._timer = qtc.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(qtc.Qt.PreciseTimer)
+        self._timer.timeout.connect(self._paint_frame)
+        # Reports the changes of the scene in on-demand mode
+        self._monitor = ChangeMonitor(self.request_frame) if on_demand else None
+        self._running = False
+        self._painting = False
+        # Start of the last frame and end of its swap (the refresh it was presented at)
+        self._frame_start_time = None
+        self._swap_time = None
+        self._delta_time = 0.0
+        self._frame_count = 0
+        # Milliseconds spent in paintGL, and between the starts of consecutive frames, oldest first
+        self._paint_time_history = deque(maxlen=history_size)
+        self._frame_time_history = deque(maxlen=history_size)
+
+    @property
+    def on_demand(self):
+        return self._on_demand
+
+    @property
+    def monitor(self):
+        """ ChangeMonitor of the on-demand mode (None in continuous mode) """
+        return self._monitor
+
+    @property
+    def frame_interval(self):
+        """ Seconds between two presented frames """
+        return self._refresh_interval * self._interval_multiple
+
+    @property
+    def interval_multiple(self):
+        return self._interval_multiple
+
+    @property
+    def delta_time(self):
+        """ Seconds between the starts of the last two frames (one frame interval after idling) """
+        return self._delta_time
+
+    @property
+    def frame_count(self):
+        return self._frame_count
+
+    @property
+    def idle(self):
+        """ True if no frame is scheduled """
+        return not self._timer.isActive()
+
+    @property
+    def paint_time_history(self):
+        return list(self._paint_time_history)
+
+    def get_average_fps(self):
+        """ Return the average frame rate of the recent frames (None before the second frame) """
+        if not self._frame_time_history:
+            return None
+        return 1000 / float(np.mean(self._frame_time_history))
+
+    def start(self):
+        refresh_rate = self._refresh_rate
+        if refresh_rate is None:
+            screen = qtg.QGuiApplication.primaryScreen()
+            refresh_rate = screen.refreshRate() if screen is not None else 0
+            if refresh_rate <= 0:
+                refresh_rate = 60
+        # -1: the default of the driver, which normally waits for one refresh
+        swap_interval = self._gl_widget.format().swapInterval()
+        self._vsync = swap_interval != 0
+        self._refresh_interval = max(swap_interval, 1) / refresh_rate
+        if self._max_fps:
+            self._min_interval_multiple = max(1, math.ceil(1 / self._max_fps / self._refresh_interval - 1e-6))
+        self._interval_multiple = self._min_interval_multiple
+        self._gl_widget.setAutoBufferSwap(False)
+        self._gl_widget.installEventFilter(self)
+        if self._monitor is not None:
+            self._monitor.activate()
+        self._running = True
+        self.request_frame()
+
+    def stop(self):
+        self._running = False
+        self._timer.stop()
+        self._gl_widget.removeEventFilter(self)
+        self._gl_widget.setAutoBufferSwap(True)
+        if self._monitor is not None:
+            self._monitor.deactivate()
+
+    def request_frame(self):
+        """ Paint a frame at the next slot (e.g. after a change the monitor does not see) """
+        if not self._running or self._timer.isActive():
+            return
+        now = perf_counter()
+        if self._swap_time is None:
+            next_time = now
+        elif self._vsync:
+            # The swap waits for the refresh interval_multiple intervals after the previous one
+            next_time = self._swap_time + (self._interval_multiple - 1) * self._refresh_interval
+        else:
+            next_time = self._frame_start_time + self.frame_interval
+        if next_time < now and not self._vsync:
+            # Keep the grid instead of painting late frames back to back
+            missed = math.ceil((now - next_time) / self.frame_interval)
+            next_time += missed * self.frame_interval
+        self._timer.start(max(0, round((next_time - now) * 1000)))
+
+    def eventFilter(self, watched, event):
+        if event.type() == qtc.QEvent.Paint and not self._painting:
+            # Painted with the next frame instead
+            self.request_frame()
+            return True
+        return False
+
+    def _paint_frame(self):
+        start_time = perf_counter()
+        if self._frame_start_time is not None:
+            frame_time = start_time - self._frame_start_time
+            self._frame_time_history.append(frame_time * 1000)
+            # After idling, animations continue as if from the previous frame
+            self._delta_time = min(frame_time, self.frame_interval * (self._interval_multiple + 1))
+        else:
+            self._delta_time = self.frame_interval
+        self._frame_start_time = start_time
+        if self._monitor is not None:
+            # Changes made while painting (e.g. uniforms set by the renderer) are not reported
+            self._monitor.deactivate()
+        self._painting = True
+        self._gl_widget.repaint()
+        paint_end_time = perf_counter()
+        self._gl_widget.swapBuffers()
+        self._painting = False
+        self._swap_time = perf_counter()
+        if self._monitor is not None:
+            self._monitor.activate()
+            self._monitor.clear()
+        self._frame_count += 1
+        self._paint_time_history.append((paint_end_time - start_time) * 1000)
+        self._adapt_interval_multiple()
+        if self._monitor is None or self._monitor.changed:
+            self.request_frame()
+
+    def _adapt_interval_multiple(self):
+        """ Present every n-th refresh, n being the number of refresh intervals the recent frames need to paint """
+        self._frames_since_multiple_change += 1
+        recent_list = list(self._paint_time_history)[-30:]
+        if len(recent_list) < 10:
+            return
+        needed = math.ceil(np.percentile(recent_list, 90) / 1000 / self._refresh_interval)
+        needed = max(needed, self._min_interval_multiple)
+        # Slow down at once, speed up again only after the frames have been fast for a while
+        if needed > self._interval_multiple or (needed < self._interval_multiple
+                                                and self._frames_since_multiple_change >= 60):
+            self._interval_multiple = needed
+            self._frames_since_multiple_change = 0
@@ -0,0 +1,181 @@
+import json
+from time import perf_counter
+
+import numpy as np
+import PyQt5.QtCore as qtc
+import PyQt5.QtGui as qtg
+
+
+class InputRecorder(qtc.QObject):
+    """
+    Record the input events of a window with their timestamps, together with the local matrices
+    of scene objects (e.g. a MovementRig and its look attachment) once per painted frame.
+    The objects are given as attribute paths on the GL widget, such as "rig" and "rig.look_attachment",
+    and looked up at every frame, so that objects created later in initializeGL are found:
+
+        recorder = InputRecorder(window, window.glWidget, ["rig", "rig.look_attachment"])
+        ...
+        recorder.save("walk.json")
+
+    Key events are taken from the window, mouse and paint events from the GL widget.
+    The recording is replayed with InputPlayer.
+    """
+    KEY_EVENT_DICT = {qtc.QEvent.KeyPress: "key_press", qtc.QEvent.KeyRelease: "key_release"}
+    MOUSE_EVENT_DICT = {qtc.QEvent.MouseButtonPress: "mouse_press", qtc.QEvent.MouseButtonRelease: "mouse_release",
+                        qtc.QEvent.MouseMove: "mouse_move"}
+
+    def __init__(self, window, gl_widget, path_list=("rig", "rig.look_attachment")):
+        super().__init__()
+        self._window = window
+        self._gl_widget = gl_widget
+        self._path_list = list(path_list)
+        self._start_time = perf_counter()
+        # {"time": seconds since the start, "type": ..., ...}
+        self._event_list = []
+        # {"time": seconds since the start, "matrices": {path: local matrix as nested lists}}
+        self._sample_list = []
+        window.installEventFilter(self)
+        gl_widget.installEventFilter(self)
+
+    @property
+    def event_list(self):
+        return self._event_list
+
+    @property
+    def sample_list(self):
+        return self._sample_list
+
+    def stop(self):
+        self._window.removeEventFilter(self)
+        self._gl_widget.removeEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        event_type = event.type()
+        if watched is self._window and event_type in self.KEY_EVENT_DICT:
+            self.record_event({"type": self.KEY_EVENT_DICT[event_type], "key": event.key(), "text": event.text(),
+                               "auto_repeat": event.isAutoRepeat()})
+        elif watched is self._gl_widget:
+            if event_type in self.MOUSE_EVENT_DICT:
+                self.record_event({"type": self.MOUSE_EVENT_DICT[event_type], "x": event.x(), "y": event.y(),
+                                   "button": int(event.button()), "buttons": int(event.buttons())})
+            elif event_type == qtc.QEvent.Paint:
+                self.record_frame()
+        # The events are only observed
+        return False
+
+    def record_event(self, event_dict):
+        event_dict["time"] = perf_counter() - self._start_time
+        self._event_list.append(event_dict)
+
+    def record_frame(self):
+        """ Sample the local matrices of the objects, e.g. before a frame is painted """
+        matrix_dict = {}
+        for path in self._path_list:
+            scene_object = get_object(self._gl_widget, path)
+            if scene_object is not None:
+                matrix_dict[path] = np.asarray(scene_object.local_matrix).tolist()
+        if matrix_dict:
+            self._sample_list.append({"time": perf_counter() - self._start_time, "matrices": matrix_dict})
+
+    def get_recording(self):
+        return {"paths": self._path_list, "events": self._event_list, "samples": self._sample_list}
+
+    def save(self, file_name):
+        with open(file_name, "w") as recording_file:
+            json.dump(self.get_recording(), recording_file)
+
+
+class InputPlayer:
+    """
+    Replay a recording of InputRecorder at a fixed timestep, independent of the recorded frame rate:
+    frame n covers the recorded times ((n - 1) * timestep, n * timestep]. step() advances one frame and
+    returns the input events of that interval; apply() sets the recorded local matrices of the last sample
+    at or before the frame time, so that the camera follows the recorded path exactly.
+    """
+    def __init__(self, recording, timestep=1 / 60):
+        self._path_list = recording["paths"]
+        self._event_list = sorted(recording["events"], key=lambda event: event["time"])
+        self._sample_list = sorted(recording["samples"], key=lambda sample: sample["time"])
+        self._timestep = timestep
+        # Frame 0 is the first one returned by step()
+        self._frame = -1
+        self._event_index = 0
+        self._sample_index = -1
+
+    @staticmethod
+    def load(file_name, timestep=1 / 60):
+        with open(file_name) as recording_file:
+            return InputPlayer(json.load(recording_file), timestep)
+
+    @property
+    def frame(self):
+        return self._frame
+
+    @property
+    def time(self):
+        return self._frame * self._timestep
+
+    @property
+    def duration(self):
+        """ Time of the last recorded event or sample in seconds """
+        time_list = [0.0]
+        if self._event_list:
+            time_list.append(self._event_list[-1]["time"])
+        if self._sample_list:
+            time_list.append(self._sample_list[-1]["time"])
+        return max(time_list)
+
+    @property
+    def frame_count(self):
+        """ Number of frames covering the recording """
+        return int(np.ceil(self.duration / self._timestep)) + 1
+
+    @property
+    def finished(self):
+        """ True once the last frame of the recording has been stepped """
+        return self._frame + 1 >= self.frame_count
+
+    def step(self):
+        """ Advance one frame and return the events recorded in its interval, oldest first """
+        self._frame += 1
+        event_list = []
+        while self._event_index < len(self._event_list) and self._event_list[self._event_index]["time"] <= self.time:
+            event_list.append(self._event_list[self._event_index])
+            self._event_index += 1
+        return event_list
+
+    def apply(self, gl_widget):
+        """ Set the local matrices of the recorded objects (attribute paths on gl_widget) for the current frame """
+        while (self._sample_index + 1 < len(self._sample_list)
+               and self._sample_list[self._sample_index + 1]["time"] <= self.time):
+            self._sample_index += 1
+        if self._sample_index < 0:
+            return
+        for path, matrix in self._sample_list[self._sample_index]["matrices"].items():
+            scene_object = get_object(gl_widget, path)
+            if scene_object is not None:
+                scene_object.local_matrix = np.array(matrix).astype(float)
+
+
+def get_object(root, path):
+    """ Return the object at an attribute path such as "rig.look_attachment" (None if it does not exist yet) """
+    scene_object = root
+    for name in path.split("."):
+        scene_object = getattr(scene_object, name, None)
+        if scene_object is None:
+            return None
+    return scene_object
+
+
+def create_qt_event(event_dict):
+    """ Return the Qt event of a recorded event """
+    event_type = event_dict["type"]
+    if event_type in ("key_press", "key_release"):
+        qt_type = qtc.QEvent.KeyPress if event_type == "key_press" else qtc.QEvent.KeyRelease
+        return qtg.QKeyEvent(qt_type, event_dict["key"], qtc.Qt.NoModifier, event_dict["text"],
+                             event_dict.get("auto_repeat", False))
+    qt_type = {"mouse_press": qtc.QEvent.MouseButtonPress, "mouse_release": qtc.QEvent.MouseButtonRelease,
+               "mouse_move": qtc.QEvent.MouseMove}[event_type]
+    return qtg.QMouseEvent(qt_type, qtc.QPointF(event_dict["x"], event_dict["y"]),
+                           qtc.Qt.MouseButton(event_dict["button"]), qtc.Qt.MouseButtons(event_dict["buttons"]),
+                           qtc.Qt.NoModifier)
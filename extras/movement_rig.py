@@ -33,6 +33,11 @@ class MovementRig(Object3D):
         # self.KEY_LOOK_UP = "t"
         # self.KEY_LOOK_DOWN = "g"
 
+    @property
+    def look_attachment(self):
+        """ Child of the rig turned by looking up and down; the objects added to the rig are its children """
+        return self._look_attachment
+
     # Adding and removing objects applies to look attachment.
     # Override functions from the Object3D class.
     def add(self, child):
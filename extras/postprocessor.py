@@ -1,9 +1,10 @@
+from core.tracer import Tracer
 from core_ext.renderer import Renderer
 from core_ext.scene import Scene
 from core_ext.camera import Camera
 from core_ext.mesh import Mesh
 from core_ext.render_target import RenderTarget
-from geometry.geometry import Geometry
+from geometry.screen_quad import ScreenQuadGeometry
 
 
 class Postprocessor:
@@ -24,13 +25,7 @@ class Postprocessor:
         self._ortho_camera.set_orthographic()  # aligned with clip space
         # By default, generate a rectangle already aligned with clip space;
         # no matrix transformations will be applied
-        self._rectangle_geometry = Geometry()
-        p0, p1, p2, p3 = [-1, -1], [1, -1], [-1, 1], [1, 1]
-        t0, t1, t2, t3 = [0, 0], [1, 0], [0, 1], [1, 1]
-        position_data = [p0, p1, p3, p0, p3, p2]
-        uv_data = [t0, t1, t3, t0, t3, t2]
-        self._rectangle_geometry.add_attribute("vec2", "vertexPosition", position_data)
-        self._rectangle_geometry.add_attribute("vec2", "vertexUV", uv_data)
+        self._rectangle_geometry = ScreenQuadGeometry()
 
     @property
     def render_target_list(self):
@@ -53,9 +48,35 @@ class Postprocessor:
         self._render_target_list.append(self._final_render_target)
 
     def render(self):
+        # The passes are measured by the GPU timer of the renderer and recorded by the current tracer,
+        # if enabled: "scene/render/..." and "postprocessing/effect1/render/...", ...
         passes = len(self._scene_list)
         for n in range(passes):
             scene = self._scene_list[n]
             camera = self._camera_list[n]
             target = self._render_target_list[n]
+            if n == 0:
+                self._begin_section("scene")
+            else:
+                if n == 1:
+                    self._begin_section("postprocessing")
+                self._begin_section(f"effect{n}")
             self._renderer.render(scene, camera, render_target=target)
+            if n == 0:
+                self._end_section("scene")
+            else:
+                self._end_section(f"effect{n}")
+                if n == passes - 1:
+                    self._end_section("postprocessing")
+
+    def _begin_section(self, name):
+        if self._renderer.gpu_timer is not None:
+            self._renderer.gpu_timer.begin(name)
+        if Tracer.current is not None:
+            Tracer.current.begin(name)
+
+    def _end_section(self, name):
+        if self._renderer.gpu_timer is not None:
+            self._renderer.gpu_timer.end(name)
+        if Tracer.current is not None:
+            Tracer.current.end(name)
@@ -0,0 +1,116 @@
+from time import perf_counter
+
+import OpenGL.GL as GL
+from PIL import Image, ImageDraw, ImageFont
+
+from core.gl_state import GLState
+from core.render_stats import RenderStats
+from core_ext.camera import Camera
+from core_ext.mesh import Mesh
+from core_ext.texture import Texture
+from geometry.rectangle import RectangleGeometry
+from material.texture import TextureMaterial
+
+
+class StatsOverlay:
+    """
+    Draws a frame time graph and the counters of the renderer statistics (see Renderer.enable_stats)
+    into the top left corner of the window. The panel is painted on the CPU into a texture
+    that is only refreshed every refresh_interval seconds, so that drawing it costs one textured quad per frame.
+    """
+    BACKGROUND_COLOR = (0, 0, 0, 170)
+    TEXT_COLOR = (255, 255, 255, 255)
+    GRAPH_COLOR = (80, 220, 80, 255)
+    SLOW_GRAPH_COLOR = (240, 80, 60, 255)
+    # Frame times above the target (in milliseconds) are drawn with the slow color
+    TARGET_FRAME_TIME = 1000 / 60
+
+    def __init__(self, renderer, width=300, height=120, margin=8, refresh_interval=0.25):
+        if renderer.stats is None:
+            raise Exception("StatsOverlay requires renderer statistics; call Renderer.enable_stats() first")
+        self._renderer = renderer
+        self._width = width
+        self._height = height
+        self._refresh_interval = refresh_interval
+        self._refresh_time = None
+        self._font = ImageFont.load_default()
+        self._texture = Texture(property_dict={"minFilter": GL.GL_LINEAR, "wrap": GL.GL_CLAMP_TO_EDGE})
+        self._texture.surface = Image.new("RGBA", (width, height), self.BACKGROUND_COLOR)
+        self._texture.upload_data()
+        # Pixel coordinates of the window, origin in the bottom left corner
+        window_width, window_height = renderer.window_size
+        self._camera = Camera()
+        self._camera.set_orthographic(0, window_width, 0, window_height)
+        self._camera.update_view_matrix()
+        geometry = RectangleGeometry(width, height, position=(margin, window_height - margin), alignment=(0, 1))
+        self._mesh = Mesh(geometry, TextureMaterial(self._texture))
+
+    @property
+    def texture(self):
+        return self._texture
+
+    def render(self):
+        """ Draw the panel over the window; the texture is repainted if it is older than the refresh interval """
+        # The overlay is not counted in the statistics it shows
+        stats = RenderStats.current
+        RenderStats.current = None
+        now = perf_counter()
+        if self._refresh_time is None or now - self._refresh_time >= self._refresh_interval:
+            self._repaint()
+            self._refresh_time = now
+        material = self._mesh.material
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self._renderer.window_framebuffer_ref)
+        GL.glViewport(0, 0, *self._renderer.window_size)
+        GLState.use_program(material.program_ref)
+        GL.glBindVertexArray(self._mesh.vao_ref)
+        material.uniform_dict["modelMatrix"].data = self._mesh.global_matrix
+        material.uniform_dict["viewMatrix"].data = self._camera.view_matrix
+        material.uniform_dict["projectionMatrix"].data = self._camera.projection_matrix
+        for uniform_object in material.uniform_dict.values():
+            uniform_object.upload_data()
+        material.update_render_settings()
+        GLState.disable(GL.GL_DEPTH_TEST)
+        GLState.enable(GL.GL_BLEND)
+        GLState.blend_func(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
+        self._mesh.draw(GL.GL_TRIANGLES)
+        GLState.disable(GL.GL_BLEND)
+        GLState.enable(GL.GL_DEPTH_TEST)
+        RenderStats.current = stats
+
+    def _repaint(self):
+        """ Paint the graph of the recent frame times and the counters of the last frame into the texture """
+        stats = self._renderer.stats
+        image = Image.new("RGBA", (self._width, self._height), self.BACKGROUND_COLOR)
+        draw = ImageDraw.Draw(image)
+        # Graph in the lower part of the panel; twice the target frame time fills its height
+        graph_height = self._height // 3
+        graph_top = self._height - graph_height
+        frame_time_list = stats.frame_time_history[-self._width:]
+        x_offset = self._width - len(frame_time_list)
+        for x, frame_time in enumerate(frame_time_list):
+            bar_height = min(frame_time / (2 * self.TARGET_FRAME_TIME), 1) * graph_height
+            color = self.SLOW_GRAPH_COLOR if frame_time > self.TARGET_FRAME_TIME else self.GRAPH_COLOR
+            draw.line([(x_offset + x, self._height - 1), (x_offset + x, self._height - 1 - bar_height)], fill=color)
+        target_y = self._height - 1 - graph_height // 2
+        draw.line([(0, target_y), (self._width - 1, target_y)], fill=(255, 255, 255, 90))
+        frame = stats.last_frame
+        if frame:
+            average_frame_time = stats.get_average_frame_time() or 0.0
+            phase_times = frame["phase_times"]
+            line_list = [
+                f"{average_frame_time:.2f} ms/frame, render CPU {phase_times.get('render', 0.0):.2f} ms",
+                f"traversal {phase_times.get('traversal', 0.0):.2f}  uniforms {phase_times.get('uniforms', 0.0):.2f}"
+                f"  draw {phase_times.get('draw', 0.0):.2f} ms",
+                f"draws {frame['draw_calls']}  tris {frame['triangles']}  verts {frame['vertices']}",
+                f"programs {frame['program_switches']}  textures {frame['texture_binds']}"
+                f"  uniforms {frame['uniform_uploads']}",
+                f"meshes {frame['drawn_meshes']} drawn / {frame['culled_meshes']} culled"
+                f"  uploads {frame['buffer_bytes']} B",
+            ]
+            for n, line in enumerate(line_list):
+                if 4 + 12 * n + 11 > graph_top:
+                    break
+                draw.text((4, 4 + 12 * n), line, font=self._font, fill=self.TEXT_COLOR)
+        # Texture rows start at the bottom of the image
+        self._texture.surface = image.transpose(method=Image.Transpose.FLIP_TOP_BOTTOM)
+        self._texture.upload_data()
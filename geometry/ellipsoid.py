@@ -28,6 +28,11 @@ class EllipsoidGeometry(ParametricGeometry):
                          v_end=1,
                          v_resolution=theta_segments,
                          surface_function=surface_function)
+        self._width, self._height, self._depth = width, height, depth
         # Rotate the ellipsoid around the x-axis on -90 degrees.
         # The vertices and normals will be recalculated.
         self.apply_matrix(Matrix.make_rotation_x(-math.pi/2))
+
+    def _regenerate(self, u_resolution, v_resolution):
+        return EllipsoidGeometry(self._width, self._height, self._depth,
+                                 theta_segments=v_resolution, phi_segments=u_resolution)
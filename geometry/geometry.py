@@ -10,6 +10,8 @@ class Geometry:
         self._attribute_dict = {}
         # number of vertices
         self._vertex_count = None
+        # (center, radius) of a sphere enclosing all vertices; calculated on demand
+        self._bounding_sphere = None
 
     @property
     def attribute_dict(self):
@@ -19,6 +21,19 @@ class Geometry:
     def vertex_count(self):
         return self._vertex_count
 
+    @property
+    def bounding_sphere(self):
+        """ Return (center, radius) of a sphere enclosing all vertex positions in local coordinates """
+        if self._bounding_sphere is None:
+            position_array = np.array(self._attribute_dict["vertexPosition"].data, dtype=float)
+            # Two-dimensional positions lie in the plane z = 0
+            if position_array.shape[1] < 3:
+                position_array = np.pad(position_array, ((0, 0), (0, 3 - position_array.shape[1])))
+            center = (position_array.min(axis=0) + position_array.max(axis=0)) / 2
+            radius = float(np.linalg.norm(position_array - center, axis=1).max())
+            self._bounding_sphere = (center, radius)
+        return self._bounding_sphere
+
     def add_attribute(self, data_type, variable_name, data):
         attribute = Attribute(data_type, data)
         self._attribute_dict[variable_name] = attribute
@@ -27,6 +42,7 @@ class Geometry:
             # Number of vertices may be calculated from
             # the length of any Attribute object's array of data
             self._vertex_count = len(data)
+            self._bounding_sphere = None
 
     def upload_data(self, variable_names=None):
         if not variable_names:
@@ -38,6 +54,7 @@ class Geometry:
                 # Number of vertices may be calculated from
                 # the length of any Attribute object's array of data
                 self._vertex_count = len(self._attribute_dict[variable_name].data)
+                self._bounding_sphere = None
 
     def apply_matrix(self, matrix):
         """ Transform the data in an attribute using a matrix """
@@ -59,6 +76,7 @@ class Geometry:
         # New data must be uploaded
         self._attribute_dict["vertexPosition"].upload_data()
         self._vertex_count = len(new_position_data)
+        self._bounding_sphere = None
 
         # Extract the rotation submatrix
         rotation_matrix = np.array(
@@ -98,3 +116,5 @@ class Geometry:
             attribute_instance.data.extend(other_geometry.attribute_dict[variable_name].data)
             # New data must be uploaded
             attribute_instance.upload_data()
+        self._vertex_count = len(self._attribute_dict["vertexPosition"].data)
+        self._bounding_sphere = None
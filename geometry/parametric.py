@@ -13,6 +13,10 @@ class ParametricGeometry(Geometry):
                  v_start, v_end, v_resolution,
                  surface_function):
         super().__init__()
+        # Store the parameters to regenerate the surface at other resolutions
+        self._u_start, self._u_end, self._u_resolution = u_start, u_end, u_resolution
+        self._v_start, self._v_end, self._v_resolution = v_start, v_end, v_resolution
+        self._surface_function = surface_function
         # Generate set of points on function
         delta_u = (u_end - u_start) / u_resolution
         delta_v = (v_end - v_start) / v_resolution
@@ -103,3 +107,22 @@ class ParametricGeometry(Geometry):
         normal_vector = orthogonal_vector / norm if norm > 1e-6 \
             else np.array(p0) / np.linalg.norm(p0)
         return normal_vector
+
+    def make_lod_chain(self, level_count=3, ratio=0.5, min_resolution=4):
+        """
+        Return a list of geometries for the levels of detail of an LOD object:
+        this geometry followed by copies regenerated at lower resolutions,
+        each one reducing the resolution of the previous level by the given ratio
+        """
+        geometry_list = [self]
+        for level in range(1, level_count):
+            u_resolution = max(min_resolution, round(self._u_resolution * ratio ** level))
+            v_resolution = max(min_resolution, round(self._v_resolution * ratio ** level))
+            geometry_list.append(self._regenerate(u_resolution, v_resolution))
+        return geometry_list
+
+    def _regenerate(self, u_resolution, v_resolution):
+        """ Create the same surface with other resolutions; overridden by inheriting classes """
+        return ParametricGeometry(self._u_start, self._u_end, u_resolution,
+                                  self._v_start, self._v_end, v_resolution,
+                                  self._surface_function)
@@ -0,0 +1,19 @@
+from geometry.geometry import Geometry
+
+
+class ScreenQuadGeometry(Geometry):
+    """
+    Rectangle already aligned with clip space (no matrix transformations are applied),
+    covering the whole render target; used by full-screen passes such as postprocessing effects
+    """
+    def __init__(self):
+        super().__init__()
+        # p2 - p3
+        # |  /  |
+        # p0 - p1
+        p0, p1, p2, p3 = [-1, -1], [1, -1], [-1, 1], [1, 1]
+        t0, t1, t2, t3 = [0, 0], [1, 0], [0, 1], [1, 1]
+        position_data = [p0, p1, p3, p0, p3, p2]
+        uv_data = [t0, t1, t3, t0, t3, t2]
+        self.add_attribute("vec2", "vertexPosition", position_data)
+        self.add_attribute("vec2", "vertexUV", uv_data)
@@ -4,3 +4,7 @@ from geometry.ellipsoid import EllipsoidGeometry
 class SphereGeometry(EllipsoidGeometry):
     def __init__(self, radius=1, theta_segments=16, phi_segments=32):
         super().__init__(2*radius, 2*radius, 2*radius, theta_segments, phi_segments)
+        self._radius = radius
+
+    def _regenerate(self, u_resolution, v_resolution):
+        return SphereGeometry(self._radius, theta_segments=v_resolution, phi_segments=u_resolution)
@@ -0,0 +1,182 @@
+import math
+
+import numpy as np
+from numpy.linalg import inv
+
+from core.matrix import Matrix
+from core_ext.render_target import RenderTarget
+from material.depth import DepthMaterial
+
+
+class CascadedShadow:
+    """
+    Shadow of a directional light split into cascades along the view direction of the camera.
+    Every cascade covers one depth slice of the camera frustum with an orthographic projection
+    fitted around that slice and is rendered into one layer of a depth texture array,
+    so that near receivers get small shadow texels and distant ones large texels.
+    """
+    # Size of the cascade arrays declared in the shaders
+    MAX_CASCADE_COUNT = 8
+
+    def __init__(self,
+                 light_source,
+                 cascade_count=4,
+                 resolution=(1024, 1024),
+                 max_distance=500,
+                 split_weight=0.75,
+                 strength=0.5,
+                 bias=0.05,
+                 pcf_kernel_size=3):
+        if not 1 <= cascade_count <= self.MAX_CASCADE_COUNT:
+            raise Exception(f"Cascade count must be between 1 and {self.MAX_CASCADE_COUNT}")
+        if pcf_kernel_size < 1 or pcf_kernel_size % 2 == 0:
+            raise Exception("PCF kernel size must be a positive odd number")
+        # Must be directional light
+        self._light_source = light_source
+        self._cascade_count = cascade_count
+        self._resolution = resolution
+        # Shadows are cast on receivers up to this distance from the camera
+        self._max_distance = max_distance
+        # Blend between logarithmic (1) and uniform (0) split distances
+        self._split_weight = split_weight
+        # One depth texture layer for each cascade
+        self._render_target = RenderTarget(resolution, depth_only=True, layer_count=cascade_count)
+        # Render only depth data to target texture
+        self._material = DepthMaterial()
+        # Controls darkness of shadow
+        self._strength = strength
+        # Depth offset in world units, increased by the texel size of each cascade
+        self._bias = bias
+        self._pcf_radius = (pcf_kernel_size - 1) // 2
+        # Fitted per frame by update()
+        self._view_matrix = np.identity(4)
+        self._projection_matrix_list = [np.identity(4) for _ in range(cascade_count)]
+        self._split_array = np.zeros(cascade_count, dtype=np.float32)
+        self._depth_bias_array = np.zeros(cascade_count, dtype=np.float32)
+
+    @property
+    def cascade_count(self):
+        return self._cascade_count
+
+    @property
+    def depth_bias_array(self):
+        """ Bias of each cascade in its own depth range [0, 1] """
+        return self._depth_bias_array
+
+    @property
+    def light_source(self):
+        return self._light_source
+
+    @property
+    def material(self):
+        return self._material
+
+    @property
+    def matrix_array(self):
+        """ Projection matrix times view matrix of each cascade, transforming world to clip coordinates """
+        return np.array([projection_matrix @ self._view_matrix
+                         for projection_matrix in self._projection_matrix_list], dtype=np.float32)
+
+    @property
+    def pcf_radius(self):
+        return self._pcf_radius
+
+    @property
+    def projection_matrix_list(self):
+        return self._projection_matrix_list
+
+    @property
+    def render_target(self):
+        return self._render_target
+
+    @property
+    def split_array(self):
+        """ Far distance (along the camera view direction) of each cascade """
+        return self._split_array
+
+    @property
+    def strength(self):
+        return self._strength
+
+    @property
+    def view_matrix(self):
+        return self._view_matrix
+
+    def get_split_distances(self, near, far):
+        """
+        Return the cascade_count + 1 boundaries of the cascades between near and far,
+        mixing logarithmic and uniform distribution (practical split scheme)
+        """
+        distance_list = []
+        for i in range(self._cascade_count + 1):
+            fraction = i / self._cascade_count
+            logarithmic = near * (far / near) ** fraction
+            uniform = near + (far - near) * fraction
+            distance_list.append(self._split_weight * logarithmic + (1 - self._split_weight) * uniform)
+        return distance_list
+
+    def update(self, camera, caster_list):
+        """
+        Fit the cascades to the view frustum of the camera (its view matrix must be up to date);
+        return a list with the casters that may throw shadows into each cascade
+        """
+        # The light looks along its local -z axis; its position does not matter
+        rotation_matrix = np.array(self._light_source.global_matrix[0:3, 0:3], dtype=float)
+        rotation_matrix /= np.linalg.norm(rotation_matrix, axis=0)
+        self._view_matrix = np.identity(4)
+        self._view_matrix[0:3, 0:3] = rotation_matrix.T
+        # Frustum corners at the near and the far plane of the camera in world coordinates
+        inverse_matrix = inv(camera.projection_matrix @ camera.view_matrix)
+        corner_list = []
+        for z in (-1, 1):
+            for x, y in ((-1, -1), (1, -1), (1, 1), (-1, 1)):
+                corner = inverse_matrix @ np.array([x, y, z, 1])
+                corner_list.append(corner[0:3] / corner[3])
+        near_corners = np.array(corner_list[0:4])
+        far_corners = np.array(corner_list[4:8])
+        # Distances of the planes along the view direction
+        view_direction = -camera.view_matrix[2, 0:3]
+        camera_position = camera.global_position
+        near = float(view_direction @ (near_corners[0] - camera_position))
+        far = float(view_direction @ (far_corners[0] - camera_position))
+        split_list = self.get_split_distances(near, min(far, self._max_distance))
+        # Caster bounding spheres in light coordinates
+        sphere_list = []
+        for mesh in caster_list:
+            center, radius = mesh.bounding_sphere
+            sphere_list.append((rotation_matrix.T @ center, radius))
+        width, height = self._resolution
+        caster_list_per_cascade = []
+        for i in range(self._cascade_count):
+            # Corners of the slice; the view depth changes linearly along each frustum edge
+            corners = np.array([near_corners + (far_corners - near_corners) * (split - near) / (far - near)
+                                for split in (split_list[i], split_list[i + 1])]).reshape(8, 3)
+            # A sphere around the slice keeps its size when the camera turns,
+            # so the texel size stays constant and the shadow edges do not shimmer
+            center = corners.mean(axis=0)
+            radius = float(np.max(np.linalg.norm(corners - center, axis=1)))
+            radius = math.ceil(radius * 16) / 16
+            texel_width = 2 * radius / width
+            texel_height = 2 * radius / height
+            # Move the cascade in whole texels only
+            center_x, center_y, center_z = rotation_matrix.T @ center
+            center_x = math.floor(center_x / texel_width) * texel_width
+            center_y = math.floor(center_y / texel_height) * texel_height
+            # Casters overlapping the cascade sideways, which are not completely behind the receivers
+            # (objects between the light and the receivers throw shadows into the cascade)
+            cascade_caster_list = []
+            top = center_z + radius
+            for mesh, (caster_center, caster_radius) in zip(caster_list, sphere_list):
+                if (abs(caster_center[0] - center_x) <= radius + caster_radius
+                        and abs(caster_center[1] - center_y) <= radius + caster_radius
+                        and caster_center[2] + caster_radius >= center_z - radius):
+                    cascade_caster_list.append(mesh)
+                    top = max(top, caster_center[2] + caster_radius)
+            # Near and far planes are distances along the -z axis of the light
+            self._projection_matrix_list[i] = Matrix.make_orthographic(
+                center_x - radius, center_x + radius, center_y - radius, center_y + radius,
+                -top, -(center_z - radius))
+            self._split_array[i] = split_list[i + 1]
+            self._depth_bias_array[i] = (self._bias + max(texel_width, texel_height)) / (top - (center_z - radius))
+            caster_list_per_cascade.append(cascade_caster_list)
+        return caster_list_per_cascade
@@ -1,3 +1,5 @@
+import math
+
 from core_ext.object3d import Object3D
 
 
@@ -23,3 +25,19 @@ class Light(Object3D):
     @property
     def attenuation(self):
         return self._attenuation
+
+    @property
+    def packed_data(self):
+        """ Members of the Light struct of the shaders: (light type, color, direction, position, attenuation) """
+        return (self._light_type, tuple(self._color), tuple(self.direction),
+                tuple(self.global_position), tuple(self._attenuation))
+
+    def get_influence(self, center, radius):
+        """
+        Estimate the brightness added by this light to a sphere (center, radius) in world coordinates;
+        used to choose the lights of a mesh when its material has fewer light uniforms than the scene has lights
+        """
+        # Ambient and directional lights reach everything, type 0 lights nothing
+        if self._light_type == 0:
+            return 0
+        return math.inf
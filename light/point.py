@@ -1,7 +1,15 @@
+import math
+
+import numpy as np
+
 from light.light import Light
 
 
 class PointLight(Light):
+    # Lights contribute less than this fraction of their color (below 8-bit precision)
+    # beyond their influence radius
+    INFLUENCE_THRESHOLD = 1 / 256
+
     def __init__(self,
                  color=(1, 1, 1),
                  position=(0, 0, 0),
@@ -11,3 +19,26 @@ class PointLight(Light):
         self._color = color
         self._attenuation = attenuation
         self.set_position(position)
+
+    @property
+    def influence_radius(self):
+        """
+        Distance at which the attenuated brightest color component of the light falls to
+        INFLUENCE_THRESHOLD; infinite if the attenuation does not grow with distance
+        """
+        constant, linear, quadratic = self._attenuation
+        # Solve max(color) / (constant + linear * d + quadratic * d^2) = threshold for d
+        limit = max(self._color) / self.INFLUENCE_THRESHOLD
+        if quadratic > 0:
+            return (-linear + math.sqrt(linear ** 2 + 4 * quadratic * max(limit - constant, 0))) / (2 * quadratic)
+        if linear > 0:
+            return max(limit - constant, 0) / linear
+        return math.inf
+
+    def get_influence(self, center, radius):
+        """ Attenuated brightest color component at the point of the sphere nearest to the light (0 if out of reach) """
+        distance = max(float(np.linalg.norm(np.subtract(center, self.global_position))) - radius, 0)
+        if distance > self.influence_radius:
+            return 0
+        constant, linear, quadratic = self._attenuation
+        return max(self._color) / (constant + linear * distance + quadratic * distance ** 2)
@@ -0,0 +1,123 @@
+import math
+
+import numpy as np
+from numpy.linalg import inv
+
+from core.matrix import Matrix
+from core_ext.render_target import RenderTarget
+from material.point_depth import PointDepthMaterial
+
+
+class PointShadow:
+    """
+    Omnidirectional shadow of a point light.
+    The distances from the light to the nearest casters are stored in a depth cube map,
+    which is rendered in a single layered pass (see PointDepthMaterial).
+    """
+    # Viewing direction and up vector of the cube map faces +X, -X, +Y, -Y, +Z, -Z
+    FACE_ORIENTATION_LIST = [
+        ((1, 0, 0), (0, -1, 0)),
+        ((-1, 0, 0), (0, -1, 0)),
+        ((0, 1, 0), (0, 0, 1)),
+        ((0, -1, 0), (0, 0, -1)),
+        ((0, 0, 1), (0, -1, 0)),
+        ((0, 0, -1), (0, -1, 0)),
+    ]
+
+    def __init__(self,
+                 light_source,
+                 strength=0.5,
+                 resolution=512,
+                 near=0.05,
+                 far=25,
+                 bias=0.005):
+        # Must be point light
+        self._light_source = light_source
+        self._resolution = resolution
+        # Casters farther away than far do not throw shadows
+        self._near = near
+        self._far = far
+        # Target used during the shadow pass, contains the depth cube map
+        self._render_target = RenderTarget((resolution, resolution), depth_only=True, cube_map=True)
+        # Render the light distance into all faces at once
+        self._material = PointDepthMaterial()
+        # Controls darkness of shadow
+        self._strength = strength
+        # Offset of the compared distance in the range [0, 1] of the cube map
+        self._bias = bias
+        # Face projection: square 90 degree frustum
+        self._projection_matrix = Matrix.make_perspective(90, 1, near, far)
+
+    @property
+    def bias(self):
+        return self._bias
+
+    @property
+    def far(self):
+        return self._far
+
+    @property
+    def light_source(self):
+        return self._light_source
+
+    @property
+    def material(self):
+        return self._material
+
+    @property
+    def render_target(self):
+        return self._render_target
+
+    @property
+    def strength(self):
+        return self._strength
+
+    @staticmethod
+    def get_face_mask(relative_center, radius, far):
+        """
+        Return the bit mask of the cube map faces whose frustum may contain a sphere
+        given relative to the light position (0 if the sphere is beyond the far distance)
+        """
+        if np.linalg.norm(relative_center) - radius > far:
+            return 0
+        face_mask = 0
+        for face in range(6):
+            axis = face // 2
+            sign = 1 if face % 2 == 0 else -1
+            depth = sign * relative_center[axis]
+            if depth < -radius:
+                continue
+            # Side planes of the 90 degree frustum: |side coordinate| <= depth
+            inside = True
+            for side_axis in range(3):
+                if side_axis != axis and abs(relative_center[side_axis]) - depth > radius * math.sqrt(2):
+                    inside = False
+            if inside:
+                face_mask |= 1 << face
+        return face_mask
+
+    def update(self, caster_list):
+        """
+        Update the uniforms of the depth material;
+        return (mesh, face mask) pairs of the casters visible from at least one face
+        """
+        light_position = np.array(self._light_source.global_position)
+        face_matrix_list = []
+        for direction, up in self.FACE_ORIENTATION_LIST:
+            right = np.cross(direction, up)
+            camera_matrix = np.identity(4)
+            camera_matrix[0:3, 0] = right
+            camera_matrix[0:3, 1] = up
+            camera_matrix[0:3, 2] = np.negative(direction)
+            camera_matrix[0:3, 3] = light_position
+            face_matrix_list.append(self._projection_matrix @ inv(camera_matrix))
+        self._material.uniform_dict["faceMatrices"].data = np.array(face_matrix_list)
+        self._material.uniform_dict["lightPosition"].data = light_position
+        self._material.uniform_dict["farPlane"].data = self._far
+        visible_caster_list = []
+        for mesh in caster_list:
+            center, radius = mesh.bounding_sphere
+            face_mask = self.get_face_mask(center - light_position, radius, self._far)
+            if face_mask != 0:
+                visible_caster_list.append((mesh, face_mask))
+        return visible_caster_list
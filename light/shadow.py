@@ -1,5 +1,3 @@
-import OpenGL.GL as GL
-
 from core_ext.camera import Camera
 from core_ext.render_target import RenderTarget
 from material.depth import DepthMaterial
@@ -11,7 +9,8 @@ class Shadow:
                  strength=0.5,
                  resolution=(512, 512),
                  camera_bounds=(-5, 5, -5, 5, 0, 20),
-                 bias=0.01):
+                 bias=0.01,
+                 pcf_kernel_size=3):
 
         # Must be directional light
         self._light_source = light_source
@@ -21,10 +20,14 @@ class Shadow:
         self._camera.set_orthographic(left, right, bottom, top, near, far)
         self._light_source.add(self._camera)
         # Target used during the shadow pass, contains depth texture
-        self._render_target = RenderTarget(
-            resolution,
-            property_dict={"wrap": GL.GL_CLAMP_TO_BORDER}
-        )
+        self._resolution = resolution
+        self._render_target = RenderTarget(resolution, depth_only=True)
+        # Target caching the depth of static casters; created when first needed
+        self._static_render_target = None
+        self._static_map_valid = False
+        # Light, camera and caster state of the last shadow pass
+        self._static_key = None
+        self._dynamic_key = None
         # Render only depth data to target texture
         self._material = DepthMaterial()
         # Controls darkness of shadow
@@ -32,6 +35,11 @@ class Shadow:
         # Used to avoid visual artifacts due to
         # rounding / sampling precision issues
         self._bias = bias
+        # Shadow lookups average kernel size x kernel size filtered depth comparisons
+        # (percentage-closer filtering); the size should be odd
+        if pcf_kernel_size < 1 or pcf_kernel_size % 2 == 0:
+            raise Exception("PCF kernel size must be a positive odd number")
+        self._pcf_radius = (pcf_kernel_size - 1) // 2
 
     @property
     def bias(self):
@@ -49,14 +57,54 @@ class Shadow:
     def light_source(self):
         return self._light_source
 
+    @property
+    def pcf_radius(self):
+        return self._pcf_radius
+
     @property
     def render_target(self):
         return self._render_target
 
+    @property
+    def static_map_valid(self):
+        return self._static_map_valid
+
+    @static_map_valid.setter
+    def static_map_valid(self, static_map_valid):
+        self._static_map_valid = static_map_valid
+
+    @property
+    def static_render_target(self):
+        if self._static_render_target is None:
+            self._static_render_target = RenderTarget(self._resolution, depth_only=True)
+        return self._static_render_target
+
     @property
     def strength(self):
         return self._strength
 
+    def invalidate(self):
+        """ Force the next shadow pass to redraw all casters, e.g. after changing vertex data """
+        self._static_key = None
+        self._dynamic_key = None
+        self._static_map_valid = False
+
+    def update_cache(self, static_caster_list, dynamic_caster_list):
+        """
+        Compare the light, the shadow camera bounds and the casters (with their geometries and world matrices,
+        see Mesh.draw_key) to the previous shadow pass; return (static casters changed, dynamic casters changed)
+        """
+        light_key = (self._light_source.global_matrix.tobytes(), self._camera.projection_matrix.tobytes())
+        static_key = (light_key, [mesh.draw_key for mesh in static_caster_list])
+        dynamic_key = (light_key, [mesh.draw_key for mesh in dynamic_caster_list])
+        static_changed = static_key != self._static_key
+        dynamic_changed = dynamic_key != self._dynamic_key
+        if static_changed:
+            self._static_map_valid = False
+        self._static_key = static_key
+        self._dynamic_key = dynamic_key
+        return static_changed, dynamic_changed
+
     def update_internal(self):
         self._camera.update_view_matrix()
         self._material.uniform_dict["viewMatrix"].data = self._camera.view_matrix
@@ -0,0 +1,169 @@
+import math
+
+import numpy as np
+
+from core_ext.camera import Camera
+from core_ext.render_target import RenderTarget
+from material.depth import DepthMaterial
+
+
+class AtlasShadow:
+    """ Shadow of one directional light, rendered into a square tile of a ShadowAtlas """
+    def __init__(self, light_source, camera_bounds=(-5, 5, -5, 5, 0, 20), bias=0.01):
+        # Must be directional light
+        self._light_source = light_source
+        # Camera used to render scene from perspective of light
+        self._camera = Camera()
+        left, right, bottom, top, near, far = camera_bounds
+        self._camera.set_orthographic(left, right, bottom, top, near, far)
+        self._light_source.add(self._camera)
+        # Center and radius of the shadow volume in camera coordinates
+        self._local_center = np.array([(left + right) / 2, (bottom + top) / 2, -(near + far) / 2])
+        self._radius = math.sqrt((right - left) ** 2 + (top - bottom) ** 2 + (far - near) ** 2) / 2
+        # Used to avoid visual artifacts due to
+        # rounding / sampling precision issues
+        self._bias = bias
+        # (x, y, size) of the tile in pixels; None if the atlas had no room left
+        self._rect = None
+
+    @property
+    def bias(self):
+        return self._bias
+
+    @property
+    def bounding_sphere(self):
+        """ Return (center, radius) of a sphere enclosing the shadow volume in world coordinates """
+        global_matrix = self._camera.global_matrix
+        return global_matrix[0:3, 0:3] @ self._local_center + global_matrix[0:3, 3], self._radius
+
+    @property
+    def camera(self):
+        return self._camera
+
+    @property
+    def light_source(self):
+        return self._light_source
+
+    @property
+    def matrix(self):
+        """ Projection matrix times view matrix of the shadow camera """
+        return self._camera.projection_matrix @ self._camera.view_matrix
+
+    @property
+    def rect(self):
+        return self._rect
+
+    @rect.setter
+    def rect(self, rect):
+        self._rect = rect
+
+
+class ShadowAtlas:
+    """
+    Depth texture shared by the shadows of several lights.
+    Each shadow gets a square tile whose size (a power of two) follows the importance of the light,
+    measured by the screen coverage of its shadow volume; all tiles are rendered with one framebuffer.
+    """
+    # Size of the shadow array declared in the shaders
+    MAX_SHADOW_COUNT = 8
+
+    def __init__(self, resolution=2048, min_tile_size=128, strength=0.5, pcf_kernel_size=3):
+        if pcf_kernel_size < 1 or pcf_kernel_size % 2 == 0:
+            raise Exception("PCF kernel size must be a positive odd number")
+        self._resolution = resolution
+        # Tiles smaller than this are not used
+        self._min_tile_size = min_tile_size
+        self._render_target = RenderTarget((resolution, resolution), depth_only=True)
+        # Render only depth data to target texture
+        self._material = DepthMaterial()
+        # Controls darkness of shadow
+        self._strength = strength
+        self._pcf_radius = (pcf_kernel_size - 1) // 2
+        self._shadow_list = []
+
+    @property
+    def allocated_shadow_list(self):
+        """ Shadows with a tile in the atlas """
+        return [shadow for shadow in self._shadow_list if shadow.rect is not None]
+
+    @property
+    def material(self):
+        return self._material
+
+    @property
+    def pcf_radius(self):
+        return self._pcf_radius
+
+    @property
+    def render_target(self):
+        return self._render_target
+
+    @property
+    def resolution(self):
+        return self._resolution
+
+    @property
+    def shadow_list(self):
+        return self._shadow_list
+
+    @property
+    def strength(self):
+        return self._strength
+
+    def add_shadow(self, light_source, camera_bounds=(-5, 5, -5, 5, 0, 20), bias=0.01):
+        """ Add the shadow of a directional light; return the AtlasShadow object """
+        if len(self._shadow_list) == self.MAX_SHADOW_COUNT:
+            raise Exception(f"Shadow atlas supports at most {self.MAX_SHADOW_COUNT} shadows")
+        shadow = AtlasShadow(light_source, camera_bounds, bias)
+        self._shadow_list.append(shadow)
+        return shadow
+
+    def get_tile_size(self, importance):
+        """ Return the power-of-two tile size for a fraction (0...1) of the screen height covered by a shadow """
+        size = self._resolution * min(importance, 0.5)
+        if size < self._min_tile_size:
+            return self._min_tile_size
+        return 2 ** int(math.log2(size))
+
+    def allocate(self, size_list):
+        """
+        Pack square tiles of the given power-of-two sizes into the atlas;
+        return (x, y, size) for each request (None if no room is left).
+        While the tiles cover more than the atlas, the largest one is halved (down to the minimum tile size);
+        then they are placed from the largest to the smallest by splitting free squares into quarters,
+        which always succeeds for power-of-two squares that fit by area.
+        """
+        size_list = list(size_list)
+        while sum(size * size for size in size_list) > self._resolution ** 2:
+            largest_index = max(range(len(size_list)), key=lambda i: size_list[i])
+            if size_list[largest_index] <= self._min_tile_size:
+                break
+            size_list[largest_index] //= 2
+        rect_list = [None] * len(size_list)
+        free_list = [(0, 0, self._resolution)]
+        for index in sorted(range(len(size_list)), key=lambda i: -size_list[i]):
+            size = size_list[index]
+            fitting_list = [free for free in free_list if free[2] >= size]
+            if not fitting_list:
+                continue
+            # Use the smallest free square to keep large squares for later requests
+            free = min(fitting_list, key=lambda x: x[2])
+            free_list.remove(free)
+            x, y, free_size = free
+            while free_size > size:
+                free_size //= 2
+                free_list.extend([(x + free_size, y, free_size),
+                                  (x, y + free_size, free_size),
+                                  (x + free_size, y + free_size, free_size)])
+            rect_list[index] = (x, y, size)
+        return rect_list
+
+    def update(self, camera):
+        """ Update the shadow cameras and assign tiles by the screen coverage of each shadow volume """
+        size_list = []
+        for shadow in self._shadow_list:
+            shadow.camera.update_view_matrix()
+            center, radius = shadow.bounding_sphere
+            size_list.append(self.get_tile_size(camera.projected_size(center, radius)))
+        for shadow, rect in zip(self._shadow_list, self.allocate(size_list)):
+            shadow.rect = rect
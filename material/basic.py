@@ -13,6 +13,9 @@ class BasicMaterial(Material):
                 in vec3 vertexColor;
                 out vec3 color;    
                         
+                // The same depth as DepthMaterial in the depth prepass
+                invariant gl_Position;
+
                 void main()
                 {
                     gl_Position = projectionMatrix * viewMatrix * modelMatrix * vec4(vertexPosition, 1.0);
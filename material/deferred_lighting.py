@@ -0,0 +1,109 @@
+from light.light import Light
+from material.material import Material
+
+
+class DeferredLightingMaterial(Material):
+    """
+    Lights the surfaces stored in a G-buffer (see GBufferMaterial) with one light source per full-screen pass;
+    the world position of each pixel is reconstructed from its depth.
+    The lit color of the pixel is returned with its depth, so that later passes can be depth tested against it.
+    """
+    def __init__(self):
+        # vertex shader code
+        vertex_shader_code = """
+        in vec2 vertexPosition;
+        in vec2 vertexUV;
+        out vec2 UV;
+
+        void main()
+        {
+            gl_Position = vec4(vertexPosition, 0.0, 1.0);
+            UV = vertexUV;
+        }
+        """
+
+        # fragment shader code
+        fragment_shader_code = """
+        struct Light
+        {
+            int lightType;  // 1 = AMBIENT, 2 = DIRECTIONAL, 3 = POINT
+            vec3 color;  // used by all lights
+            vec3 direction;  // used by directional lights
+            vec3 position;  // used by point lights
+            vec3 attenuation;  // used by directional lights
+        };
+
+        uniform Light light0;
+        uniform vec3 viewPosition;
+        // maps normalized device coordinates back to world coordinates
+        uniform mat4 inverseViewProjectionMatrix;
+        // albedo and specular strength
+        uniform sampler2D albedoSampler;
+        // world normal and shininess
+        uniform sampler2D normalSampler;
+        uniform sampler2D depthSampler;
+        in vec2 UV;
+        out vec4 fragColor;
+
+        void main()
+        {
+            float depth = texture(depthSampler, UV).r;
+            // nothing was drawn into the G-buffer here
+            if (depth == 1.0)
+                discard;
+            vec4 albedoData = texture(albedoSampler, UV);
+            vec4 normalData = texture(normalSampler, UV);
+            vec4 worldPosition = inverseViewProjectionMatrix * vec4(vec3(UV, depth) * 2.0 - 1.0, 1.0);
+            vec3 position = worldPosition.xyz / worldPosition.w;
+            vec3 pointNormal = normalize(normalData.xyz);
+            float specularStrength = albedoData.a;
+            float shininess = normalData.a;
+
+            // same lighting model as the Phong material (without specular light for Lambert materials)
+            float ambient = 0;
+            float diffuse = 0;
+            float specular = 0;
+            float attenuation = 1;
+            vec3 lightDirection = vec3(0, 0, 0);
+            if (light0.lightType == 1)  // ambient light
+            {
+                ambient = 1;
+            }
+            else if (light0.lightType == 2)  // directional light
+            {
+                lightDirection = normalize(light0.direction);
+            }
+            else if (light0.lightType == 3)  // point light
+            {
+                lightDirection = normalize(position - light0.position);
+                float distance = length(light0.position - position);
+                attenuation = 1.0 / (light0.attenuation[0]
+                                   + light0.attenuation[1] * distance
+                                   + light0.attenuation[2] * distance * distance);
+            }
+            if (light0.lightType > 1)  // directional or point light
+            {
+                diffuse = max(dot(pointNormal, -lightDirection), 0.0);
+                diffuse *= attenuation;
+                if (diffuse > 0 && specularStrength > 0)
+                {
+                    vec3 viewDirection = normalize(viewPosition - position);
+                    vec3 reflectDirection = reflect(lightDirection, pointNormal);
+                    specular = max(dot(viewDirection, reflectDirection), 0.0);
+                    specular = specularStrength * pow(specular, shininess);
+                }
+            }
+            fragColor = vec4(albedoData.rgb * light0.color * (ambient + diffuse + specular), 1.0);
+            gl_FragDepth = depth;
+        }
+        """
+
+        # Initialize shaders
+        super().__init__(vertex_shader_code, fragment_shader_code)
+        self.add_uniform("Light", "light0", Light())
+        self.add_uniform("vec3", "viewPosition", [0, 0, 0])
+        self.add_uniform("mat4", "inverseViewProjectionMatrix", None)
+        self.add_uniform("sampler2D", "albedoSampler", [None, 1])
+        self.add_uniform("sampler2D", "normalSampler", [None, 2])
+        self.add_uniform("sampler2D", "depthSampler", [None, 3])
+        self.locate_uniforms()
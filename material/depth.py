@@ -11,6 +11,10 @@ class DepthMaterial(Material):
         uniform mat4 viewMatrix;
         uniform mat4 modelMatrix;
         
+        // Computed like in the shading materials, which are depth tested for equality
+        // against this depth after the depth prepass
+        invariant gl_Position;
+
         void main()
         {
             gl_Position = projectionMatrix * viewMatrix * modelMatrix * vec4(vertexPosition, 1);
@@ -23,6 +27,8 @@ class DepthMaterial(Material):
         
         void main()
         {
+            // Depth-only render targets keep gl_FragCoord.z in their depth texture;
+            // the color output is discarded by them (GL_NONE draw buffer)
             float z = gl_FragCoord.z;
             fragColor = vec4(z, z, z, 1);
         }
@@ -1,5 +1,6 @@
 import OpenGL.GL as GL
 
+from core.gl_state import GLState
 from material.lighted import LightedMaterial
 
 
@@ -79,6 +80,9 @@ class FlatMaterial(LightedMaterial):
             out vec2 UV;
             out vec3 light;
             
+            // The same depth as DepthMaterial in the depth prepass
+            invariant gl_Position;
+
             void main()
             {
                 gl_Position = projectionMatrix * viewMatrix * modelMatrix * vec4(vertexPosition, 1);
@@ -111,11 +115,11 @@ class FlatMaterial(LightedMaterial):
 
     def update_render_settings(self):
         if self.setting_dict["doubleSide"]:
-            GL.glDisable(GL.GL_CULL_FACE)
+            GLState.disable(GL.GL_CULL_FACE)
         else:
-            GL.glEnable(GL.GL_CULL_FACE)
+            GLState.enable(GL.GL_CULL_FACE)
         if self.setting_dict["wireframe"]:
-            GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_LINE)
+            GLState.polygon_mode(GL.GL_LINE)
         else:
-            GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_FILL)
-        GL.glLineWidth(self.setting_dict["lineWidth"])
+            GLState.polygon_mode(GL.GL_FILL)
+        GLState.line_width(self.setting_dict["lineWidth"])
@@ -0,0 +1,77 @@
+from material.material import Material
+
+
+class GBufferMaterial(Material):
+    """
+    Writes the surface attributes of Lambert and Phong materials into the textures of a G-buffer
+    instead of lighting them; the lighting is added later by full-screen passes (see DeferredLightingMaterial).
+    Output 0 stores the albedo and the specular strength, output 1 the world normal and the shininess;
+    the depth buffer of the G-buffer keeps the depth.
+    """
+    def __init__(self, use_texture=False, use_bump_texture=False):
+        # vertex shader code
+        vertex_shader_code = """
+        uniform mat4 projectionMatrix;
+        uniform mat4 viewMatrix;
+        uniform mat4 modelMatrix;
+        in vec3 vertexPosition;
+        in vec2 vertexUV;
+        in vec3 vertexNormal;
+        out vec2 UV;
+        out vec3 normal;
+
+        void main()
+        {
+            gl_Position = projectionMatrix * viewMatrix * modelMatrix * vec4(vertexPosition, 1);
+            UV = vertexUV;
+            normal = normalize(mat3(modelMatrix) * vertexNormal);
+        }
+        """
+
+        # fragment shader code
+        fragment_shader_code = """
+        uniform vec3 baseColor;
+        uniform bool useTexture;
+        uniform sampler2D textureSampler;
+        uniform bool useBumpTexture;
+        uniform sampler2D bumpTextureSampler;
+        uniform float bumpStrength;
+        // zero for Lambert materials
+        uniform float specularStrength;
+        uniform float shininess;
+        in vec2 UV;
+        in vec3 normal;
+        layout(location = 0) out vec4 albedoData;
+        layout(location = 1) out vec4 normalData;
+
+        void main()
+        {
+            vec4 color = vec4(baseColor, 1.0);
+            if (useTexture)
+            {
+                color *= texture(textureSampler, UV);
+            }
+            vec3 calcNormal = normal;
+            if (useBumpTexture)
+            {
+                calcNormal += bumpStrength * vec3(texture(bumpTextureSampler, UV));
+            }
+            albedoData = vec4(color.rgb, specularStrength);
+            normalData = vec4(normalize(calcNormal), shininess);
+        }
+        """
+
+        # Initialize shaders
+        super().__init__(vertex_shader_code, fragment_shader_code)
+        self.add_uniform("vec3", "baseColor", [1.0, 1.0, 1.0])
+        self.add_uniform("bool", "useTexture", use_texture)
+        # Texture references are copied from the forward material
+        if use_texture:
+            self.add_uniform("sampler2D", "textureSampler", [None, 1])
+        self.add_uniform("bool", "useBumpTexture", use_bump_texture)
+        if use_bump_texture:
+            self.add_uniform("sampler2D", "bumpTextureSampler", [None, 2])
+            self.add_uniform("float", "bumpStrength", 1.0)
+        self.add_uniform("float", "specularStrength", 0.0)
+        self.add_uniform("float", "shininess", 1.0)
+        self.locate_uniforms()
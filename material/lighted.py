@@ -1,27 +1,319 @@
+from light.cascaded_shadow import CascadedShadow
+from light.shadow_atlas import ShadowAtlas
 from material.material import Material
 
 
 class LightedMaterial(Material):
+    # Capacity of the light array declared in the shaders
+    MAX_LIGHT_COUNT = 16
+
     def __init__(self, number_of_light_sources=1):
+        # Maximum number of lights applied to a mesh (the most influential ones are chosen by the renderer);
+        # the shader code does not depend on it, so all materials of a type share one program
+        if not 1 <= number_of_light_sources <= self.MAX_LIGHT_COUNT:
+            raise Exception(f"Number of light sources must be between 1 and {self.MAX_LIGHT_COUNT}")
         self._number_of_light_sources = number_of_light_sources
         # Properties vertex_shader_code and fragment_shader_code
         # will be defined in inherited classes FlatMaterial, LambertMaterial,
         # and PhongMaterial
         super().__init__(self.vertex_shader_code, self.fragment_shader_code)
-        # Add light uniforms to self._uniform_dict
-        for i in range(self._number_of_light_sources):
-            self.add_uniform("Light", f"light{i}", None)
+        # Add light uniforms to self._uniform_dict; set for each mesh by the renderer
+        self.add_uniform("LightArray", "lights", [])
+        self.add_uniform("int", "lightCount", 0)
+
+    @property
+    def number_of_light_sources(self):
+        return self._number_of_light_sources
 
     @property
     def declaring_light_uniforms_in_shader_code(self):
-        """ Create a text line with light uniforms to be inserted into a shader code """
-        return "\n" + "\n".join(f"\t\t\tuniform Light light{i};"
-                                for i in range(self._number_of_light_sources)) + "\n"
+        """ Create the light array uniforms to be inserted into a shader code """
+        return f"""
+            uniform Light lights[{self.MAX_LIGHT_COUNT}];
+            // number of used elements of lights
+            uniform int lightCount;
+        """
 
     @property
     def adding_lights_in_shader_code(self):
-        return "\n" + "\n".join(f"\t\t\t\tlight += calculateLight(light{i}, position, calcNormal);"
-                                for i in range(self._number_of_light_sources))
+        return """
+                for (int i = 0; i < lightCount; i++)
+                {
+                    light += calculateLight(lights[i], position, calcNormal);
+                }"""
+
+    @property
+    def declaring_shadow_uniforms_in_shader_code(self):
+        """ Create the Shadow struct and shadow uniforms to be inserted into a shader code """
+        return """
+            struct Shadow
+            {
+                // direction of light that casts shadow
+                vec3 lightDirection;
+                // data from camera that produces depth texture
+                mat4 projectionMatrix;
+                mat4 viewMatrix;
+                // depth texture of shadow camera, compared with a reference depth when sampled
+                sampler2DShadow depthTextureSampler;
+                // regions in shadow multiplied by (1-strength)
+                float strength;
+                // reduces unwanted visual artifacts
+                float bias;
+                // percentage-closer filtering samples (2 * pcfRadius + 1)^2 texels
+                int pcfRadius;
+            };
+            
+            uniform bool useShadow;
+            uniform Shadow shadow0;
+            // false for meshes that opt out of receiving shadows
+            uniform bool receiveShadow;
+        """
+
+    @property
+    def calculating_shadow_in_shader_code(self):
+        """ Create a function returning the lit fraction (0 = in shadow, 1 = lit) of a fragment """
+        return """
+            float calculateShadow(sampler2DShadow depthTextureSampler, vec3 shadowPosition, float bias, int pcfRadius)
+            {
+                // convert range [-1, 1] to range [0, 1]
+                // for UV coordinate and depth information
+                vec3 shadowCoord = (shadowPosition + 1.0) / 2.0;
+                float fragmentDistanceToLight = clamp(shadowCoord.z, 0, 1) - bias;
+                vec2 texelSize = 1.0 / vec2(textureSize(depthTextureSampler, 0));
+                // every lookup is a linearly filtered 2x2 comparison
+                float lit = 0.0;
+                for (int x = -pcfRadius; x <= pcfRadius; x++)
+                {
+                    for (int y = -pcfRadius; y <= pcfRadius; y++)
+                    {
+                        vec2 offset = vec2(x, y) * texelSize;
+                        lit += texture(depthTextureSampler, vec3(shadowCoord.xy + offset, fragmentDistanceToLight));
+                    }
+                }
+                float sampleCount = float((2 * pcfRadius + 1) * (2 * pcfRadius + 1));
+                return lit / sampleCount;
+            }
+        """
+
+    @property
+    def calculating_cascaded_shadow_in_shader_code(self):
+        """
+        Create the CascadedShadow struct, its uniforms and a function returning
+        the lit fraction (0 = in shadow, 1 = lit) of a fragment at a world position
+        """
+        return f"""
+            #define MAX_CASCADE_COUNT {CascadedShadow.MAX_CASCADE_COUNT}
+            struct CascadedShadow
+            {{
+                // direction of light that casts shadow
+                vec3 lightDirection;
+                // projection matrix * view matrix of each cascade
+                mat4 matrices[MAX_CASCADE_COUNT];
+                // far distance of each cascade from the camera along the view direction
+                float splits[MAX_CASCADE_COUNT];
+                // depth bias of each cascade
+                float biases[MAX_CASCADE_COUNT];
+                int cascadeCount;
+                // one layer for each cascade
+                sampler2DArrayShadow depthTextureSampler;
+                // regions in shadow multiplied by (1-strength)
+                float strength;
+                int pcfRadius;
+            }};
+            
+            uniform bool useCascadedShadow;
+            uniform CascadedShadow cascadedShadow;
+            uniform mat4 viewMatrix;
+            
+            float calculateCascadedShadow(vec3 pointPosition)
+            {{
+                // choose the first cascade reaching beyond the fragment
+                float viewDistance = -(viewMatrix * vec4(pointPosition, 1)).z;
+                int cascade = -1;
+                for (int i = cascadedShadow.cascadeCount - 1; i >= 0; i--)
+                {{
+                    if (viewDistance <= cascadedShadow.splits[i])
+                        cascade = i;
+                }}
+                // no shadows beyond the last cascade
+                if (cascade < 0)
+                    return 1.0;
+                vec3 shadowCoord = (vec3(cascadedShadow.matrices[cascade] * vec4(pointPosition, 1)) + 1.0) / 2.0;
+                float fragmentDistanceToLight = clamp(shadowCoord.z, 0, 1) - cascadedShadow.biases[cascade];
+                vec2 texelSize = 1.0 / vec2(textureSize(cascadedShadow.depthTextureSampler, 0).xy);
+                int pcfRadius = cascadedShadow.pcfRadius;
+                float lit = 0.0;
+                for (int x = -pcfRadius; x <= pcfRadius; x++)
+                {{
+                    for (int y = -pcfRadius; y <= pcfRadius; y++)
+                    {{
+                        vec2 offset = vec2(x, y) * texelSize;
+                        lit += texture(cascadedShadow.depthTextureSampler,
+                                       vec4(shadowCoord.xy + offset, cascade, fragmentDistanceToLight));
+                    }}
+                }}
+                float sampleCount = float((2 * pcfRadius + 1) * (2 * pcfRadius + 1));
+                return lit / sampleCount;
+            }}
+        """
+
+    @property
+    def calculating_point_shadow_in_shader_code(self):
+        """
+        Create the PointShadow struct, its uniforms and a function returning
+        the lit fraction (0 = in shadow, 1 = lit) of a fragment at a world position
+        """
+        return """
+            struct PointShadow
+            {
+                vec3 lightPosition;
+                // distances in the cube map are scaled by 1 / farPlane
+                float farPlane;
+                // distance from light to nearest caster in each direction
+                samplerCubeShadow depthTextureSampler;
+                // regions in shadow multiplied by (1-strength)
+                float strength;
+                // reduces unwanted visual artifacts
+                float bias;
+            };
+            
+            uniform bool usePointShadow;
+            uniform PointShadow pointShadow;
+            
+            float calculatePointShadow(vec3 pointPosition)
+            {
+                vec3 lightToPoint = pointPosition - pointShadow.lightPosition;
+                float fragmentDistanceToLight = length(lightToPoint) / pointShadow.farPlane;
+                // no shadows beyond the far plane
+                if (fragmentDistanceToLight >= 1.0)
+                    return 1.0;
+                // the direction selects the face and texel; linear filtering blends 2x2 comparisons
+                return texture(pointShadow.depthTextureSampler,
+                               vec4(lightToPoint, fragmentDistanceToLight - pointShadow.bias));
+            }
+        """
+
+    @property
+    def calculating_atlas_shadows_in_shader_code(self):
+        """
+        Create the ShadowAtlas struct, its uniforms and a function returning
+        the factor applied to the color of a fragment by the shadows of all atlas lights
+        """
+        return f"""
+            #define MAX_ATLAS_SHADOW_COUNT {ShadowAtlas.MAX_SHADOW_COUNT}
+            struct AtlasShadow
+            {{
+                // direction of light that casts shadow
+                vec3 lightDirection;
+                // projection matrix * view matrix of shadow camera
+                mat4 matrix;
+                // position and size of the tile in the atlas (texture coordinates)
+                vec4 rect;
+                // reduces unwanted visual artifacts
+                float bias;
+            }};
+            
+            struct ShadowAtlas
+            {{
+                AtlasShadow shadows[MAX_ATLAS_SHADOW_COUNT];
+                int shadowCount;
+                // depth tiles of all shadows
+                sampler2DShadow depthTextureSampler;
+                // regions in shadow multiplied by (1-strength)
+                float strength;
+                int pcfRadius;
+            }};
+            
+            uniform bool useShadowAtlas;
+            uniform ShadowAtlas shadowAtlas;
+            
+            float calculateAtlasShadows(vec3 pointPosition, vec3 pointNormal)
+            {{
+                float factor = 1.0;
+                vec2 texelSize = 1.0 / vec2(textureSize(shadowAtlas.depthTextureSampler, 0));
+                int pcfRadius = shadowAtlas.pcfRadius;
+                for (int i = 0; i < shadowAtlas.shadowCount; i++)
+                {{
+                    AtlasShadow shadow = shadowAtlas.shadows[i];
+                    // only surfaces facing the light are darkened
+                    if (dot(pointNormal, -normalize(shadow.lightDirection)) <= 0.01)
+                        continue;
+                    vec3 shadowCoord = (vec3(shadow.matrix * vec4(pointPosition, 1)) + 1.0) / 2.0;
+                    // no shadow outside of the shadow volume
+                    if (any(lessThan(shadowCoord.xy, vec2(0.0))) || any(greaterThan(shadowCoord.xy, vec2(1.0))))
+                        continue;
+                    float fragmentDistanceToLight = clamp(shadowCoord.z, 0, 1) - shadow.bias;
+                    // keep the filter inside the tile
+                    vec2 minCoord = shadow.rect.xy + 0.5 * texelSize;
+                    vec2 maxCoord = shadow.rect.xy + shadow.rect.zw - 0.5 * texelSize;
+                    vec2 atlasCoord = shadow.rect.xy + shadowCoord.xy * shadow.rect.zw;
+                    float lit = 0.0;
+                    for (int x = -pcfRadius; x <= pcfRadius; x++)
+                    {{
+                        for (int y = -pcfRadius; y <= pcfRadius; y++)
+                        {{
+                            vec2 sampleCoord = clamp(atlasCoord + vec2(x, y) * texelSize, minCoord, maxCoord);
+                            lit += texture(shadowAtlas.depthTextureSampler, vec3(sampleCoord, fragmentDistanceToLight));
+                        }}
+                    }}
+                    lit /= float((2 * pcfRadius + 1) * (2 * pcfRadius + 1));
+                    factor *= 1.0 - shadowAtlas.strength * (1.0 - lit);
+                }}
+                return factor;
+            }}
+        """
+
+    @property
+    def calculating_clustered_lights_in_shader_code(self):
+        """
+        Create the LightClusters struct, its uniforms and a function adding the effect
+        of the point lights assigned to the cluster of a fragment (uses calculateLight)
+        """
+        return """
+            struct LightClusters
+            {
+                // three texels per light: position and influence radius, color, attenuation
+                samplerBuffer lightData;
+                // offset and count of the light indices of each cluster
+                isamplerBuffer clusterTable;
+                isamplerBuffer lightIndices;
+                // number of clusters along x, y (screen) and z (depth)
+                ivec3 gridSize;
+                // depth range of the (perspective) camera
+                float near;
+                float far;
+                vec2 viewportSize;
+            };
+            
+            uniform bool useClusteredLighting;
+            uniform LightClusters lightClusters;
+            
+            vec3 calculateClusteredLights(vec3 pointPosition, vec3 pointNormal)
+            {
+                float near = lightClusters.near;
+                float far = lightClusters.far;
+                // view depth of the fragment from its depth value
+                float ndcDepth = gl_FragCoord.z * 2.0 - 1.0;
+                float viewDepth = 2.0 * near * far / (far + near - ndcDepth * (far - near));
+                ivec3 gridSize = lightClusters.gridSize;
+                ivec3 cluster = ivec3(ivec2(gl_FragCoord.xy / lightClusters.viewportSize * vec2(gridSize.xy)),
+                                      int(log(viewDepth / near) / log(far / near) * float(gridSize.z)));
+                cluster = clamp(cluster, ivec3(0), gridSize - 1);
+                int clusterIndex = (cluster.z * gridSize.y + cluster.y) * gridSize.x + cluster.x;
+                ivec2 indexRange = texelFetch(lightClusters.clusterTable, clusterIndex).xy;
+                vec3 light = vec3(0, 0, 0);
+                for (int i = indexRange.x; i < indexRange.x + indexRange.y; i++)
+                {
+                    int lightIndex = texelFetch(lightClusters.lightIndices, i).x;
+                    vec3 lightPosition = texelFetch(lightClusters.lightData, 3 * lightIndex).xyz;
+                    vec3 lightColor = texelFetch(lightClusters.lightData, 3 * lightIndex + 1).rgb;
+                    vec3 lightAttenuation = texelFetch(lightClusters.lightData, 3 * lightIndex + 2).xyz;
+                    light += calculateLight(Light(3, lightColor, vec3(0, 0, 0), lightPosition, lightAttenuation),
+                                            pointPosition, pointNormal);
+                }
+                return light;
+            }
+        """
 
     @property
     def vertex_shader_code(self):
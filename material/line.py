@@ -1,5 +1,6 @@
 import OpenGL.GL as GL
 
+from core.gl_state import GLState
 from material.basic import BasicMaterial
 
 
@@ -15,7 +16,7 @@ class LineMaterial(BasicMaterial):
         self.set_properties(property_dict)
 
     def update_render_settings(self):
-        GL.glLineWidth(self._setting_dict["lineWidth"])
+        GLState.line_width(self._setting_dict["lineWidth"])
         if self._setting_dict["lineType"] == "connected":
             self._setting_dict["drawStyle"] = GL.GL_LINE_STRIP
         elif self._setting_dict["lineType"] == "loop":
@@ -1,12 +1,24 @@
+import copy
+
 import OpenGL.GL as GL
 
+from core.change_monitor import ChangeMonitor
+from core.gl_state import GLState
 from core.uniform import Uniform
 from core.utils import Utils
 
 
 class Material:
-    def __init__(self, vertex_shader_code, fragment_shader_code):
-        self._program_ref = Utils.initialize_program(vertex_shader_code, fragment_shader_code)
+    # Linked programs indexed by their shader code;
+    # materials with the same code share a program instead of compiling it again
+    _program_dict = {}
+
+    def __init__(self, vertex_shader_code, fragment_shader_code, geometry_shader_code=None):
+        self._program_ref = self.get_program(vertex_shader_code, fragment_shader_code, geometry_shader_code)
+        # Keep the source code to compile variants of this material
+        self._vertex_shader_code = vertex_shader_code
+        self._fragment_shader_code = fragment_shader_code
+        self._geometry_shader_code = geometry_shader_code
         # Store Uniform objects, indexed by name of associated variable in shader.
         # Each shader typically contains these uniforms; values will be set during render process from Mesh / Camera.
         self._uniform_dict = {
@@ -16,7 +28,15 @@ class Material:
         }
         # Store OpenGL render settings, indexed by variable name
         self._setting_dict = {
-            "drawStyle": GL.GL_TRIANGLES
+            "drawStyle": GL.GL_TRIANGLES,
+            # How the renderer treats alpha: "opaque" | "alphaTest" | "transparent".
+            # Opaque and alpha-tested (discarding) materials are drawn front to back without blending,
+            # transparent ones are drawn afterwards, back to front with blending and no depth writes.
+            "alphaMode": "opaque",
+            # May opaque meshes be drawn depth-only first when the renderer uses a depth prepass?
+            # Materials moving vertices differently from DepthMaterial must disable it,
+            # since their fragments are then shaded only where the depth is equal.
+            "depthPrepass": True
         }
 
     @property
@@ -31,6 +51,20 @@ class Material:
     def uniform_dict(self):
         return self._uniform_dict
 
+    @staticmethod
+    def get_program(vertex_shader_code, fragment_shader_code, geometry_shader_code=None):
+        """ Return the program compiled from the given shader code, compiling and linking it on first use """
+        key = (vertex_shader_code, fragment_shader_code, geometry_shader_code)
+        if key not in Material._program_dict:
+            Material._program_dict[key] = Utils.initialize_program(vertex_shader_code, fragment_shader_code,
+                                                                   geometry_shader_code)
+        return Material._program_dict[key]
+
+    @staticmethod
+    def clear_program_cache():
+        """ Forget the shared programs, e.g. when they belong to a context that is no longer current """
+        Material._program_dict = {}
+
     def add_uniform(self, data_type, variable_name, data):
         self._uniform_dict[variable_name] = Uniform(data_type, data)
 
@@ -43,6 +77,28 @@ class Material:
         """ Configure OpenGL with render settings """
         pass
 
+    def make_variant(self, vertex_shader_modifier=None, fragment_shader_modifier=None):
+        """
+        Return a copy of this material with its own uniform objects and render settings,
+        using a program compiled from the shader code changed by the given functions
+        """
+        vertex_shader_code = self._vertex_shader_code
+        if vertex_shader_modifier is not None:
+            vertex_shader_code = vertex_shader_modifier(vertex_shader_code)
+        fragment_shader_code = self._fragment_shader_code
+        if fragment_shader_modifier is not None:
+            fragment_shader_code = fragment_shader_modifier(fragment_shader_code)
+        variant = copy.copy(self)
+        variant._program_ref = self.get_program(vertex_shader_code, fragment_shader_code,
+                                                self._geometry_shader_code)
+        variant._vertex_shader_code = vertex_shader_code
+        variant._fragment_shader_code = fragment_shader_code
+        variant._uniform_dict = {variable_name: copy.copy(uniform_object)
+                                 for variable_name, uniform_object in self._uniform_dict.items()}
+        variant._setting_dict = dict(self._setting_dict)
+        variant.locate_uniforms()
+        return variant
+
     def set_properties(self, property_dict):
         """
         Convenience method for setting multiple material "properties"
@@ -56,6 +112,11 @@ class Material:
                 # Update render settings
                 elif name in self._setting_dict.keys():
                     self._setting_dict[name] = data
+                    if ChangeMonitor.current is not None:
+                        ChangeMonitor.current.report_change()
                 # Unknown property type
                 else:
                     raise Exception("Material has no property named: " + name)
+
+
+GLState.add_reset_callback(Material.clear_program_cache)
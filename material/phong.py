@@ -1,5 +1,6 @@
 import OpenGL.GL as GL
 
+from core.gl_state import GLState
 from material.lighted import LightedMaterial
 
 
@@ -12,7 +13,11 @@ class PhongMaterial(LightedMaterial):
                  property_dict=None,
                  number_of_light_sources=1,
                  bump_texture=None,
-                 use_shadow=False):
+                 use_shadow=False,
+                 use_cascaded_shadow=False,
+                 use_point_shadow=False,
+                 use_shadow_atlas=False,
+                 use_clustered_lighting=False):
         super().__init__(number_of_light_sources)
         self.add_uniform("vec3", "baseColor", [1.0, 1.0, 1.0])
 
@@ -32,12 +37,48 @@ class PhongMaterial(LightedMaterial):
             self.add_uniform("sampler2D", "bumpTextureSampler", [bump_texture.texture_ref, 2])
             self.add_uniform("float", "bumpStrength", 1.0)
 
+        # Set for each mesh by the renderer
+        self.add_uniform("bool", "receiveShadow", True)
         if not use_shadow:
             self.add_uniform("bool", "useShadow", False)
+            # Samplers of different types must not share a texture unit,
+            # so the unused shadow sampler keeps the unit of the depth texture
+            self.add_uniform("int", "shadow0.depthTextureSampler", 3)
         else:
             self.add_uniform("bool", "useShadow", True)
             self.add_uniform("Shadow", "shadow0", None)
 
+        if not use_cascaded_shadow:
+            self.add_uniform("bool", "useCascadedShadow", False)
+            self.add_uniform("int", "cascadedShadow.depthTextureSampler", 5)
+        else:
+            self.add_uniform("bool", "useCascadedShadow", True)
+            self.add_uniform("CascadedShadow", "cascadedShadow", None)
+
+        if not use_point_shadow:
+            self.add_uniform("bool", "usePointShadow", False)
+            self.add_uniform("int", "pointShadow.depthTextureSampler", 6)
+        else:
+            self.add_uniform("bool", "usePointShadow", True)
+            self.add_uniform("PointShadow", "pointShadow", None)
+
+        if not use_shadow_atlas:
+            self.add_uniform("bool", "useShadowAtlas", False)
+            self.add_uniform("int", "shadowAtlas.depthTextureSampler", 7)
+        else:
+            self.add_uniform("bool", "useShadowAtlas", True)
+            self.add_uniform("ShadowAtlas", "shadowAtlas", None)
+
+        # Point lights are taken from the light clusters of the renderer instead of the light uniforms
+        if not use_clustered_lighting:
+            self.add_uniform("bool", "useClusteredLighting", False)
+            self.add_uniform("int", "lightClusters.lightData", 8)
+            self.add_uniform("int", "lightClusters.clusterTable", 9)
+            self.add_uniform("int", "lightClusters.lightIndices", 10)
+        else:
+            self.add_uniform("bool", "useClusteredLighting", True)
+            self.add_uniform("LightClusters", "lightClusters", None)
+
         self.locate_uniforms()
 
         # Render both sides?
@@ -60,26 +101,13 @@ class PhongMaterial(LightedMaterial):
             out vec3 position;
             out vec2 UV;
             out vec3 normal;
-            
-            struct Shadow
-            {
-                // direction of light that casts shadow
-                vec3 lightDirection;
-                // data from camera that produces depth texture
-                mat4 projectionMatrix;
-                mat4 viewMatrix;
-                // texture that stores depth values from shadow camera
-                sampler2D depthTextureSampler;
-                // regions in shadow multiplied by (1-strength)
-                float strength;
-                // reduces unwanted visual artifacts
-                float bias;
-            };
-            
-            uniform bool useShadow;
-            uniform Shadow shadow0;
+            """ \
+            + self.declaring_shadow_uniforms_in_shader_code + """
             out vec3 shadowPosition0;
 
+            // The same depth as DepthMaterial in the depth prepass
+            invariant gl_Position;
+
             void main()
             {
                 gl_Position = projectionMatrix * viewMatrix * modelMatrix * vec4(vertexPosition, 1);
@@ -162,24 +190,13 @@ class PhongMaterial(LightedMaterial):
             in vec2 UV;
             in vec3 normal;
             out vec4 fragColor;
-            
-            struct Shadow
-            {
-                // direction of light that casts shadow
-                vec3 lightDirection;
-                // data from camera that produces depth texture
-                mat4 projectionMatrix;
-                mat4 viewMatrix;
-                // texture that stores depth values from shadow camera
-                sampler2D depthTextureSampler;
-                // regions in shadow multiplied by (1-strength)
-                float strength;
-                // reduces unwanted visual artifacts
-                float bias;
-            };
-            
-            uniform bool useShadow;
-            uniform Shadow shadow0;
+            """ \
+            + self.declaring_shadow_uniforms_in_shader_code \
+            + self.calculating_shadow_in_shader_code \
+            + self.calculating_cascaded_shadow_in_shader_code \
+            + self.calculating_point_shadow_in_shader_code \
+            + self.calculating_atlas_shadows_in_shader_code \
+            + self.calculating_clustered_lights_in_shader_code + """
             in vec3 shadowPosition0;
 
             void main()
@@ -196,25 +213,52 @@ class PhongMaterial(LightedMaterial):
                 }
                 // Calculate total effect of lights on color
                 vec3 light = vec3(0, 0, 0);""" + self.adding_lights_in_shader_code + """
+                if (useClusteredLighting)
+                {
+                    light += calculateClusteredLights(position, calcNormal);
+                }
                 color *= vec4(light, 1);
                 
-                if (useShadow)
+                if (useShadow && receiveShadow)
                 {
                     // determine if surface is facing towards light direction
                     float cosAngle = dot(normalize(normal), -normalize(shadow0.lightDirection));
                     bool facingLight = (cosAngle > 0.01);
-                    // convert range [-1, 1] to range [0, 1]
-                    // for UV coordinate and depth information
-                    vec3 shadowCoord = (shadowPosition0.xyz + 1.0) / 2.0;
-                    float closestDistanceToLight = texture(shadow0.depthTextureSampler, shadowCoord.xy).r;
-                    float fragmentDistanceToLight = clamp(shadowCoord.z, 0, 1);
-                    // determine if fragment lies in shadow of another object
-                    bool inShadow = (fragmentDistanceToLight > closestDistanceToLight + shadow0.bias);
-                    if (facingLight && inShadow)
+                    if (facingLight)
                     {
-                        float s = 1.0 - shadow0.strength;
+                        float lit = calculateShadow(shadow0.depthTextureSampler, shadowPosition0,
+                                                    shadow0.bias, shadow0.pcfRadius);
+                        float s = 1.0 - shadow0.strength * (1.0 - lit);
                         color *= vec4(s, s, s, 1);
                     }
+                }
+                
+                if (useCascadedShadow && receiveShadow)
+                {
+                    float cosAngle = dot(normalize(normal), -normalize(cascadedShadow.lightDirection));
+                    if (cosAngle > 0.01)
+                    {
+                        float lit = calculateCascadedShadow(position);
+                        float s = 1.0 - cascadedShadow.strength * (1.0 - lit);
+                        color *= vec4(s, s, s, 1);
+                    }
+                }
+                
+                if (usePointShadow && receiveShadow)
+                {
+                    // only surfaces facing the point light are darkened
+                    if (dot(normalize(normal), pointShadow.lightPosition - position) > 0.0)
+                    {
+                        float lit = calculatePointShadow(position);
+                        float s = 1.0 - pointShadow.strength * (1.0 - lit);
+                        color *= vec4(s, s, s, 1);
+                    }
+                }
+                
+                if (useShadowAtlas && receiveShadow)
+                {
+                    float s = calculateAtlasShadows(position, normalize(normal));
+                    color *= vec4(s, s, s, 1);
                 }  
                 
                 fragColor = color;
@@ -223,11 +267,11 @@ class PhongMaterial(LightedMaterial):
 
     def update_render_settings(self):
         if self.setting_dict["doubleSide"]:
-            GL.glDisable(GL.GL_CULL_FACE)
+            GLState.disable(GL.GL_CULL_FACE)
         else:
-            GL.glEnable(GL.GL_CULL_FACE)
+            GLState.enable(GL.GL_CULL_FACE)
         if self.setting_dict["wireframe"]:
-            GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_LINE)
+            GLState.polygon_mode(GL.GL_LINE)
         else:
-            GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_FILL)
-        GL.glLineWidth(self.setting_dict["lineWidth"])
+            GLState.polygon_mode(GL.GL_FILL)
+        GLState.line_width(self.setting_dict["lineWidth"])
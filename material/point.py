@@ -1,5 +1,6 @@
 import OpenGL.GL as GL
 
+from core.gl_state import GLState
 from material.basic import BasicMaterial
 
 
@@ -15,10 +16,10 @@ class PointMaterial(BasicMaterial):
         self.set_properties(property_dict)
 
     def update_render_settings(self):
-        GL.glPointSize(self._setting_dict["pointSize"])
+        GLState.point_size(self._setting_dict["pointSize"])
         if self._setting_dict["roundedPoints"]:
             # https://mcfletch.github.io/pyopengl/documentation/manual/glEnable.html
             # GL_POINT_SMOOTH is not a valid GL constant under CoreProfile
-            GL.glEnable(GL.GL_POINT_SMOOTH)
+            GLState.enable(GL.GL_POINT_SMOOTH)
         else:
-            GL.glDisable(GL.GL_POINT_SMOOTH)
+            GLState.disable(GL.GL_POINT_SMOOTH)
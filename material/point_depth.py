@@ -0,0 +1,89 @@
+import numpy as np
+
+from material.material import Material
+
+
+class PointDepthMaterial(Material):
+    """
+    Renders the distance to a point light into all six faces of a depth cube map in one pass:
+    the geometry shader copies every triangle to the faces selected by faceMask
+    and sends each copy to its cube map layer with gl_Layer
+    """
+    def __init__(self):
+        # vertex shader code
+        vertex_shader_code = """
+        in vec3 vertexPosition;
+        uniform mat4 modelMatrix;
+
+        void main()
+        {
+            // world position; projected for each face by the geometry shader
+            gl_Position = modelMatrix * vec4(vertexPosition, 1);
+        }
+        """
+
+        # geometry shader code
+        geometry_shader_code = """
+        layout(triangles) in;
+        layout(triangle_strip, max_vertices = 18) out;
+        // projection matrix * view matrix of the faces +X, -X, +Y, -Y, +Z, -Z
+        uniform mat4 faceMatrices[6];
+        // bit i is set if the object may be visible from face i
+        uniform int faceMask;
+        out vec3 worldPosition;
+
+        void main()
+        {
+            for (int face = 0; face < 6; face++)
+            {
+                if ((faceMask & (1 << face)) == 0)
+                    continue;
+                vec4 clipPosition[3];
+                for (int i = 0; i < 3; i++)
+                    clipPosition[i] = faceMatrices[face] * gl_in[i].gl_Position;
+                // skip triangles completely outside one of the side planes of the face
+                bool outside = false;
+                for (int axis = 0; axis < 2; axis++)
+                {
+                    if (clipPosition[0][axis] > clipPosition[0].w && clipPosition[1][axis] > clipPosition[1].w
+                        && clipPosition[2][axis] > clipPosition[2].w)
+                        outside = true;
+                    if (clipPosition[0][axis] < -clipPosition[0].w && clipPosition[1][axis] < -clipPosition[1].w
+                        && clipPosition[2][axis] < -clipPosition[2].w)
+                        outside = true;
+                }
+                if (outside)
+                    continue;
+                for (int i = 0; i < 3; i++)
+                {
+                    gl_Layer = face;
+                    worldPosition = gl_in[i].gl_Position.xyz;
+                    gl_Position = clipPosition[i];
+                    EmitVertex();
+                }
+                EndPrimitive();
+            }
+        }
+        """
+
+        # fragment shader code
+        fragment_shader_code = """
+        uniform vec3 lightPosition;
+        uniform float farPlane;
+        in vec3 worldPosition;
+
+        void main()
+        {
+            // store the distance to the light (scaled to [0, 1]) instead of the projected depth,
+            // so that receivers compare their distance regardless of the face
+            gl_FragDepth = length(worldPosition - lightPosition) / farPlane;
+        }
+        """
+
+        # Initialize shaders
+        super().__init__(vertex_shader_code, fragment_shader_code, geometry_shader_code)
+        self.add_uniform("mat4Array", "faceMatrices", np.array([np.identity(4)] * 6))
+        self.add_uniform("int", "faceMask", 0b111111)
+        self.add_uniform("vec3", "lightPosition", [0, 0, 0])
+        self.add_uniform("float", "farPlane", 1.0)
+        self.locate_uniforms()
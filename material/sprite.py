@@ -1,5 +1,6 @@
 import OpenGL.GL as GL
 
+from core.gl_state import GLState
 from material.material import Material
 
 
@@ -66,12 +67,15 @@ class SpriteMaterial(Material):
         self.add_uniform("float", "tileNumber", -1)
         self.add_uniform("vec2", "tileCount", [1, 1])
         self.locate_uniforms()
+        # Fragments with low alpha are discarded by the fragment shader;
+        # textures with partial alpha are blended in the transparent pass (unless alphaMode is given)
+        self.setting_dict["alphaMode"] = "transparent" if texture.partial_alpha else "alphaTest"
         # Render both sides?
         self.setting_dict["doubleSide"] = True
         self.set_properties(property_dict)
 
     def update_render_settings(self):
         if self.setting_dict["doubleSide"]:
-            GL.glDisable(GL.GL_CULL_FACE)
+            GLState.disable(GL.GL_CULL_FACE)
         else:
-            GL.glEnable(GL.GL_CULL_FACE)
\ No newline at end of file
+            GLState.enable(GL.GL_CULL_FACE)
\ No newline at end of file
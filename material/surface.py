@@ -1,5 +1,6 @@
 import OpenGL.GL as GL
 
+from core.gl_state import GLState
 from material.basic import BasicMaterial
 
 
@@ -19,11 +20,11 @@ class SurfaceMaterial(BasicMaterial):
 
     def update_render_settings(self):
         if self._setting_dict["doubleSide"]:
-            GL.glDisable(GL.GL_CULL_FACE)
+            GLState.disable(GL.GL_CULL_FACE)
         else:
-            GL.glEnable(GL.GL_CULL_FACE)
+            GLState.enable(GL.GL_CULL_FACE)
         if self._setting_dict["wireframe"]:
-            GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_LINE)
+            GLState.polygon_mode(GL.GL_LINE)
         else:
-            GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_FILL)
-        GL.glLineWidth(self._setting_dict["lineWidth"])
+            GLState.polygon_mode(GL.GL_FILL)
+        GLState.line_width(self._setting_dict["lineWidth"])
@@ -1,5 +1,6 @@
 import OpenGL.GL as GL
 
+from core.gl_state import GLState
 from material.material import Material
 
 
@@ -40,6 +41,9 @@ class TextureMaterial(Material):
         self.add_uniform("vec2", "repeatUV", [1.0, 1.0])
         self.add_uniform("vec2", "offsetUV", [0.0, 0.0])
         self.locate_uniforms()
+        # Fragments with low alpha are discarded by the fragment shader;
+        # textures with partial alpha are blended in the transparent pass (unless alphaMode is given)
+        self.setting_dict["alphaMode"] = "transparent" if texture.partial_alpha else "alphaTest"
         # Render both sides?
         self.setting_dict["doubleSide"] = True
         # Render triangles as wireframe?
@@ -50,11 +54,11 @@ class TextureMaterial(Material):
 
     def update_render_settings(self):
         if self.setting_dict["doubleSide"]:
-            GL.glDisable(GL.GL_CULL_FACE)
+            GLState.disable(GL.GL_CULL_FACE)
         else:
-            GL.glEnable(GL.GL_CULL_FACE)
+            GLState.enable(GL.GL_CULL_FACE)
         if self.setting_dict["wireframe"]:
-            GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_LINE)
+            GLState.polygon_mode(GL.GL_LINE)
         else:
-            GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_FILL)
-        GL.glLineWidth(self.setting_dict["lineWidth"])
+            GLState.polygon_mode(GL.GL_FILL)
+        GLState.line_width(self.setting_dict["lineWidth"])